@@ -6,11 +6,12 @@ In user's messages:
 - role = "assistant" records the user agent's response
 """
 import os
-import time
 from copy import deepcopy
-from openai import OpenAI
 from typing import List, Dict, Any
 
+from agent import llm_gateway
+from agent.llm_client import get_openai_client
+
 SYSTEM_PROMPT_TRAVEL_EN = """You are a user interacting with an agent.
 
 Instruction: {instruction}
@@ -51,9 +52,9 @@ def llm_inference(
     ) -> str:
     """Non-streaming LLM inference."""
     if provider == "openai":
-        client = OpenAI(
+        client = get_openai_client(
             api_key=os.getenv("USER_OPENAI_API_KEY"),
-            base_url=os.getenv("USER_OPENAI_BASE_URL"),
+            base_url=os.getenv("USER_OPENAI_BASE_URL")
         )
     else:
         # add other provider support here
@@ -61,31 +62,29 @@ def llm_inference(
     if temperature is None:
         temperature = 0.001
     # add other provider support here
-    retries = 0
     max_retries = 10
-    while retries < max_retries:
-        try:
-            response = client.chat.completions.create(
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.chat.completions.create(
                 model=model,
                 messages=messages,
                 stream=False,
                 temperature=temperature,
                 max_tokens=10000,
                 n=1,
-            )
-            content = response.choices[0].message.content
-            if hasattr(response.choices[0].message, "reasoning_content"):
-                reasoning_content = response.choices[0].message.reasoning_content
-                reasoning_content = reasoning_content.strip()
-                content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
-            return content
+            ),
+            max_retries=max_retries
+        )
+        content = response.choices[0].message.content
+        if hasattr(response.choices[0].message, "reasoning_content"):
+            reasoning_content = response.choices[0].message.reasoning_content
+            reasoning_content = reasoning_content.strip()
+            content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
+        return content
+    except Exception:
+        pass
 
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries * 10 + 10} seconds...")
-            time.sleep(retries * 10)
-            
-            retries += 1
-            
     print(f"Failed to get response after {max_retries} retries.")
     return ''
 
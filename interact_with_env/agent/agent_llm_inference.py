@@ -3,14 +3,190 @@ LLM inference utilities for action agent inference.
 """
 
 import os
-import time
-from openai import OpenAI
+from agent import llm_gateway
+from agent.llm_client import get_openai_client, get_async_openai_client
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Tuple, Optional
 
 # Load environment variables
 load_dotenv()
 
+# Prompt mode only uses the first tool call, so streaming can stop once it is closed
+TOOL_CALL_END_TAG = "</tool_call>"
+
+# Streams ask for token usage (stream_options.include_usage) unless the server rejected it before
+STREAM_USAGE_OPTIONS = {"include_usage": True}
+_no_stream_usage_servers = set()
+
+
+def _split_think(reasoning_content: str, content: str) -> Tuple[str, str]:
+    """If no reasoning_content was streamed, take it from a <think>...</think> prefix of content."""
+    if not reasoning_content and content and '</think>' in content:
+        reasoning_content = content.split('</think>')[0].strip()
+        if '<think>' in reasoning_content:
+            reasoning_content = reasoning_content.split('<think>')[1].strip()
+        content = content.split('</think>')[1].strip()
+    return reasoning_content, content
+
+
+def _accumulate_tool_calls(tool_calls_accum: Dict[int, Dict[str, Any]], delta_tool_calls) -> None:
+    """Merge streamed tool call deltas into tool_calls_accum (keyed by index)."""
+    for tool_call in delta_tool_calls:
+        idx = tool_call.index
+        if idx not in tool_calls_accum:
+            tool_calls_accum[idx] = {
+                "id": tool_call.id or "",
+                "type": tool_call.type or "function",
+                "function": {
+                    "name": "",
+                    "arguments": ""
+                }
+            }
+        if tool_call.id:
+            tool_calls_accum[idx]["id"] = tool_call.id
+        if tool_call.type:
+            tool_calls_accum[idx]["type"] = tool_call.type
+        if tool_call.function:
+            if tool_call.function.name:
+                tool_calls_accum[idx]["function"]["name"] += tool_call.function.name
+            if tool_call.function.arguments:
+                tool_calls_accum[idx]["function"]["arguments"] += tool_call.function.arguments
+
+
+def _record_stream_usage(model: str, chunk, usage_out: Optional[Dict[str, int]] = None) -> None:
+    """
+    Count tokens of a stream in the gateway metrics when the server reports usage
+    (the last chunk, requested by stream_options.include_usage, see _create_stream), and copy them to usage_out if given.
+    """
+    usage = getattr(chunk, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        llm_gateway.record_tokens(model, usage.total_tokens)
+        if usage_out is not None:
+            usage_out["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+            usage_out["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+
+
+def _create_stream(client, base_url: str, params: Dict[str, Any]):
+    """
+    Start a streaming completion, asking for token usage at the end of the stream.
+    Servers that answer stream_options with a 400 (older OpenAI-compatible servers) are retried without it
+    and, if that succeeds, remembered by base_url so later streams skip it (their usage is not counted).
+    """
+    if base_url in _no_stream_usage_servers:
+        return client.chat.completions.create(**params)
+    try:
+        return client.chat.completions.create(**params, stream_options=STREAM_USAGE_OPTIONS)
+    except Exception as e:
+        if getattr(e, "status_code", None) != 400:
+            raise
+    completion = client.chat.completions.create(**params)
+    _no_stream_usage_servers.add(base_url)
+    return completion
+
+
+async def _async_create_stream(client, base_url: str, params: Dict[str, Any]):
+    """Async version of _create_stream."""
+    if base_url in _no_stream_usage_servers:
+        return await client.chat.completions.create(**params)
+    try:
+        return await client.chat.completions.create(**params, stream_options=STREAM_USAGE_OPTIONS)
+    except Exception as e:
+        if getattr(e, "status_code", None) != 400:
+            raise
+    completion = await client.chat.completions.create(**params)
+    _no_stream_usage_servers.add(base_url)
+    return completion
+
+
+def _prompt_create_params(model, messages, temperature, enable_thinking, attempt) -> Dict[str, Any]:
+    """Request parameters for streaming prompt-mode inference."""
+    return {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+        "temperature": temperature,
+        "max_tokens": _prompt_max_tokens(attempt),
+        "extra_body": {"chat_template_kwargs": {"enable_thinking": enable_thinking}},
+        "n": 1
+    }
+
+
+def _prompt_max_tokens(attempt: int) -> int:
+    """max_tokens for streaming prompt mode: lowered after 6 failed attempts."""
+    return 10000 if attempt < 6 else 5000
+
+
+def _tool_call_end(content: str, scanned: int) -> int:
+    """
+    Index just past the first </tool_call> in prompt-mode content (outside a <think> block), or -1.
+    scanned is the content length already checked, so each chunk only rescans the new tail.
+    """
+    start = max(scanned - len(TOOL_CALL_END_TAG), 0)
+    if "<think>" in content:
+        think_end = content.find("</think>")
+        if think_end == -1:
+            return -1
+        start = max(start, think_end)
+    idx = content.find(TOOL_CALL_END_TAG, start)
+    return idx + len(TOOL_CALL_END_TAG) if idx != -1 else -1
+
+
+def _finish_prompt_result(reasoning_content: str, content: str) -> str:
+    """Build the prompt-mode result from accumulated stream content; raises if it is empty."""
+    reasoning_content = reasoning_content.strip()
+    content = content.strip()
+
+    # Check if <think> tag is present in content
+    reasoning_content, content = _split_think(reasoning_content, content)
+
+    # Prepend reasoning content if not empty (Qwen3 template style)
+    if reasoning_content:
+        content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
+
+    if content == "":
+        raise ValueError("content is empty.")
+    return content
+
+
+def _fc_create_params(model, messages, temperature, tools, enable_thinking, parallel_tool_calls=False) -> Dict[str, Any]:
+    """Request parameters for streaming FC-mode inference."""
+    params = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+        "temperature": temperature,
+        "max_tokens": 10000,
+        "n": 1,
+        "extra_body": {"chat_template_kwargs": {"enable_thinking": enable_thinking}}
+    }
+    if tools:
+        params.update({"tools": tools, "tool_choice": "auto", "top_p": 0.95})
+        if parallel_tool_calls:
+            params["parallel_tool_calls"] = True
+    return params
+
+
+def _finish_fc_result(reasoning_content: str, content: str, tool_calls_accum: Dict[int, Dict[str, Any]], parallel_tool_calls: bool = False) -> Dict[str, Any]:
+    """
+    Build the FC-mode result from accumulated stream content; raises if everything is empty.
+    Only the first tool call is kept unless parallel_tool_calls.
+    """
+    tool_calls = [tool_calls_accum[idx] for idx in sorted(tool_calls_accum)]
+    if len(tool_calls) > 1 and not parallel_tool_calls:
+        print("warning: more than one tool_call, only keep the first one.")
+        tool_calls = [tool_calls[0]]
+
+    reasoning_content, content = _split_think(reasoning_content, content)
+
+    if not content and not tool_calls and not reasoning_content:
+        raise ValueError("all content is empty.")
+
+    return {
+        "reasoning_content": reasoning_content,
+        "tool_calls": tool_calls,
+        "content": content
+    }
+
 
 def openai_inference_prompt(
     model: str, 
@@ -21,12 +197,12 @@ def openai_inference_prompt(
     base_url: str = None
     ) -> str:
     """Non-streaming inference for prompt mode."""
-    client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url or os.getenv("OPENAI_BASE_URL"))
-    retries = 0
+    client = get_openai_client(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url or os.getenv("OPENAI_BASE_URL"))
     max_retries = 10
-    while retries < max_retries:
-        try:
-            response = client.chat.completions.create(
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.chat.completions.create(
                 model=model,
                 messages=messages,
                 stream=False,
@@ -34,25 +210,23 @@ def openai_inference_prompt(
                 max_tokens=10000,
                 n=1,
                 extra_body={"chat_template_kwargs": {"enable_thinking": enable_thinking}},
-            )
-            content = response.choices[0].message.content
-            # Get reasoning content if available
-            if hasattr(response.choices[0].message, "reasoning_content"):
-                reasoning_content = response.choices[0].message.reasoning_content
-            else:
-                reasoning_content = ""
-            # Prepend reasoning content if not empty (Qwen3 template style)
-            if reasoning_content:
-                reasoning_content = reasoning_content.strip()
-                content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
-            return content
-
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries * 10 + 10} seconds...")
-            time.sleep(retries * 10)
-            
-            retries += 1
-            
+            ),
+            max_retries=max_retries
+        )
+        content = response.choices[0].message.content
+        # Get reasoning content if available
+        if hasattr(response.choices[0].message, "reasoning_content"):
+            reasoning_content = response.choices[0].message.reasoning_content
+        else:
+            reasoning_content = ""
+        # Prepend reasoning content if not empty (Qwen3 template style)
+        if reasoning_content:
+            reasoning_content = reasoning_content.strip()
+            content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
+        return content
+    except Exception:
+        pass
+
     print(f"Failed to get response after {max_retries} retries.")
     return ''
 
@@ -62,71 +236,57 @@ def openai_stream_inference_prompt(
     temperature: float = None,
     enable_thinking: bool = False,
     api_key: str = None,
-    base_url: str = None
+    base_url: str = None,
+    stop_at_tool_call: bool = True,
+    usage: Optional[Dict[str, int]] = None
 ) -> str:
-    """Streaming inference for prompt mode."""
-    client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url or os.getenv("OPENAI_BASE_URL"))
+    """
+    Streaming inference for prompt mode.
+    With stop_at_tool_call, the stream is closed (and the generation cancelled) right after the first </tool_call>.
+    If usage is a dict, it receives the prompt/completion token counts reported at the end of the stream
+    (not reported when the stream is closed early).
+    """
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    client = get_openai_client(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url)
 
-    retries = 0
     max_retries = 10
-    max_tokens = 10000
-    while retries < max_retries:
-        params = {
-            "model": model,
-            "messages": messages,
-            "stream": True,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "extra_body": {"chat_template_kwargs": {"enable_thinking": enable_thinking}},
-            "n": 1
-        }
-        try:
-            completion = client.chat.completions.create(**params)
-
-            reasoning_content = ""
-            content = ""
-
-            for chunk in completion:
-                if not getattr(chunk, "choices", None):
-                    continue
-
-                choice = chunk.choices[0]
-                delta = choice.delta
-
-                # Accumulate reasoning content
-                if hasattr(delta, "reasoning_content") and delta.reasoning_content:
-                    reasoning_content += delta.reasoning_content
-
-                # Accumulate content
-                if hasattr(delta, "content") and delta.content:
-                    content += delta.content
-
-            reasoning_content = reasoning_content.strip()
-            content = content.strip()
-
-            # Check if <think> tag is present in content
-            if not reasoning_content and content and '</think>' in content:
-                reasoning_content = content.split('</think>')[0].strip()
-                if '<think>' in reasoning_content:
-                    reasoning_content = reasoning_content.split('<think>')[1].strip()
-                content = content.split('</think>')[1].strip()
-            
-            # Prepend reasoning content if not empty (Qwen3 template style)
-            if reasoning_content:
-                content = f"<think>\n{reasoning_content}\n</think>\n\n{content}"
-
-            if content == "":
-                raise ValueError("content is empty.")
-            return content
-        
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries * 10 + 10} seconds...")
-            time.sleep(retries * 10)
-            if retries >= 5:
-                max_tokens = 5000
-                print(f"max_tokens: {max_tokens}")
-            retries += 1
 
+    def request(attempt):
+        completion = _create_stream(client, base_url, _prompt_create_params(model, messages, temperature, enable_thinking, attempt))
+
+        reasoning_content = ""
+        content = ""
+
+        for chunk in completion:
+            _record_stream_usage(model, chunk, usage)
+            if not getattr(chunk, "choices", None):
+                continue
+
+            choice = chunk.choices[0]
+            delta = choice.delta
+
+            # Accumulate reasoning content
+            if hasattr(delta, "reasoning_content") and delta.reasoning_content:
+                reasoning_content += delta.reasoning_content
+
+            # Accumulate content
+            if hasattr(delta, "content") and delta.content:
+                scanned = len(content)
+                content += delta.content
+                # Stop generating once the first tool call is complete
+                if stop_at_tool_call:
+                    end = _tool_call_end(content, scanned)
+                    if end != -1:
+                        content = content[:end]
+                        completion.close()
+                        break
+
+        return _finish_prompt_result(reasoning_content, content)
+
+    try:
+        return llm_gateway.call(model, request, max_retries=max_retries)
+    except Exception:
+        pass
     print(f"Failed to get response after {max_retries} retries.")
     return ""
 
@@ -137,10 +297,14 @@ def openai_stream_inference_fc(
     tools: Optional[List[Dict]] = None,
     enable_thinking: bool = False,
     api_key: str = None,
-    base_url: str = None
+    base_url: str = None,
+    usage: Optional[Dict[str, int]] = None,
+    parallel_tool_calls: bool = False
 ) -> Dict[str, Any]:
     """
     Streaming inference using official Model tool interface (function calling mode).
+    If usage is a dict, it receives the prompt/completion token counts reported at the end of the stream.
+    With parallel_tool_calls, all tool calls of the turn are returned (in index order), else only the first.
     Returns:
         {
             "reasoning_content": str,
@@ -148,129 +312,183 @@ def openai_stream_inference_fc(
             "content": str
         }
     """
-    client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url or os.getenv("OPENAI_BASE_URL"))
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    client = get_openai_client(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url)
 
-    retries = 0
     max_retries = 10
-    while retries < max_retries:
-        try:
-            if tools:
-                completion = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    stream=True,
-                    temperature=temperature,
-                    max_tokens=10000,
-                    tools=tools,
-                    tool_choice="auto",
-                    top_p=0.95,
-                    n=1,
-                    extra_body={"chat_template_kwargs": {"enable_thinking": enable_thinking}}
-                )
-            else:
-                completion = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    stream=True,
-                    temperature=temperature,
-                    max_tokens=10000,
-                    n=1,
-                    extra_body={"chat_template_kwargs": {"enable_thinking": enable_thinking}}
-                )
 
-            reasoning_content = ""
-            content = ""
-            # Accumulate tool calls by index
-            tool_calls_accum: Dict[int, Dict[str, Any]] = {}
-
-            for chunk in completion:
-                if not getattr(chunk, "choices", None):
-                    continue
-
-                choice = chunk.choices[0]
-                delta = choice.delta
-
-                # Accumulate reasoning content
-                if hasattr(delta, "reasoning_content") and delta.reasoning_content:
-                    reasoning_content += delta.reasoning_content
-
-                # Accumulate content
-                if hasattr(delta, "content") and delta.content:
-                    content += delta.content
-
-                # Accumulate tool call information
-                if hasattr(delta, "tool_calls") and delta.tool_calls:
-                    for tool_call in delta.tool_calls:
-                        idx = tool_call.index
-                        if idx not in tool_calls_accum:
-                            tool_calls_accum[idx] = {
-                                "id": tool_call.id or "",
-                                "type": tool_call.type or "function",
-                                "function": {
-                                    "name": "",
-                                    "arguments": ""
-                                }
-                            }
-                        if tool_call.id:
-                            tool_calls_accum[idx]["id"] = tool_call.id
-                        if tool_call.type:
-                            tool_calls_accum[idx]["type"] = tool_call.type
-                        if tool_call.function:
-                            if tool_call.function.name:
-                                tool_calls_accum[idx]["function"]["name"] += tool_call.function.name
-                            if tool_call.function.arguments:
-                                tool_calls_accum[idx]["function"]["arguments"] += tool_call.function.arguments
-
-            # Final tool_calls list
-            tool_calls = list(tool_calls_accum.values())
-            if len(tool_calls) > 1:
-                print("warning: more than one tool_call, only keep the first one.")
-                tool_calls = [tool_calls[0]]
-
-            # Check if <think> tag is present in content
-            if not reasoning_content and content and '</think>' in content:
-                reasoning_content = content.split('</think>')[0].strip()
-                if '<think>' in reasoning_content:
-                    reasoning_content = reasoning_content.split('<think>')[1].strip()
-                content = content.split('</think>')[1].strip()
-                
-            if not content and not tool_calls and not reasoning_content:
-                raise ValueError("all content is empty.")
-        
-            result = {
-                "reasoning_content": reasoning_content,
-                "tool_calls": tool_calls,
-                "content": content
-            }
-        
-            return result
-        
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries * 10 + 10} seconds...")
-            time.sleep(retries * 10)
-            retries += 1
+    def request(attempt):
+        completion = _create_stream(client, base_url, _fc_create_params(model, messages, temperature, tools, enable_thinking, parallel_tool_calls))
+
+        reasoning_content = ""
+        content = ""
+        # Accumulate tool calls by index
+        tool_calls_accum: Dict[int, Dict[str, Any]] = {}
+
+        for chunk in completion:
+            _record_stream_usage(model, chunk, usage)
+            if not getattr(chunk, "choices", None):
+                continue
+
+            choice = chunk.choices[0]
+            delta = choice.delta
+
+            # Accumulate reasoning content
+            if hasattr(delta, "reasoning_content") and delta.reasoning_content:
+                reasoning_content += delta.reasoning_content
+
+            # Accumulate content
+            if hasattr(delta, "content") and delta.content:
+                content += delta.content
+
+            # Accumulate tool call information
+            if hasattr(delta, "tool_calls") and delta.tool_calls:
+                _accumulate_tool_calls(tool_calls_accum, delta.tool_calls)
 
+        return _finish_fc_result(reasoning_content, content, tool_calls_accum, parallel_tool_calls)
+
+    try:
+        return llm_gateway.call(model, request, max_retries=max_retries)
+    except Exception:
+        pass
     print(f"Failed to get response after {max_retries} retries.")
     return {"reasoning_content": "", "tool_calls": [], "content": ""}
 
 
-def llm_inference_fc(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, tools: Optional[List[Dict]] = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None) -> Dict[str, Any]:
+def llm_inference_fc(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, tools: Optional[List[Dict]] = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None, usage: Optional[Dict[str, int]] = None, parallel_tool_calls: bool = False) -> Dict[str, Any]:
     """
     Unified LLM inference interface for FC mode.
     """
     if provider == "openai":
-        return openai_stream_inference_fc(model=model, messages=messages, temperature=temperature, tools=tools, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url)
+        return openai_stream_inference_fc(model=model, messages=messages, temperature=temperature, tools=tools, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url, usage=usage, parallel_tool_calls=parallel_tool_calls)
     else:
         # add other provider support here
         raise ValueError(f"Invalid provider: {provider}")
 
 
-def llm_inference_prompt(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None) -> str:
+def llm_inference_prompt(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None, stop_at_tool_call: bool = True, usage: Optional[Dict[str, int]] = None) -> str:
     """
     Unified LLM inference interface for Prompt mode.
     """
     if provider == "openai":
-        return openai_stream_inference_prompt(model=model, messages=messages, temperature=temperature, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url)
+        return openai_stream_inference_prompt(model=model, messages=messages, temperature=temperature, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url, stop_at_tool_call=stop_at_tool_call, usage=usage)
+    else:
+        # add other provider support here
+        raise ValueError(f"Invalid provider: {provider}")
+
+
+async def async_openai_stream_inference_prompt(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float = None,
+    enable_thinking: bool = False,
+    api_key: str = None,
+    base_url: str = None,
+    stop_at_tool_call: bool = True,
+    usage: Optional[Dict[str, int]] = None
+) -> str:
+    """Async streaming inference for prompt mode (same result and retries as openai_stream_inference_prompt)."""
+    max_retries = 10
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    client = get_async_openai_client(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+    async def request(attempt):
+        completion = await _async_create_stream(client, base_url, _prompt_create_params(model, messages, temperature, enable_thinking, attempt))
+
+        reasoning_content = ""
+        content = ""
+
+        async for chunk in completion:
+            _record_stream_usage(model, chunk, usage)
+            if not getattr(chunk, "choices", None):
+                continue
+
+            delta = chunk.choices[0].delta
+            if hasattr(delta, "reasoning_content") and delta.reasoning_content:
+                reasoning_content += delta.reasoning_content
+            if hasattr(delta, "content") and delta.content:
+                scanned = len(content)
+                content += delta.content
+                if stop_at_tool_call:
+                    end = _tool_call_end(content, scanned)
+                    if end != -1:
+                        content = content[:end]
+                        await completion.close()
+                        break
+
+        return _finish_prompt_result(reasoning_content, content)
+
+    try:
+        return await llm_gateway.async_call(model, request, max_retries=max_retries)
+    except Exception:
+        pass
+    print(f"Failed to get response after {max_retries} retries.")
+    return ""
+
+
+async def async_openai_stream_inference_fc(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float = None,
+    tools: Optional[List[Dict]] = None,
+    enable_thinking: bool = False,
+    api_key: str = None,
+    base_url: str = None,
+    usage: Optional[Dict[str, int]] = None,
+    parallel_tool_calls: bool = False
+) -> Dict[str, Any]:
+    """Async streaming inference for FC mode (same result and retries as openai_stream_inference_fc)."""
+    max_retries = 10
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    client = get_async_openai_client(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+    async def request(attempt):
+        completion = await _async_create_stream(client, base_url, _fc_create_params(model, messages, temperature, tools, enable_thinking, parallel_tool_calls))
+
+        reasoning_content = ""
+        content = ""
+        tool_calls_accum: Dict[int, Dict[str, Any]] = {}
+
+        async for chunk in completion:
+            _record_stream_usage(model, chunk, usage)
+            if not getattr(chunk, "choices", None):
+                continue
+
+            delta = chunk.choices[0].delta
+            if hasattr(delta, "reasoning_content") and delta.reasoning_content:
+                reasoning_content += delta.reasoning_content
+            if hasattr(delta, "content") and delta.content:
+                content += delta.content
+            if hasattr(delta, "tool_calls") and delta.tool_calls:
+                _accumulate_tool_calls(tool_calls_accum, delta.tool_calls)
+
+        return _finish_fc_result(reasoning_content, content, tool_calls_accum, parallel_tool_calls)
+
+    try:
+        return await llm_gateway.async_call(model, request, max_retries=max_retries)
+    except Exception:
+        pass
+    print(f"Failed to get response after {max_retries} retries.")
+    return {"reasoning_content": "", "tool_calls": [], "content": ""}
+
+
+async def async_llm_inference_fc(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, tools: Optional[List[Dict]] = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None, usage: Optional[Dict[str, int]] = None, parallel_tool_calls: bool = False) -> Dict[str, Any]:
+    """
+    Unified async LLM inference interface for FC mode.
+    """
+    if provider == "openai":
+        return await async_openai_stream_inference_fc(model=model, messages=messages, temperature=temperature, tools=tools, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url, usage=usage, parallel_tool_calls=parallel_tool_calls)
+    else:
+        # add other provider support here
+        raise ValueError(f"Invalid provider: {provider}")
+
+
+async def async_llm_inference_prompt(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float = None, enable_thinking: bool = False, api_key: str = None, base_url: str = None, stop_at_tool_call: bool = True, usage: Optional[Dict[str, int]] = None) -> str:
+    """
+    Unified async LLM inference interface for Prompt mode.
+    """
+    if provider == "openai":
+        return await async_openai_stream_inference_prompt(model=model, messages=messages, temperature=temperature, enable_thinking=enable_thinking, api_key=api_key, base_url=base_url, stop_at_tool_call=stop_at_tool_call, usage=usage)
     else:
         # add other provider support here
         raise ValueError(f"Invalid provider: {provider}")
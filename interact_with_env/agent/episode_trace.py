@@ -0,0 +1,62 @@
+"""
+Timing spans of an episode and their export to a Chrome trace.
+
+A span is {"name", "start", "duration"} (+ optional "args"): start is wall-clock seconds
+(comparable across processes), duration is measured with perf_counter. Phase names:
+- env_reset, agent_llm, env_step: measured by TaskSolveAgent
+- tool, user_llm, snapshot, reward: reported by the env inside env_step (info["spans"]), if it supports it
+"""
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+@contextmanager
+def record_span(spans: List[dict], name: str, **args):
+    """
+    Append a span covering the with-block to spans.
+    Yields the span's args dict (e.g. step, tokens); it can be filled inside the block.
+    """
+    start = time.time()
+    begin = time.perf_counter()
+    try:
+        yield args
+    finally:
+        span = {"name": name, "start": start, "duration": time.perf_counter() - begin}
+        if args:
+            span["args"] = args
+        spans.append(span)
+
+
+def sum_spans(spans: List[dict]) -> Dict[str, float]:
+    """Total seconds per span name."""
+    totals = {}
+    for span in spans:
+        totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration"]
+    return {name: round(seconds, 6) for name, seconds in totals.items()}
+
+
+def write_chrome_trace(results: List[dict], path: str):
+    """
+    Write the spans of episode results (run with trace=True) as Chrome trace JSON,
+    viewable in chrome://tracing or https://ui.perfetto.dev. One track per episode.
+    """
+    results = [result for result in results if result.get("spans")]
+    origin = min((span["start"] for result in results for span in result["spans"]), default=0.0)
+    events = []
+    for tid, result in enumerate(results):
+        task_id = result.get("task_id", tid)
+        events.append({"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": f"task {task_id}"}})
+        for span in result["spans"]:
+            events.append({
+                "name": span["name"],
+                "ph": "X",
+                "pid": 0,
+                "tid": tid,
+                "ts": round((span["start"] - origin) * 1e6, 1),
+                "dur": round(span["duration"] * 1e6, 1),
+                "args": span.get("args", {}),
+            })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
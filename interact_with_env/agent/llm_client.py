@@ -0,0 +1,63 @@
+"""
+Shared OpenAI client registry.
+
+Building an `OpenAI(...)` client per call creates a new HTTP connection pool every time
+(new TCP/TLS handshake and DNS lookup per request). Clients here are created once per
+(api_key, base_url) and reused by all threads, so connections are kept alive across calls.
+Async clients are bound to an event loop and are therefore cached per loop.
+
+Pool size (max connections per client) comes from LLM_CLIENT_POOL_SIZE (default 100, read
+on first use so a later `load_dotenv()` still applies) or `set_client_pool_size`.
+"""
+import os
+import asyncio
+import weakref
+import threading
+
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+import httpx
+
+_pool_size = None  # None: LLM_CLIENT_POOL_SIZE (read on first use)
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {(api_key, base_url): client}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    global _pool_size
+    if _pool_size is None:
+        _pool_size = int(os.getenv("LLM_CLIENT_POOL_SIZE", "100"))
+    return httpx.Limits(max_connections=_pool_size, max_keepalive_connections=_pool_size)
+
+
+def set_client_pool_size(pool_size: int):
+    """Set max connections per client; clients created before are dropped and rebuilt on next use."""
+    global _pool_size
+    with _lock:
+        _pool_size = pool_size
+        _clients.clear()
+        _async_clients.clear()
+
+
+def get_openai_client(api_key: str = None, base_url: str = None) -> OpenAI:
+    """Return the shared OpenAI client for (api_key, base_url)."""
+    key = (api_key, base_url)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=DefaultHttpxClient(limits=_limits()))
+            _clients[key] = client
+        return client
+
+
+def get_async_openai_client(api_key: str = None, base_url: str = None) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client for (api_key, base_url) on the running event loop."""
+    loop = asyncio.get_running_loop()
+    key = (api_key, base_url)
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=DefaultAsyncHttpxClient(limits=_limits()))
+            loop_clients[key] = client
+        return client
@@ -1,4 +1,5 @@
 import json
+import threading
 from typing import Any, Callable, Dict, List, Type, Optional
 
 
@@ -59,4 +60,58 @@ def merge_tools_into_system_prompt(
     output.append('{"name": <function-name>, "arguments": <args-json-object>}\n')
     output.append("</tool_call>")
     
-    return ''.join(output)
\ No newline at end of file
+    return ''.join(output)
+
+
+class SystemPromptCache:
+    """
+    Per-env cache of (system prompt, tools).
+
+    Every episode on the same env gets the system prompt and tool list built for its first episode,
+    so the prompt bytes are identical across episodes (tool order and key order are kept as given) and
+    automatic prefix caching in vLLM/SGLang can reuse the KV cache of the shared prefix.
+    stats() reports how many episodes reused a cached prefix and its expected length.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (system_prompt, tools)
+        self.prefix_chars = {}  # key -> length of the prompt prefix shared by its episodes
+        self.uses = {}  # key -> number of episodes
+
+    def get(self, key, build: Callable[[], tuple]) -> tuple:
+        """
+        Return the cached (system_prompt, tools) for key.
+        build() is called on first use and returns (system_prompt, tools, prefix_chars).
+        """
+        with self.lock:
+            if key not in self.entries:
+                system_prompt, tools, prefix_chars = build()
+                self.entries[key] = (system_prompt, tools)
+                self.prefix_chars[key] = prefix_chars
+                self.uses[key] = 0
+            self.uses[key] += 1
+            return self.entries[key]
+
+    def stats(self) -> dict:
+        with self.lock:
+            episodes = sum(self.uses.values())
+            reused = episodes - len(self.uses)
+            shared_chars = sum((uses - 1) * self.prefix_chars[key] for key, uses in self.uses.items())
+            return {
+                "prompts": len(self.entries),
+                "episodes": episodes,
+                "reused_episodes": reused,
+                "prefix_reuse_rate": round(reused / episodes, 4) if episodes else 0.0,
+                "expected_shared_prefix_chars": round(shared_chars / reused, 1) if reused else 0.0,
+                "expected_shared_prefix_tokens": round(shared_chars / reused / 4, 1) if reused else 0.0,  # ~4 chars per token
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.prefix_chars.clear()
+            self.uses.clear()
+
+
+system_prompt_cache = SystemPromptCache()
@@ -1,9 +1,14 @@
 """
 Task solving agent for interactive environments.
 """
+import time
+import asyncio
+import functools
 from copy import deepcopy
-from agent.system_prompt_util import conversational_system_prompt, non_conversational_system_prompt,  merge_tools_into_system_prompt
-from agent.agent_llm_inference import llm_inference_fc, llm_inference_prompt
+import json
+from agent.system_prompt_util import conversational_system_prompt, non_conversational_system_prompt,  merge_tools_into_system_prompt, system_prompt_cache
+from agent.agent_llm_inference import llm_inference_fc, llm_inference_prompt, async_llm_inference_fc, async_llm_inference_prompt
+from agent.episode_trace import record_span, sum_spans
 
 
 class TaskSolveAgent:
@@ -19,7 +24,11 @@ class TaskSolveAgent:
         max_steps,
         enable_thinking,
         api_key=None,
-        base_url=None
+        base_url=None,
+        env_executor=None,
+        stop_at_tool_call=True,
+        parallel_tool_calls=False,
+        trace=False
     ):
         self.env_name = env_name
         self.env = env
@@ -33,11 +42,20 @@ class TaskSolveAgent:
         assert infer_mode in ["prompt", "fc"]  # prompt: tool use via prompts, fc: tool use via function calling interface
         self.infer_mode = infer_mode
         self.enable_thinking = enable_thinking
+        # Prompt mode: stop streaming after the first complete <tool_call> (only that one is parsed)
+        self.stop_at_tool_call = stop_at_tool_call
+        # FC mode: execute every tool call of a turn (one env step and tool message each), not only the first
+        self.parallel_tool_calls = parallel_tool_calls
+        # Async mode only: executor for envs without async_step
+        self.env_executor = env_executor
+        # Keep every timing span in the episode result (for write_chrome_trace), not only the per-phase totals
+        self.trace = trace
 
         # Runtime settings
         self.max_steps = max_steps
 
         # Runtime state
+        self.system_prompt = None  # Shared by all episodes on the same env (see SystemPromptCache)
         self.messages = []  # Conversation history
         self.current_observation = None
         self.current_info = None
@@ -49,29 +67,42 @@ class TaskSolveAgent:
         # Trajectory recording
         self.trajectory = []  # Detailed execution information for each step
 
+        # Timing spans and token usage of the episode (see agent/episode_trace.py)
+        self.spans = []
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.episode_start = None
+
     def reset(self, task_index=None):
         """Reset environment and conversation history."""
+        self._start_timing()
         # Reset environment and get initial observation
-        observation, info = self.env.reset(task_index=task_index)
+        with record_span(self.spans, "env_reset"):
+            observation, info = self.env.reset(task_index=task_index)
+        return self._start_episode(observation, info)
+
+    async def async_reset(self, task_index=None):
+        """Async version of reset."""
+        self._start_timing()
+        with record_span(self.spans, "env_reset"):
+            if hasattr(self.env, "async_reset"):
+                observation, info = await self.env.async_reset(task_index=task_index)
+            else:
+                observation, info = await self._run_in_env_executor(self.env.reset, task_index=task_index)
+        return self._start_episode(observation, info)
 
-        # Get environment introduction and available tools, build system prompt
-        self.tools = info["tools"]
+    def _start_timing(self):
+        self.spans = []
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.episode_start = time.perf_counter()
+
+    def _start_episode(self, observation, info):
+        """Build system prompt and reset conversation history from the env reset result."""
+        # Build system prompt and tools once per env and reuse the same bytes for every episode (prefix caching)
+        self.system_prompt, self.tools = system_prompt_cache.get(
+            self._prompt_cache_key(info),
+            lambda: self._build_system_prompt(info)
+        )
         self.user_tools = info.get("user_tools", [])
-        # Select system prompt based on conversation/non-conversation mode
-        if self.env_name in ["tau_bench_retail", "tau_bench_airline", "envscaler_conversation_rl", "envscaler_conversation_sft", "conv_custom_wo_reward", "acebench_multi_turn"] :
-            system_prompt = conversational_system_prompt
-        elif self.env_name in ["envscaler_non_conversation_rl", "envscaler_non_conversation_sft","bfcl", "acebench_multi_step"]:
-            system_prompt = non_conversational_system_prompt 
-        else:
-            raise RuntimeError(f"Unknown env_name: {self.env_name}")  
-        
-        # Add environment introduction to system prompt if available
-        if "env_introduction" in info and info["env_introduction"]:
-            system_prompt = f"{system_prompt}\n\nThe following is an introduction to the current environment:\n{info['env_introduction']}"       
-        
-        # In prompt mode, merge tool information into system prompt
-        if self.infer_mode == "prompt":
-            system_prompt = merge_tools_into_system_prompt(system_prompt=system_prompt, tools=info["tools"])
 
         # Extract task info for logging
         task_item = deepcopy(info["task"])
@@ -88,7 +119,7 @@ class TaskSolveAgent:
 
 
         # Initialize message history
-        self.messages = [{"role": "system", "content": system_prompt}]
+        self.messages = [{"role": "system", "content": self.system_prompt}]
         self.current_observation = deepcopy(observation)
         self.current_info = deepcopy(info)
         self.total_reward = 0.0
@@ -110,12 +141,49 @@ class TaskSolveAgent:
 
         return observation, info
 
-    def step(self):
+    def _build_system_prompt(self, info):
+        """Return (system_prompt, canonical tools, length of the prefix shared by episodes of this env)."""
+        # Select system prompt based on conversation/non-conversation mode
+        if self.env_name in ["tau_bench_retail", "tau_bench_airline", "envscaler_conversation_rl", "envscaler_conversation_sft", "conv_custom_wo_reward", "acebench_multi_turn"] :
+            system_prompt = conversational_system_prompt
+        elif self.env_name in ["envscaler_non_conversation_rl", "envscaler_non_conversation_sft","bfcl", "acebench_multi_step"]:
+            system_prompt = non_conversational_system_prompt 
+        else:
+            raise RuntimeError(f"Unknown env_name: {self.env_name}")  
+        
+        # Add environment introduction to system prompt if available
+        if "env_introduction" in info and info["env_introduction"]:
+            system_prompt = f"{system_prompt}\n\nThe following is an introduction to the current environment:\n{info['env_introduction']}"       
+        
+        tools = info["tools"]
+        # In prompt mode, merge tool information into system prompt
+        if self.infer_mode == "prompt":
+            system_prompt = merge_tools_into_system_prompt(system_prompt=system_prompt, tools=tools)
+            prefix_chars = len(system_prompt)
+        else:
+            # FC mode: the server renders the tool schemas into the prompt as well
+            prefix_chars = len(system_prompt) + len(json.dumps(tools, ensure_ascii=False))
+        return system_prompt, tools, prefix_chars
+
+    def _prompt_cache_key(self, info):
+        """Key of the system prompt cache: env_id where tools are fixed per env, else the prompt content itself."""
+        task_item = info["task"]
+        if self.env_name in ["tau_bench_retail", "tau_bench_airline"]:
+            env_key = self.env_name
+        elif isinstance(task_item, dict) and "env_id" in task_item:
+            env_key = task_item["env_id"]
+        else:
+            # e.g. bfcl / acebench, where tools depend on the task's involved classes
+            env_key = json.dumps([info.get("env_introduction"), info["tools"]], ensure_ascii=False, sort_keys=True)
+        return (self.env_name, self.infer_mode, env_key)
+
+    def step(self, max_steps=None):
         """
         Execute one environment step:
         1) Call LLM with current messages to generate response
         2) Pass LLM response as action to env.step
         3) Update conversation history, accumulated reward, trajectory, etc.
+        Parallel tool calls take one env step each, up to the remaining budget of max_steps (default self.max_steps).
         Returns: (observation, reward, terminated, truncated, info, action)
         """
 
@@ -123,34 +191,115 @@ class TaskSolveAgent:
         if self.terminated or self.truncated:
             raise RuntimeError("Environment already finished. Please reset before calling step again.")
 
+        step_spans, usage = [], {}
         # Call LLM inference (response parsing is done in env)
-        if self.infer_mode == "prompt":
-            # Prompt mode: returns LLM text (str)
-            raw_response = llm_inference_prompt(
-                provider=self.provider,
-                model=self.model,
-                messages=self.messages,
-                temperature=self.temperature,
-                enable_thinking=self.enable_thinking,
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
-            if "</think>" in raw_response:
-                raw_response = raw_response.split("</think>")[-1].strip()
-        else:
-            # FC mode: returns (reasoning_content, tool_calls, content) as dict
-            raw_response = llm_inference_fc(
-                provider=self.provider,
-                model=self.model,
-                messages=self.messages,
-                temperature=self.temperature,
-                tools=self.tools,
-                enable_thinking=self.enable_thinking,
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
-
-        # Add model output to conversation history
+        with record_span(step_spans, "agent_llm") as span_args:
+            if self.infer_mode == "prompt":
+                # Prompt mode: returns LLM text (str)
+                raw_response = llm_inference_prompt(
+                    provider=self.provider,
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=self.temperature,
+                    enable_thinking=self.enable_thinking,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    stop_at_tool_call=self.stop_at_tool_call,
+                    usage=usage
+                )
+                if "</think>" in raw_response:
+                    raw_response = raw_response.split("</think>")[-1].strip()
+            else:
+                # FC mode: returns (reasoning_content, tool_calls, content) as dict
+                raw_response = llm_inference_fc(
+                    provider=self.provider,
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=self.temperature,
+                    tools=self.tools,
+                    enable_thinking=self.enable_thinking,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    usage=usage,
+                    parallel_tool_calls=self.parallel_tool_calls
+                )
+            span_args.update(usage)
+        self._add_response_message(raw_response)
+
+        # Execute one environment step per tool call (several only with parallel_tool_calls)
+        responses = self._split_tool_calls(raw_response)
+        for executed, response in enumerate(responses[:self._remaining_steps(max_steps)], 1):
+            if raw_response == '':  # Special handling for empty response
+                step_result = self._empty_response_result()
+            else:
+                with record_span(step_spans, "env_step"):
+                    step_result = self.env.step(action=response)
+            result = self._finish_step(response, *step_result, step_spans=step_spans, usage=usage)
+            if self.terminated or self.truncated:
+                break
+            step_spans, usage = [], {}
+        self._skip_tool_calls(responses[executed:])
+        return result
+
+    async def async_step(self, max_steps=None):
+        """Async version of step: LLM calls are awaited, env steps run inline (async_step) or in env_executor."""
+        if self.terminated or self.truncated:
+            raise RuntimeError("Environment already finished. Please reset before calling step again.")
+
+        step_spans, usage = [], {}
+        with record_span(step_spans, "agent_llm") as span_args:
+            if self.infer_mode == "prompt":
+                raw_response = await async_llm_inference_prompt(
+                    provider=self.provider,
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=self.temperature,
+                    enable_thinking=self.enable_thinking,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    stop_at_tool_call=self.stop_at_tool_call,
+                    usage=usage
+                )
+                if "</think>" in raw_response:
+                    raw_response = raw_response.split("</think>")[-1].strip()
+            else:
+                raw_response = await async_llm_inference_fc(
+                    provider=self.provider,
+                    model=self.model,
+                    messages=self.messages,
+                    temperature=self.temperature,
+                    tools=self.tools,
+                    enable_thinking=self.enable_thinking,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    usage=usage,
+                    parallel_tool_calls=self.parallel_tool_calls
+                )
+            span_args.update(usage)
+        self._add_response_message(raw_response)
+
+        responses = self._split_tool_calls(raw_response)
+        for executed, response in enumerate(responses[:self._remaining_steps(max_steps)], 1):
+            if raw_response == '':
+                step_result = self._empty_response_result()
+            else:
+                with record_span(step_spans, "env_step"):
+                    if hasattr(self.env, "async_step"):
+                        step_result = await self.env.async_step(action=response)
+                    else:
+                        step_result = await self._run_in_env_executor(self.env.step, action=response)
+            result = self._finish_step(response, *step_result, step_spans=step_spans, usage=usage)
+            if self.terminated or self.truncated:
+                break
+            step_spans, usage = [], {}
+        self._skip_tool_calls(responses[executed:])
+        return result
+
+    async def _run_in_env_executor(self, fn, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.env_executor, functools.partial(fn, **kwargs))
+
+    def _add_response_message(self, raw_response):
+        """Add model output to conversation history."""
         if self.infer_mode == "prompt":
             message = {"role": "assistant", "content": raw_response}
         else:
@@ -161,13 +310,52 @@ class TaskSolveAgent:
                 message["reasoning_content"] = raw_response["reasoning_content"]
         self.messages.append(message)
 
-        # Execute one environment step
-        if raw_response == '':  # Special handling for empty response
-            print("raw_response is empty, please check the model")
-            observation, reward, terminated, truncated, info = "action is empty, please check the model", 0, True, True, {"action": ""}
-        else:
-            observation, reward, terminated, truncated, info = self.env.step(action=raw_response)
-            action = info["action"]
+    def _split_tool_calls(self, raw_response):
+        """
+        Split an FC response with several tool calls into one response per call, in the order the model emitted them.
+        Envs parse one call per step; content and reasoning stay with the first call so they are seen once.
+        The calls are executed one after another: env steps record the trajectory and state and are not thread-safe.
+        """
+        if self.infer_mode != "fc" or raw_response == '' or len(raw_response["tool_calls"]) < 2:
+            return [raw_response]
+        return [
+            {
+                "reasoning_content": raw_response["reasoning_content"] if i == 0 else "",
+                "tool_calls": [tool_call],
+                "content": raw_response["content"] if i == 0 else "",
+            }
+            for i, tool_call in enumerate(raw_response["tool_calls"])
+        ]
+
+    def _remaining_steps(self, max_steps=None) -> int:
+        """Env steps left in the budget for this turn's tool calls (at least one, the turn itself is already taken)."""
+        max_steps = max_steps if max_steps is not None else self.max_steps
+        return max(max_steps - self.step_count, 1)
+
+    def _skip_tool_calls(self, responses):
+        """
+        Answer split tool calls that were not executed (the episode ended or the step budget ran out),
+        so every tool_call_id of the assistant message still gets a tool message.
+        """
+        for response in responses:
+            tool_call = response["tool_calls"][0]
+            self.messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "name": tool_call["function"]["name"],
+                "content": "Not executed: the episode ended or ran out of steps before this tool call."
+            })
+
+    @staticmethod
+    def _empty_response_result():
+        print("raw_response is empty, please check the model")
+        return "action is empty, please check the model", 0, True, True, {"action": ""}
+
+    def _finish_step(self, raw_response, observation, reward, terminated, truncated, info, step_spans=(), usage=None):
+        """Update state, conversation history and trajectory with the env step result."""
+        action = info["action"]
+        # Phases inside env_step (tool, user_llm, snapshot, reward), if the env reports them
+        step_spans = list(step_spans) + info.pop("spans", [])
 
         # Update internal state
         self.step_count += 1
@@ -190,7 +378,7 @@ class TaskSolveAgent:
                     print("!!!!!! raw_response['tool_calls'] is empty, please check the model")
                     self.messages.append({"role": "user", "content": observation['content']})
                 else:
-                    # TODO: support for multiple function calls
+                    # One tool call per env step (parallel calls are split by _split_tool_calls)
                     tool_call_id = raw_response["tool_calls"][0]['id']
                     tool_call_name = raw_response["tool_calls"][0]['function']['name']
                     self.messages.append({"role": "tool", "tool_call_id": tool_call_id, "name": tool_call_name, "content": observation['content']})
@@ -206,7 +394,14 @@ class TaskSolveAgent:
             "terminated": terminated,
             "truncated": truncated,
             # "info": info,
+            "timing": sum_spans(step_spans),
+            "usage": usage or {},
         })
+        for span in step_spans:
+            span.setdefault("args", {})["step"] = self.step_count
+        self.spans.extend(step_spans)
+        for key, value in (usage or {}).items():
+            self.usage[key] = self.usage.get(key, 0) + value
         if "user_messages" in info:
             self.user_messages = info["user_messages"]
         return observation, reward, terminated, truncated, info, action
@@ -226,9 +421,20 @@ class TaskSolveAgent:
 
         # Loop execution
         while (not self.terminated) and (not self.truncated) and (self.step_count < max_steps):
-            self.step()
+            self.step(max_steps=max_steps)
+
+        return self._episode_result()
+
+    async def async_run(self, task_index=None, max_steps=None):
+        """Async version of run."""
+        max_steps = max_steps if max_steps is not None else self.max_steps
+        await self.async_reset(task_index=task_index)
+        while (not self.terminated) and (not self.truncated) and (self.step_count < max_steps):
+            await self.async_step(max_steps=max_steps)
+        return self._episode_result()
 
-        # Aggregate results
+    def _episode_result(self):
+        """Aggregate results of the finished episode."""
         result = {
             "task_info" : self.task_info,
             "tools": self.tools,
@@ -241,6 +447,11 @@ class TaskSolveAgent:
             "final_observation": self.current_observation,
             "final_info": self.current_info,
             "steps": self.step_count,
+            # Seconds per phase summed over the episode; nested phases (tool, user_llm, snapshot, reward) are part of env_step
+            "timing": {"total": round(time.perf_counter() - self.episode_start, 6), **sum_spans(self.spans)},
+            "usage": self.usage,
         }
+        if self.trace:
+            result["spans"] = self.spans
 
         return result
\ No newline at end of file
@@ -16,6 +16,26 @@ from .tools.bfcl_tools import INVOLVED_CLASS_TO_FUNC_DOC_PATH
 from .bfcl_reward import BfclRewrard
 
 
+# Tool names documented for each API class, loaded once at import
+CLASS_TO_TOOL_NAMES = {
+    class_name: [func["name"] for func in load_file(func_doc_path)]
+    for class_name, func_doc_path in INVOLVED_CLASS_TO_FUNC_DOC_PATH.items()
+}
+
+# API class -> public method names, computed once per class
+_CLASS_TO_METHOD_NAMES = {}
+
+
+def _public_method_names(class_instance) -> list:
+    """Public method names of an API class instance, cached per class."""
+    class_ = type(class_instance)
+    if class_ not in _CLASS_TO_METHOD_NAMES:
+        _CLASS_TO_METHOD_NAMES[class_] = [
+            method_name for method_name, _ in inspect.getmembers(class_instance, predicate=inspect.ismethod)
+            if not method_name.startswith('_')
+        ]
+    return _CLASS_TO_METHOD_NAMES[class_]
+
 
 class BfclEnv:
     """BFCL multi-turn environment for tool-calling evaluation."""
@@ -179,12 +199,7 @@ class BfclEnv:
                     raise Exception("Error in ground truth tool execution is not expected!!")
                 
                 all_func_call_results = []
-                # Build method name to class name mapping
-                method_to_instance = {}
-                for class_name, instance in self.state["ground_truth_environment"].items():
-                    for method_name, method in inspect.getmembers(instance, predicate=inspect.ismethod):
-                        if not method_name.startswith('_'):
-                            method_to_instance[method_name] = class_name
+                method_table = self.state["ground_truth_method_table"]
 
                 # Process each ground truth call string
                 for func_call in tool_json:
@@ -194,17 +209,14 @@ class BfclEnv:
                         raise Exception(f"Error in ground truth tool execution is not expected!!")
                     # Extract method name
                     method_name = func_call.split("(")[0].strip()
-                    if method_name not in method_to_instance:
+                    if method_name not in method_table:
                         print(tool_json)
                         print(func_call)
                         raise Exception(f"Error in ground truth tool execution is not expected!!")
-                    
-                    class_name = method_to_instance[method_name]
-                    instance = self.state["ground_truth_environment"][class_name]
-                    modified_call = f"self.state['ground_truth_environment']['{class_name}'].{func_call}"
-                    
+
                     try:
-                        result = eval(modified_call)
+                        # Evaluate the call string with its method name bound to the ground truth instance method
+                        result = eval(func_call, globals(), {method_name: method_table[method_name]})
                         result_str = str(result) if result is not None else "Success"
                         all_func_call_results.append(f"Function Call {func_call} Succeeded. Result: {result_str}")
                     except Exception as e:
@@ -252,22 +264,15 @@ class BfclEnv:
                 tool_call["args"] = tool_args
                 
                 # Find method in environment instances
-                found_method = False
                 if self.env_instances == {}:
                     raise Exception(f"Environment is empty")
-                for class_instance in self.state["environment"].values():
-                    if hasattr(class_instance, tool_name):
-                        found_method = True
-                        tool_func = getattr(class_instance, tool_name)
-                        break
-                
+                tool_func = self.state["method_table"].get(tool_name)
+
                 # Method not found: check available tools and report error
-                if not found_method:
+                if tool_func is None:
                     available_tools = []
                     for class_name in self.state['sample']['involved_classes']:
-                        func_doc = load_file(INVOLVED_CLASS_TO_FUNC_DOC_PATH[class_name])
-                        for func in func_doc:
-                            available_tools.append(func['name'])
+                        available_tools.extend(CLASS_TO_TOOL_NAMES[class_name])
                     if tool_name in available_tools:
                         # Tool in involved_classes but not instantiated: environment bug
                         print(f"Tool Name: {tool_name}")
@@ -395,6 +400,17 @@ class BfclEnv:
                 state["environment"][class_name] = class_instance
                 state["ground_truth_environment"][class_name] = ground_truth_class_instance
                 state["initial_environment"][class_name] = initial_instance_copy
+
+        # Method name -> bound method dispatch tables: model calls go to the first involved class
+        # defining the method, ground truth calls to the last one
+        state["method_table"] = {}
+        state["ground_truth_method_table"] = {}
+        for class_name in involved_classes:
+            class_instance = state["environment"][class_name]
+            ground_truth_class_instance = state["ground_truth_environment"][class_name]
+            for method_name in _public_method_names(class_instance):
+                state["method_table"].setdefault(method_name, getattr(class_instance, method_name))
+                state["ground_truth_method_table"][method_name] = getattr(ground_truth_class_instance, method_name)
         return state
     
     # State checking
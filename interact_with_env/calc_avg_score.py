@@ -4,6 +4,8 @@ import json
 
 def read_json(file_path):
     with open(file_path, 'r') as f:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
         data = json.load(f)
     return data
 
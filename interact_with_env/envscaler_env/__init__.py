@@ -2,9 +2,11 @@ from .rl_conv_env import EnvScalerConvRLEnv
 from .rl_non_conv_env import EnvScalerNonConvRLEnv
 from .sft_conv_env_wo_reward import EnvScalerConvSFTEnv
 from .sft_non_conv_env_wo_reward_w_task_judge import EnvScalerNonConvSFTEnv
+from .batch_env import BatchEnvScalerEnv
 
 __all__ = [
     "EnvScalerConvRLEnv", 
     "EnvScalerNonConvRLEnv",
     "EnvScalerConvSFTEnv", 
-    "EnvScalerNonConvSFTEnv",]
\ No newline at end of file
+    "EnvScalerNonConvSFTEnv",
+    "BatchEnvScalerEnv",]
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Batched EnvScaler environment: drive many episodes through one object.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from envscaler_env.utils.env_util import run_check_functions
+from envscaler_env.utils.check_executor import get_check_executor
+from .base_env import EnvScalerBaseEnv
+
+
+class BatchEnvScalerEnv:
+    """
+    Vector-style wrapper over N episodes of an EnvScalerBaseEnv subclass:
+    - reset_batch / step_batch take and return one entry per episode (lists of length num_envs)
+    - Actions of all episodes are parsed and dispatched in one pass
+    - Rewards of the episodes finishing in a step are computed together (one check-executor batch)
+    Finished episodes are skipped until the next reset_batch; their entries are
+    (None, 0.0, True, False, {}).
+
+    :param env_cls: EnvScalerBaseEnv subclass, e.g. EnvScalerNonConvRLEnv
+    :param num_envs: Number of episodes managed by this object
+    :param max_workers: Threads used to dispatch actions (useful when chat_with_user calls a user LLM), None for inline
+    :param env_config: Keyword arguments passed to every env_cls instance
+    """
+
+    def __init__(self, env_cls, num_envs: int, max_workers: int = None, **env_config):
+        if not issubclass(env_cls, EnvScalerBaseEnv):
+            raise ValueError(f"env_cls must be a subclass of EnvScalerBaseEnv, got {env_cls.__name__}")
+        self.num_envs = num_envs
+        self.max_workers = max_workers
+        # Metadata is memory-mapped and check functions are compiled once per process,
+        # so the per-episode objects only hold episode state
+        self.envs = [env_cls(**env_config) for _ in range(num_envs)]
+        self.dones = [True] * num_envs
+
+    def _map(self, fn, items: list) -> list:
+        if self.max_workers is None or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fn, items))
+
+    def _check_length(self, values: list, name: str):
+        if len(values) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} {name}, got {len(values)}")
+
+    def reset_batch(self, task_indices: list, seed=None):
+        """
+        Reset every episode; a None task index picks a random task.
+        Return lists of initial observations and infos.
+        """
+        self._check_length(task_indices, "task indices")
+        if seed is not None:
+            random.seed(seed)
+        results = self._map(
+            lambda item: item[0].reset(task_index=item[1]),
+            list(zip(self.envs, task_indices))
+        )
+        self.dones = [False] * self.num_envs
+        observations = [observation for observation, _ in results]
+        infos = [info for _, info in results]
+        return observations, infos
+
+    def step_batch(self, actions: list):
+        """
+        Step every unfinished episode with its action.
+        Return lists of observations, rewards, terminateds, truncateds and infos.
+        """
+        self._check_length(actions, "actions")
+        active = [i for i in range(self.num_envs) if not self.dones[i]]
+
+        # Parse and execute all actions
+        applied = dict(zip(active, self._map(
+            lambda i: self.envs[i].apply_action(actions[i]),
+            active
+        )))
+
+        # Compute rewards of all finished episodes together
+        rewards = self._calculate_rewards([i for i in active if applied[i][5]])
+
+        observations = [None] * self.num_envs
+        step_rewards = [0.0] * self.num_envs
+        terminateds = [True] * self.num_envs
+        truncateds = [False] * self.num_envs
+        infos = [{} for _ in range(self.num_envs)]
+        for i in active:
+            action, observation, terminated, truncated, info, _ = applied[i]
+            observations[i], step_rewards[i], terminateds[i], truncateds[i], infos[i] = self.envs[i].finish_step(
+                action, observation, rewards.get(i, 0.0), terminated, truncated, info
+            )
+            self.dones[i] = terminated or truncated
+        return observations, step_rewards, terminateds, truncateds, infos
+
+    def _calculate_rewards(self, indices: list) -> dict:
+        """Return {episode index: reward} for episodes whose pred_final_state is recorded."""
+        if not indices:
+            return {}
+        jobs = [
+            (
+                [check_item["check_func"] for check_item in self.envs[i].checklist_with_func],
+                self.envs[i].init_state,
+                self.envs[i].pred_final_state,
+            )
+            for i in indices
+        ]
+        check_timeout = self.envs[indices[0]].check_timeout
+        if check_timeout is not None:
+            # One batch over the worker pool for every finished episode
+            all_check_results = get_check_executor().run_batch(jobs, timeout=check_timeout)
+        else:
+            all_check_results = [
+                run_check_functions(func_codes=func_codes, init_state=init_state, final_state=final_state)
+                for func_codes, init_state, final_state in jobs
+            ]
+        return {
+            i: self.envs[i].score_check_results(self.envs[i].checklist_with_func, check_results)
+            for i, check_results in zip(indices, all_check_results)
+        }
@@ -7,7 +7,7 @@ from .base_env import EnvScalerBaseEnv
 class EnvScalerConvRLEnv(EnvScalerBaseEnv):
     """Conversational RL environment that uses UserAgent for multi-turn dialogue."""
     
-    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None, api_key=None, base_url=None):
+    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None, api_key=None, base_url=None, track_mutations=False, check_timeout=None, pool_instances=False):
         self.user_agent = UserAgent(
             system_prompt=user_system_prompt,
             model=user_model,
@@ -15,12 +15,16 @@ class EnvScalerConvRLEnv(EnvScalerBaseEnv):
             api_key=api_key,
             base_url=base_url
         )
-        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path)
+        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path, track_mutations=track_mutations, check_timeout=check_timeout, pool_instances=pool_instances)
 
     def get_initial_observation(self, task_item: dict):
         """Get initial observation from user agent's first reply."""
         return self.user_agent.get_init_reply(task=task_item['task'])
 
+    async def async_get_initial_observation(self, task_item: dict):
+        """Async version of get_initial_observation."""
+        return await self.user_agent.async_get_init_reply(task=task_item['task'])
+
     def is_action_terminated(self, action: dict):
         """Conversation mode does not rely on action for termination."""
         return False
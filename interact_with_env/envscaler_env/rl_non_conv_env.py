@@ -6,8 +6,8 @@ from .base_env import EnvScalerBaseEnv
 class EnvScalerNonConvRLEnv(EnvScalerBaseEnv):
     """Non-conversational RL environment where termination is handled by action agent."""
     
-    def __init__(self, mode, env_items_path=None, task_items_path=None):
-        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path)
+    def __init__(self, mode, env_items_path=None, task_items_path=None, track_mutations=False, check_timeout=None, pool_instances=False):
+        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path, track_mutations=track_mutations, check_timeout=check_timeout, pool_instances=pool_instances)
         
     def get_initial_observation(self, task_item: dict):
         """Return task description as initial observation."""
@@ -2,19 +2,23 @@
 Conversational SFT environment without reward calculation.
 """
 import os
-import json
 import random
 import traceback
 from copy import deepcopy
 
 from envscaler_env.utils.env_util import (
-    init_env_class,
+    get_env_class,
     init_env_instance,
     get_state_diff,
+    get_tracked_state_diff,
     get_state_info,
+    StateSnapshotEngine,
     run_check_function,
 )
 from envscaler_env.utils.parse_util import parse_response, parse_action
+from envscaler_env.utils.mutation_util import MutationTracker
+from envscaler_env.utils.traj_util import DeltaTrajectory
+from envscaler_env.utils.metadata_store import load_metadata
 from envscaler_env.utils.user_agent import UserAgent, user_system_prompt
 
 
@@ -26,8 +30,10 @@ class EnvScalerConvSFTEnv:
     - Records trajectory (no reward calculation for SFT)
     """
 
-    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None, api_key=None, base_url=None):
+    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None, api_key=None, base_url=None, track_mutations=False):
         self.mode = mode
+        # Opt-in: track tool-call mutations so snapshots/diffs only visit touched paths
+        self.track_mutations = track_mutations
         self.user_agent = UserAgent(
             system_prompt=user_system_prompt,
             model=user_model,
@@ -38,12 +44,12 @@ class EnvScalerConvSFTEnv:
 
         # Load task dataset and environment dataset
         if task_items_path is not None:
-            self.task_items = json.load(open(task_items_path, encoding="utf-8"))
+            self.task_items = load_metadata(task_items_path, key_field="task_id")
             print(f"Ignore the mode {self.mode}.\nLoad task_items from {task_items_path}, total {len(self.task_items)} tasks!")
         else:
             self.task_items = self.load_task_items()
         if env_items_path is not None:
-            self.env_items = json.load(open(env_items_path, encoding="utf-8"))
+            self.env_items = load_metadata(env_items_path)
             print(f"Load env_items from {env_items_path}, total {len(self.env_items)} envs!")
         else:
             self.env_items = self.load_env_items()
@@ -59,8 +65,7 @@ class EnvScalerConvSFTEnv:
         """Load environment dataset."""
         folder_path = os.path.join(os.path.dirname(__file__), "data")
         env_items_path = os.path.join(folder_path, "env_v1_85_brief.json")
-        with open(env_items_path, encoding="utf-8") as f:
-            env_items = json.load(f)
+        env_items = load_metadata(env_items_path)
 
         print(f"Load {len(env_items)} envs from {env_items_path}!")
         return env_items
@@ -77,8 +82,7 @@ class EnvScalerConvSFTEnv:
         else:
             raise ValueError("mode must be eval or train")
 
-        with open(task_items_path, encoding="utf-8") as f:
-            task_items = json.load(f)
+        task_items = load_metadata(task_items_path, key_field="task_id")
 
         print(f"Load {len(task_items)} tasks from {task_items_path}!")
         return task_items
@@ -91,13 +95,16 @@ class EnvScalerConvSFTEnv:
         """Reset class attributes (logs and environment state)."""
         # Log related
         self.current_step = 0
-        self.trajectory = []
+        # Base snapshot + per-step state deltas, indexable like a list of step records
+        self.trajectory = DeltaTrajectory()
 
         # Environment related
         self.env_item = None
         self.env_class = None
         self.env_instance = None
         self.system_prompt = None
+        self.snapshot_engine = None
+        self.mutation_tracker = None
 
         # Scenario related (initial state, task item, check functions, etc.)
         self.init_config = None
@@ -146,16 +153,19 @@ class EnvScalerConvSFTEnv:
         self.env_item = self.env_items[env_id]
         env_class_code = self.env_item["env_class_code"]
         env_class_name = self.task_item["env_class_name"]
-        # Initialize environment class and instance
-        self.env_class = init_env_class(env_class_code, env_class_name)
+        # Get (cached) environment class and initialize instance
+        self.env_class = get_env_class(env_class_code, env_class_name)
         self.env_instance = init_env_instance(self.env_class, init_config)
         # Save initial state
         self.init_state = get_state_info(self.env_instance)
-        # Initial trajectory record
+        # Initial trajectory record (later snapshots share unchanged subtrees with it)
+        self.snapshot_engine = StateSnapshotEngine()
         self.trajectory.append({
             "step": 0,
-            "state_snapshot": deepcopy(self.init_state)
+            "state_snapshot": self.snapshot_engine.snapshot(self.env_instance)
         })
+        if self.track_mutations:
+            self.mutation_tracker = MutationTracker(self.env_instance)
 
     # ==============================
     # Environment interaction step
@@ -246,8 +256,13 @@ class EnvScalerConvSFTEnv:
     def _record_step(self, action, observation, terminated, reward):
         """Record current step trajectory."""
         last_state = self.trajectory[-1]["state_snapshot"]
-        current_state = get_state_info(self.env_instance)
-        state_diff = get_state_diff(last_state, current_state)
+        if self.mutation_tracker is not None:
+            touched = self.mutation_tracker.collect()
+            current_state = self.snapshot_engine.snapshot(self.env_instance, touched=touched)
+            state_diff = get_tracked_state_diff(last_state, current_state, touched)
+        else:
+            current_state = self.snapshot_engine.snapshot(self.env_instance)
+            state_diff = get_state_diff(last_state, current_state)
         self.trajectory.append({
             "step": self.current_step,
             "action": action,
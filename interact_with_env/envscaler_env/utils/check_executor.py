@@ -0,0 +1,390 @@
+"""
+Process-isolated execution of check functions.
+
+Check functions are LLM-generated code; running them in the rollout process means an
+infinite loop or a huge allocation stalls the whole worker. CheckExecutor runs them in
+a pool of subprocesses with a per-call wall-clock timeout and an address-space limit.
+
+States are pickled once per trajectory (protocol 5, large buffers sent out-of-band over
+the worker pipe) and sent to each worker at most once; all checks of that trajectory
+on the worker reuse one read-only view.
+"""
+import os
+import time
+import pickle
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+from envscaler_env.utils.env_util import UnfreezableStateError, freeze_state, run_check_functions
+
+# Error reported for checks that exceeded the wall-clock timeout
+CHECK_TIMEOUT_ERROR = "Check function timed out."
+
+# Error reported for checks that could not run because workers keep dying on startup
+CHECK_WORKER_START_ERROR = "Check worker failed to start."
+
+# Consecutive worker startup failures after which no new workers are started
+MAX_START_FAILURES = 3
+
+
+def is_check_timeout(check_result) -> bool:
+    """Return True if a (success, result, error) tuple is a timeout."""
+    return check_result[2] == CHECK_TIMEOUT_ERROR
+
+
+def _set_memory_limit(memory_limit_mb):
+    """Limit the worker's address space to its current size plus memory_limit_mb."""
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (ImportError, OSError, ValueError):
+        return
+    limit = baseline + int(memory_limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Worker loop: receive states and checks, send back (job_id, result)."""
+    _set_memory_limit(memory_limit_mb)
+    conn.send(("ready",))
+    states = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == "state":
+            _, key, num_buffers = message
+            data = conn.recv_bytes()
+            buffers = [conn.recv_bytes() for _ in range(num_buffers)]
+            try:
+                init_state, final_state = pickle.loads(data, buffers=buffers)
+                try:
+                    states[key] = (freeze_state(init_state), freeze_state(final_state))
+                except UnfreezableStateError:
+                    # run_check_functions gives each check private copies of these
+                    states[key] = (init_state, final_state)
+            except MemoryError:
+                states[key] = MemoryError("Out of memory while loading state.")
+        elif kind == "check":
+            _, job_id, key, func_code = message
+            views = states.get(key)
+            if isinstance(views, Exception):
+                result = (False, None, str(views))
+            else:
+                try:
+                    result = run_check_functions([func_code], views[0], views[1])[0]
+                except MemoryError as e:
+                    result = (False, None, f"MemoryError: {e}")
+            conn.send((job_id, result))
+        elif kind == "drop":
+            states.pop(message[1], None)
+        elif kind == "stop":
+            break
+
+
+class _Worker:
+    """Handle on one worker process. Used by one run_batch call at a time (checked out from the pool)."""
+
+    def __init__(self, ctx, memory_limit_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.state_keys = set()
+        self.job = None
+        self.deadline = None
+
+    def send_state(self, key, payload):
+        data, buffers = payload
+        self.conn.send(("state", key, len(buffers)))
+        self.conn.send_bytes(data)
+        for buffer in buffers:
+            self.conn.send_bytes(buffer)
+        self.state_keys.add(key)
+
+    def drop(self, key):
+        self.state_keys.discard(key)
+        try:
+            self.conn.send(("drop", key))
+        except (OSError, EOFError):
+            pass  # A dead worker is noticed (and replaced) on its next check
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        finally:
+            self.conn.close()
+
+
+class CheckExecutor:
+    """
+    Pool of subprocesses evaluating check functions with timeouts and memory limits.
+
+    Concurrent run/run_batch calls share the pool: each call checks out idle workers
+    and returns them when it has no more checks for them (or another call is waiting),
+    so a slow or hanging check only holds its own worker.
+
+    :param num_workers: Number of worker processes
+    :param timeout: Default wall-clock limit (seconds) per check function call
+    :param memory_limit_mb: Extra address space (MB) each worker may allocate, None for no limit
+    """
+
+    def __init__(self, num_workers: int = 4, timeout: float = 10.0, memory_limit_mb: int = 1024, mp_context: str = None):
+        self.num_workers = num_workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        if mp_context is None:
+            # Fork workers from a small server process with this module preloaded, so
+            # (re)starts are fast and do not inherit the rollout process's memory
+            mp_context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(mp_context)
+        if mp_context == "forkserver":
+            self._ctx.set_forkserver_preload([__name__])
+        self._workers = []  # all live workers
+        self._idle = []  # workers not checked out by any call
+        self._lock = threading.Lock()
+        self._worker_returned = threading.Condition(self._lock)
+        self._num_waiting = 0
+        self._start_failures = 0  # consecutive workers that died before becoming ready
+        self.num_checks = 0
+        self.num_timeouts = 0
+        self.num_restarts = 0
+
+    def _new_worker(self):
+        """Start a worker (lock held); None once workers keep dying on startup."""
+        if self._start_failures >= MAX_START_FAILURES:
+            return None
+        worker = _Worker(self._ctx, self.memory_limit_mb)
+        self._workers.append(worker)
+        return worker
+
+    def _check_out(self, count: int, block: bool) -> list:
+        """Take up to count idle or new workers; with block, wait until at least one is available."""
+        with self._lock:
+            if not block and self._num_waiting:
+                return []  # Calls holding no worker go first
+            while True:
+                taken = []
+                while len(taken) < count and self._idle:
+                    taken.append(self._idle.pop())
+                while len(taken) < count and len(self._workers) < self.num_workers:
+                    worker = self._new_worker()
+                    if worker is None:
+                        break
+                    taken.append(worker)
+                if taken or not block or (not self._workers and self._start_failures >= MAX_START_FAILURES):
+                    return taken
+                self._num_waiting += 1
+                self._worker_returned.wait()
+                self._num_waiting -= 1
+
+    def _check_in(self, worker):
+        """Return an idle worker to the pool, dropping the states it holds for the returning call."""
+        for key in list(worker.state_keys):
+            worker.drop(key)
+        with self._lock:
+            self._idle.append(worker)
+            self._worker_returned.notify()
+
+    def _retire(self, worker):
+        """Kill a worker and remove it from the pool."""
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self._worker_returned.notify()
+
+    def _restart(self, worker, start_failed: bool = False):
+        """Kill a worker and start a replacement (owned by the caller); None if no more workers can start."""
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if start_failed:
+                self._start_failures += 1
+            self.num_restarts += 1
+            replacement = self._new_worker()
+            self._worker_returned.notify()
+            return replacement
+
+    def run(self, func_codes: list, init_state: dict, final_state: dict, timeout: float = None) -> list:
+        """Run the check functions of one trajectory; returns list of (success, result, error)."""
+        return self.run_batch([(func_codes, init_state, final_state)], timeout=timeout)[0]
+
+    def run_batch(self, jobs: list, timeout: float = None) -> list:
+        """
+        Run the checklists of many trajectories across the pool.
+
+        :param jobs: list of (func_codes, init_state, final_state)
+        :return: per job, list of (success, result, error); timeouts use CHECK_TIMEOUT_ERROR
+        """
+        timeout = self.timeout if timeout is None else timeout
+        # Serialize each trajectory's states once (pickle 5, out-of-band buffers)
+        payloads = []
+        for _, init_state, final_state in jobs:
+            buffers = []
+            data = pickle.dumps((init_state, final_state), protocol=5, buffer_callback=buffers.append)
+            payloads.append((data, [buffer.raw() for buffer in buffers]))
+
+        results = [[None] * len(func_codes) for func_codes, _, _ in jobs]
+        remaining = [len(func_codes) for func_codes, _, _ in jobs]
+        pending = deque(
+            (job_index, check_index, func_code)
+            for job_index, (func_codes, _, _) in enumerate(jobs)
+            for check_index, func_code in enumerate(func_codes)
+        )
+        batch_id = id(results)
+        workers = []  # checked out by this call
+
+        def finish(worker, result):
+            job_index, check_index = worker.job
+            results[job_index][check_index] = result
+            remaining[job_index] -= 1
+            worker.job = None
+            if remaining[job_index] == 0:
+                key = (batch_id, job_index)
+                for other in workers:
+                    if key in other.state_keys:
+                        other.drop(key)
+
+        def replace(worker, start_failed=False):
+            replacement = self._restart(worker, start_failed)
+            workers.remove(worker)
+            if replacement is not None:
+                workers.append(replacement)
+
+        try:
+            while pending or any(worker.job is not None for worker in workers):
+                if pending:
+                    needed = len(pending) - sum(1 for worker in workers if worker.job is None)
+                    if needed > 0:
+                        workers.extend(self._check_out(needed, block=not workers))
+                    if not workers:
+                        # No worker can start: report the remaining checks instead of retrying forever
+                        for job_index, check_index, _ in pending:
+                            results[job_index][check_index] = (False, None, CHECK_WORKER_START_ERROR)
+                        pending.clear()
+                        break
+
+                # Dispatch to idle workers, preferring checks whose state the worker already holds
+                for worker in list(workers):
+                    if not worker.ready or worker.job is not None or not pending:
+                        continue
+                    job = next((item for item in pending if (batch_id, item[0]) in worker.state_keys), pending[0])
+                    pending.remove(job)
+                    job_index, check_index, func_code = job
+                    key = (batch_id, job_index)
+                    worker.job = (job_index, check_index)
+                    try:
+                        if key not in worker.state_keys:
+                            worker.send_state(key, payloads[job_index])
+                        worker.conn.send(("check", (job_index, check_index), key, func_code))
+                    except (OSError, EOFError):
+                        # Worker died (e.g. killed by the OS), report and replace it
+                        finish(worker, (False, None, "Check worker crashed."))
+                        replace(worker)
+                        continue
+                    worker.deadline = time.monotonic() + timeout
+                    with self._lock:
+                        self.num_checks += 1
+
+                # Wait for results, timeouts, or starting workers becoming ready
+                busy = [worker for worker in workers if worker.job is not None]
+                starting = [worker for worker in workers if not worker.ready]
+                if busy or starting:
+                    wait_timeout = max(0.0, min(worker.deadline for worker in busy) - time.monotonic()) if busy else None
+                    ready = wait([worker.conn for worker in busy + starting], timeout=wait_timeout)
+                else:
+                    ready = []
+                for worker in starting:
+                    if worker.conn in ready:
+                        try:
+                            worker.conn.recv()
+                        except (EOFError, OSError):
+                            replace(worker, start_failed=True)
+                            continue
+                        worker.ready = True
+                        with self._lock:
+                            self._start_failures = 0
+                for worker in busy:
+                    if worker.conn in ready:
+                        try:
+                            _, result = worker.conn.recv()
+                        except (EOFError, OSError):
+                            # Worker died (e.g. killed by the OS), report and replace it
+                            finish(worker, (False, None, "Check worker crashed."))
+                            replace(worker)
+                            continue
+                        finish(worker, result)
+                    elif time.monotonic() >= worker.deadline:
+                        with self._lock:
+                            self.num_timeouts += 1
+                        finish(worker, (False, None, CHECK_TIMEOUT_ERROR))
+                        replace(worker)
+
+                # Hand back workers this call has no check for, or one spare worker to a waiting call
+                for worker in list(workers):
+                    if worker.job is None and (not pending or (self._num_waiting and len(workers) > 1)):
+                        workers.remove(worker)
+                        self._check_in(worker)
+            return results
+        finally:
+            for worker in workers:
+                if worker.job is None:
+                    self._check_in(worker)
+                else:
+                    # Interrupted mid-check: its result would arrive for a call that is gone
+                    self._retire(worker)
+
+    def stats(self) -> dict:
+        """Return check/timeout/restart counters."""
+        return {
+            "num_workers": self.num_workers,
+            "num_checks": self.num_checks,
+            "num_timeouts": self.num_timeouts,
+            "num_restarts": self.num_restarts,
+        }
+
+    def close(self):
+        """Stop all worker processes."""
+        with self._lock:
+            self._idle = []
+            for worker in self._workers:
+                try:
+                    worker.conn.send(("stop",))
+                except (OSError, ValueError):
+                    pass
+                worker.process.join(timeout=1)
+                if worker.process.is_alive():
+                    worker.kill()
+            self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_check_executor() -> CheckExecutor:
+    """Return the process-wide CheckExecutor (created on first use)."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = CheckExecutor(num_workers=min(4, os.cpu_count() or 1))
+            atexit.register(_shared_executor.close)
+        return _shared_executor
@@ -0,0 +1,19 @@
+"""
+Timing spans of env step phases (tool, user_llm, snapshot, reward).
+
+Spans of one step are returned to the agent in info["spans"], in the same format as
+agent/episode_trace.py: {"name", "start" (wall-clock seconds), "duration" (seconds)}.
+"""
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def record_span(spans: list, name: str):
+    """Append a span covering the with-block to spans."""
+    start = time.time()
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append({"name": name, "start": start, "duration": time.perf_counter() - begin})
@@ -0,0 +1,210 @@
+"""
+Delta-encoded trajectory storage.
+
+Instead of a full `state_snapshot` per step, a trajectory keeps one base snapshot plus
+a per-step `state_delta` (list of path operations). Any step's state is materialized on
+demand. `DeltaTrajectory` behaves like the plain trajectory list (indexing, iteration,
+append), so existing readers of `trajectory[i]["state_snapshot"]` keep working.
+
+Delta operations (JSON serializable):
+    ["set", path, value]   # path is a list of dict keys, [] means the whole state
+    ["del", path]
+"""
+from copy import deepcopy
+
+COMPACT_FORMAT = "delta_v1"
+
+
+def _strict_equal(a, b) -> bool:
+    """Equality that also distinguishes 1 / 1.0 / True (they serialize differently)."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if type(a) is dict:
+        return len(a) == len(b) and list(a) == list(b) and all(_strict_equal(a[k], b[k]) for k in a)
+    if type(a) is list:
+        return len(a) == len(b) and all(_strict_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def compute_state_delta(old_state, new_state, path=None) -> list:
+    """
+    Return the list of operations turning old_state into new_state.
+
+    Dicts are diffed key by key (subtrees shared by identity are skipped); lists and
+    other values are replaced whole. Key order is preserved on apply.
+    """
+    path = path or []
+    if old_state is new_state:
+        return []
+    if type(old_state) is not dict or type(new_state) is not dict:
+        return [] if _strict_equal(old_state, new_state) else [["set", path, new_state]]
+
+    delta = []
+    for key in old_state:
+        if key not in new_state:
+            delta.append(["del", path + [key]])
+    for key, value in new_state.items():
+        if key not in old_state:
+            delta.append(["set", path + [key], value])
+        else:
+            delta.extend(compute_state_delta(old_state[key], value, path + [key]))
+
+    # Applying the ops keeps surviving keys in place and appends new ones;
+    # if that does not reproduce new_state's key order, replace the dict whole
+    if delta:
+        expected_order = [k for k in old_state if k in new_state] + [k for k in new_state if k not in old_state]
+        if expected_order != list(new_state):
+            return [["set", path, new_state]]
+    elif list(old_state) != list(new_state):
+        return [["set", path, new_state]]
+    return delta
+
+
+def apply_state_delta(state, delta: list):
+    """
+    Return the state obtained by applying delta to state.
+
+    The input state is not modified; containers along changed paths are copied and
+    everything else is shared.
+    """
+    copied = set()
+
+    def writable(container):
+        if id(container) in copied:
+            return container
+        container = dict(container)
+        copied.add(id(container))
+        return container
+
+    for op in delta:
+        path = op[1]
+        if not path:
+            state = op[2]
+            continue
+        root = writable(state)
+        parent = root
+        for key in path[:-1]:
+            child = writable(parent[key])
+            parent[key] = child
+            parent = child
+        if op[0] == "set":
+            parent[path[-1]] = op[2]
+        else:
+            parent.pop(path[-1], None)
+        state = root
+    return state
+
+
+class DeltaTrajectory:
+    """
+    List-like trajectory that stores state as a base snapshot plus per-step deltas.
+
+    Records are appended in today's format (with "state_snapshot"); the snapshot is
+    replaced by a "state_delta" against the previous step. Indexing returns records
+    with "state_snapshot" materialized lazily. Snapshots must be treated as read-only.
+    """
+
+    def __init__(self):
+        self.base_snapshot = None
+        self.records = []          # records without state_snapshot, each with state_delta
+        self._latest = None        # (index, snapshot) of the last appended record
+        self._cached = None        # (index, snapshot) of the last materialized record
+
+    def append(self, record: dict):
+        record = dict(record)
+        snapshot = record.pop("state_snapshot")
+        if not self.records:
+            self.base_snapshot = snapshot
+            record["state_delta"] = []
+        else:
+            record["state_delta"] = compute_state_delta(self._latest[1], snapshot)
+        self.records.append(record)
+        self._latest = (len(self.records) - 1, snapshot)
+
+    def get_state(self, index: int):
+        """Materialize the state snapshot at a given step index."""
+        index = range(len(self.records))[index]
+        if self._latest is not None and index == self._latest[0]:
+            return self._latest[1]
+        if self._cached is not None and self._cached[0] <= index:
+            start, state = self._cached
+        else:
+            start, state = 0, self.base_snapshot
+        for i in range(start + 1, index + 1):
+            state = apply_state_delta(state, self.records[i]["state_delta"])
+        self._cached = (index, state)
+        return state
+
+    def _materialize(self, index: int) -> dict:
+        record = {k: v for k, v in self.records[index].items() if k != "state_delta"}
+        # Keep today's key order: state_snapshot comes before state_diff
+        result = {}
+        for key, value in record.items():
+            if key == "state_diff":
+                result["state_snapshot"] = self.get_state(index)
+            result[key] = value
+        if "state_snapshot" not in result:
+            result["state_snapshot"] = self.get_state(index)
+        return result
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(len(self.records))[index]]
+        return self._materialize(range(len(self.records))[index])
+
+    def __iter__(self):
+        for i in range(len(self.records)):
+            yield self._materialize(i)
+
+    def to_list(self) -> list:
+        """Return trajectory in today's format (full state_snapshot per step)."""
+        return deepcopy(list(self))
+
+    def to_dict(self) -> dict:
+        """Return compact, JSON-serializable form."""
+        return {
+            "format": COMPACT_FORMAT,
+            "base_snapshot": self.base_snapshot,
+            "steps": self.records,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Build from compact form (see to_dict)."""
+        if data.get("format") != COMPACT_FORMAT:
+            raise ValueError(f"Unknown trajectory format: {data.get('format')}")
+        trajectory = cls()
+        trajectory.base_snapshot = data["base_snapshot"]
+        trajectory.records = list(data["steps"])
+        if trajectory.records:
+            last = len(trajectory.records) - 1
+            trajectory._latest = (last, trajectory.get_state(last))
+        return trajectory
+
+    @classmethod
+    def from_list(cls, trajectory: list):
+        """Build from today's format (full state_snapshot per step)."""
+        result = cls()
+        for record in trajectory:
+            result.append(record)
+        return result
+
+
+def compact_trajectory(trajectory: list) -> dict:
+    """Convert a full-snapshot trajectory list to compact delta form."""
+    return DeltaTrajectory.from_list(trajectory).to_dict()
+
+
+def expand_trajectory(data) -> list:
+    """Convert compact delta form back to a full-snapshot trajectory list (plain lists pass through)."""
+    if isinstance(data, list):
+        return data
+    return DeltaTrajectory.from_dict(data).to_list()
@@ -7,7 +7,7 @@ In user's messages:
 """
 import re
 from copy import deepcopy
-from envscaler_env.utils.user_llm_inference import llm_inference
+from envscaler_env.utils.user_llm_inference import llm_inference, async_llm_inference
 
 # --------------------------------------------------------------------
 # System Prompt (User Agent)
@@ -61,13 +61,23 @@ class UserAgent:
 
     def get_init_reply(self, task):
         """Get initial user reply based on task."""
+        self._start_conversation(task)
+        # Get initial user content
+        return self._record_init_reply(*self._infer())
+
+    async def async_get_init_reply(self, task):
+        """Async version of get_init_reply."""
+        self._start_conversation(task)
+        return self._record_init_reply(*await self._async_infer())
+
+    def _start_conversation(self, task):
         self.conversations = []
         self.messages = [
             {"role": "system", "content": self.system_prompt.format(task=task)},
             {"role": "user", "content": "[Agent] Hi! How can I help you today?"},
         ]
-        # Get initial user content
-        raw_response, user_content = self._infer()
+
+    def _record_init_reply(self, raw_response, user_content):
         self.messages.append({"role": "assistant", "content": raw_response})
         user_content = f"{user_content}"
         self.conversations.append({"user": user_content})
@@ -76,10 +86,20 @@ class UserAgent:
 
     def user_step(self, agent_response):
         """Process agent response and return user reply."""
+        self._record_agent_response(agent_response)
+        return self._record_user_reply(*self._infer())
+
+    async def async_user_step(self, agent_response):
+        """Async version of user_step."""
+        self._record_agent_response(agent_response)
+        return self._record_user_reply(*await self._async_infer())
+
+    def _record_agent_response(self, agent_response):
         agent_response = f"[Agent] {agent_response}"
         self.messages.append({"role": "user", "content": agent_response})
         self.conversations.append({"agent": agent_response})
-        raw_response, user_content = self._infer()
+
+    def _record_user_reply(self, raw_response, user_content):
         user_content = f"{user_content}"
         self.messages.append({"role": "assistant", "content": raw_response})
         self.conversations.append({"user": user_content})
@@ -103,6 +123,24 @@ class UserAgent:
             if parse_success:
                 break
         return raw_response, user_content
+
+    async def _async_infer(self):
+        """Async version of _infer."""
+        cur_try = 0
+        max_try = 5
+        while cur_try < max_try:
+            cur_try += 1
+            raw_response = await async_llm_inference(
+                model=self.model,
+                messages=self.messages,
+                provider=self.provider,
+                api_key=self.api_key,
+                base_url=self.base_url
+            )
+            parse_success, user_content = self._parse_response(raw_response)
+            if parse_success:
+                break
+        return raw_response, user_content
     
     def _parse_response(self, text: str):
         """
@@ -0,0 +1,394 @@
+"""
+Local OpenAI-compatible stand-in server for offline, deterministic benchmarking.
+
+Point any component at it with OPENAI_BASE_URL / USER_OPENAI_BASE_URL=http://127.0.0.1:8000/v1
+(run_main.py, skel_builder/stage3_check_env/step2_roll_check.py, the RL env manager, ...).
+
+Modes:
+- record: forward each request to --upstream and append the completion to --record-file
+- replay: answer from --record-file by request hash; misses are synthesized (--on-miss synth) or rejected (--on-miss error)
+- synth:  synthesize every answer from the request hash with the latency / token-rate model below;
+          tool calls are FC tool_calls, or <tool_call></tool_call> content when the tools are in the system prompt
+
+Requests are matched by a hash of the request body without stream options. The n-th identical
+request gets the n-th recorded answer, so a recorded run replays in the same order.
+Answers are always recorded non-streaming and re-streamed on demand, so one recording serves both
+streaming and non-streaming callers, including FC tool_calls deltas.
+
+Timing (--latency synth, the default for synth mode): time to first token ~ N(ttft_mean, ttft_std),
+decode speed ~ N(tokens_per_sec_mean, tokens_per_sec_std), output length ~ N(output_tokens_mean, output_tokens_std),
+all drawn from a RNG seeded by the request hash and --seed.
+--latency recorded replays the recorded total latency, --latency none answers immediately.
+
+Usage:
+    python replay_llm_server.py --mode record --upstream https://api.openai.com/v1 --record-file records.jsonl
+    python replay_llm_server.py --mode replay --record-file records.jsonl --latency none
+    python replay_llm_server.py --mode synth --ttft-mean 0.3 --tokens-per-sec-mean 60
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Request fields that do not change the answer
+_UNHASHED_FIELDS = ("stream", "stream_options", "user")
+
+_WORDS = (
+    "the environment state task user agent tool call result order account record update check "
+    "value list item status request response data field system information please confirm"
+).split()
+
+
+def request_hash(body: dict) -> str:
+    """Hash of a chat/embedding request body, ignoring stream options."""
+    payload = {k: v for k, v in body.items() if k not in _UNHASHED_FIELDS}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def split_tokens(text: str) -> list:
+    """Split text into pseudo tokens (a word with its trailing whitespace) for streaming."""
+    return re.findall(r"\s*\S+\s*", text) or ([text] if text else [])
+
+
+class RecordStore:
+    """Append-only JSONL file of recorded answers: request hash -> list of answers in request order."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = defaultdict(list)
+        self.occurrences = defaultdict(int)
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record["hash"]].append(record)
+            print(f"Load {sum(len(v) for v in self.records.values())} records from {path}")
+
+    def next_occurrence(self, key: str) -> int:
+        with self.lock:
+            occurrence = self.occurrences[key]
+            self.occurrences[key] += 1
+            return occurrence
+
+    def get(self, key: str, occurrence: int):
+        records = self.records.get(key)
+        if not records:
+            return None
+        return records[occurrence % len(records)]
+
+    def add(self, record: dict):
+        with self.lock:
+            self.records[record["hash"]].append(record)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class TimingModel:
+    """Latency and token-rate distributions for synthesized answers."""
+
+    def __init__(self, args):
+        self.args = args
+
+    def sample(self, rng: random.Random) -> dict:
+        a = self.args
+        return {
+            "ttft_s": max(0.0, rng.gauss(a.ttft_mean, a.ttft_std)),
+            "tokens_per_sec": max(1.0, rng.gauss(a.tokens_per_sec_mean, a.tokens_per_sec_std)),
+            "output_tokens": max(1, int(rng.gauss(a.output_tokens_mean, a.output_tokens_std))),
+        }
+
+
+def prompt_tools(body: dict) -> list:
+    """Tools listed in the system prompt within <tools></tools> tags (Prompt mode), one JSON object per line."""
+    for message in body.get("messages") or []:
+        if message.get("role") != "system" or not isinstance(message.get("content"), str):
+            continue
+        tools = []
+        for block in re.findall(r"<tools>(.*?)</tools>", message["content"], re.DOTALL):
+            for line in block.splitlines():
+                try:
+                    tool = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(tool, dict):
+                    tools.append(tool)
+        if tools:
+            return tools
+    return []
+
+
+def synth_message(body: dict, rng: random.Random, output_tokens: int, tool_call_prob: float) -> dict:
+    """
+    Synthesize an assistant message; with tools, call a random one with probability tool_call_prob.
+    FC tools give a tool_calls message, tools in the system prompt give <tool_call></tool_call> content.
+    """
+    tools = body.get("tools") or []
+    prompt_mode = not tools
+    if prompt_mode:
+        tools = prompt_tools(body)
+    if tools and rng.random() < tool_call_prob:
+        function = rng.choice(tools)
+        function = function.get("function", function)
+        properties = (function.get("parameters") or {}).get("properties") or {}
+        arguments = {name: rng.choice(_WORDS) for name in properties}
+        if prompt_mode:
+            tool_call = json.dumps({"name": function.get("name", ""), "arguments": arguments}, ensure_ascii=False)
+            return {"role": "assistant", "content": f"<tool_call>\n{tool_call}\n</tool_call>"}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}",
+                "type": "function",
+                "function": {"name": function.get("name", ""), "arguments": json.dumps(arguments)},
+            }],
+        }
+    return {"role": "assistant", "content": " ".join(rng.choice(_WORDS) for _ in range(output_tokens))}
+
+
+def message_tokens(message: dict) -> int:
+    count = len(split_tokens(message.get("reasoning_content") or "")) + len(split_tokens(message.get("content") or ""))
+    for tool_call in message.get("tool_calls") or []:
+        count += len(split_tokens(tool_call["function"].get("arguments") or "")) + 1
+    return count
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args):
+        super().__init__(address, StandInHandler)
+        self.args = args
+        self.store = RecordStore(args.record_file)
+        self.timing = TimingModel(args)
+        self.stats_lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def count(self, name: str):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def forward(self, path: str, body: dict) -> dict:
+        """Send a non-streaming request to the upstream endpoint (path relative to the base URL)."""
+        body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        request = urllib.request.Request(
+            self.args.upstream.rstrip("/") + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.args.upstream_api_key}"},
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            return json.loads(response.read())
+
+    def answer(self, path: str, body: dict):
+        """Return (message or embedding data, usage, timing) for a request."""
+        key = request_hash(body)
+        occurrence = self.store.next_occurrence(key)
+        rng = random.Random(f"{self.args.seed}:{key}:{occurrence}")
+        timing = self.timing.sample(rng)
+
+        if self.args.mode == "record":
+            start = time.perf_counter()
+            response = self.forward(path, body)
+            latency = time.perf_counter() - start
+            if path == "/embeddings":
+                result = response["data"]
+            else:
+                result = response["choices"][0]["message"]
+            record = {"hash": key, "model": body.get("model"), "result": result,
+                      "usage": response.get("usage"), "latency_s": round(latency, 4)}
+            self.store.add(record)
+            self.count("recorded")
+            return result, record["usage"], {"ttft_s": 0.0, "tokens_per_sec": None}
+
+        record = self.store.get(key, occurrence) if self.args.mode == "replay" else None
+        if record is not None:
+            self.count("replayed")
+            if self.args.latency == "recorded":
+                result_tokens = message_tokens(record["result"]) if isinstance(record["result"], dict) else 1
+                timing = {"ttft_s": 0.0, "tokens_per_sec": result_tokens / max(record["latency_s"], 1e-6)}
+            return record["result"], record.get("usage"), timing
+
+        if self.args.mode == "replay" and self.args.on_miss == "error":
+            self.count("missed")
+            return None, None, None
+
+        self.count("synthesized")
+        if path == "/embeddings":
+            inputs = body.get("input")
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            result = [
+                {"object": "embedding", "index": i, "embedding": [rng.uniform(-1, 1) for _ in range(self.args.embedding_dim)]}
+                for i in range(len(inputs))
+            ]
+            return result, {"prompt_tokens": 0, "total_tokens": 0}, {"ttft_s": timing["ttft_s"], "tokens_per_sec": None}
+        message = synth_message(body, rng, timing["output_tokens"], self.args.tool_call_prob)
+        completion_tokens = message_tokens(message)
+        return message, {"prompt_tokens": 0, "completion_tokens": completion_tokens, "total_tokens": completion_tokens}, timing
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, data: dict):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _client_gone(self):
+        """The client closed the stream (e.g. stopped at the first </tool_call>): end the response quietly."""
+        self.close_connection = True
+        self.server.count("client_closed")
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stand-in", "object": "model", "owned_by": "local"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            path = "/chat/completions"
+        elif path.endswith("/embeddings"):
+            path = "/embeddings"
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            result, usage, timing = self.server.answer(path, body)
+        except Exception as e:
+            self._send_json(502, {"error": {"message": f"Upstream error: {e}"}})
+            return
+        if result is None:
+            self._send_json(404, {"error": {"message": "No recorded answer for this request"}})
+            return
+
+        model = body.get("model", "stand-in")
+        if path == "/embeddings":
+            time.sleep(timing["ttft_s"])
+            self._send_json(200, {"object": "list", "data": result, "model": model, "usage": usage})
+        elif body.get("stream"):
+            try:
+                self._stream_completion(model, result, usage, timing, body)
+            except (BrokenPipeError, ConnectionResetError):
+                self._client_gone()
+        else:
+            if timing["tokens_per_sec"]:
+                time.sleep(timing["ttft_s"] + message_tokens(result) / timing["tokens_per_sec"])
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": result, "finish_reason": "tool_calls" if result.get("tool_calls") else "stop"}],
+                "usage": usage,
+            })
+
+    def _stream_completion(self, model: str, message: dict, usage: dict, timing: dict, body: dict):
+        """Send the message as SSE chunks (reasoning, content, then tool_calls deltas) at the sampled token rate."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        token_delay = 1.0 / timing["tokens_per_sec"] if timing["tokens_per_sec"] else 0.0
+
+        def send(delta: dict = None, finish_reason=None, extra: dict = None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if extra:
+                chunk.update(extra)
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        time.sleep(timing["ttft_s"])
+        send({"role": "assistant", "content": ""})
+        for field in ("reasoning_content", "content"):
+            for token in split_tokens(message.get(field) or ""):
+                send({field: token})
+                time.sleep(token_delay)
+        for index, tool_call in enumerate(message.get("tool_calls") or []):
+            send({"tool_calls": [{"index": index, "id": tool_call.get("id"), "type": "function",
+                                  "function": {"name": tool_call["function"]["name"], "arguments": ""}}]})
+            for token in split_tokens(tool_call["function"].get("arguments") or ""):
+                send({"tool_calls": [{"index": index, "function": {"arguments": token}}]})
+                time.sleep(token_delay)
+        send({}, finish_reason="tool_calls" if message.get("tool_calls") else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send(None, extra={"usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible record/replay stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mode", choices=["record", "replay", "synth"], default="replay")
+    parser.add_argument("--record-file", default="llm_records.jsonl")
+    parser.add_argument("--upstream", default=os.getenv("OPENAI_BASE_URL"), help="Upstream base URL (record mode)")
+    parser.add_argument("--upstream-api-key", default=os.getenv("OPENAI_API_KEY", ""))
+    parser.add_argument("--on-miss", choices=["synth", "error"], default="synth", help="Replay mode: answer for unrecorded requests")
+    parser.add_argument("--latency", choices=["none", "recorded", "synth"], default=None,
+                        help="Timing of answers (default: synth for synth mode, none for replay)")
+    parser.add_argument("--ttft-mean", type=float, default=0.3, help="Time to first token, seconds")
+    parser.add_argument("--ttft-std", type=float, default=0.1)
+    parser.add_argument("--tokens-per-sec-mean", type=float, default=60.0)
+    parser.add_argument("--tokens-per-sec-std", type=float, default=10.0)
+    parser.add_argument("--output-tokens-mean", type=float, default=80.0)
+    parser.add_argument("--output-tokens-std", type=float, default=30.0)
+    parser.add_argument("--tool-call-prob", type=float, default=0.7, help="Synth: probability of a tool call when tools are given")
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == "record" and not args.upstream:
+        parser.error("--upstream (or OPENAI_BASE_URL) is required in record mode")
+    if args.latency is None:
+        args.latency = "synth" if args.mode == "synth" else "none"
+    if args.latency == "none":
+        args.ttft_mean = args.ttft_std = 0.0
+        args.tokens_per_sec_mean, args.tokens_per_sec_std = float("inf"), 0.0
+
+    server = StandInServer((args.host, args.port), args)
+    print(f"{args.mode} server on http://{args.host}:{args.port}/v1 (latency: {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,21 @@ The main program is used for:
 """
 import os
 import json
-import time
+import asyncio
+import functools
+import argparse
+import threading
+import traceback
+import multiprocessing
 from tqdm import tqdm
 from copy import deepcopy
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from agent import llm_gateway
 from agent.task_solve_agent import TaskSolveAgent
+from agent.system_prompt_util import system_prompt_cache
+from agent.episode_trace import write_chrome_trace
 
 # Environment imports
 from envscaler_env import EnvScalerConvRLEnv, EnvScalerNonConvRLEnv, EnvScalerConvSFTEnv, EnvScalerNonConvSFTEnv
@@ -47,18 +55,87 @@ max_steps_map = {
 }
 
 
-def get_current_time():
-    """Get current time as formatted string."""
-    return time.strftime("%Y-%m-%d-%H-%M-%S", time.localtime())
-
+def read_jsonl(path):
+    """Read results from a JSONL file; a torn last line (crash while writing) is ignored."""
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
 
-def save_json(path, data):
-    """Save data to JSON file."""
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
 
+class JsonlResultWriter:
+    """
+    Append one JSON line per finished episode.
+    Lines are flushed immediately, so a process crash loses nothing already written;
+    fsync runs every `fsync_every` lines (and on close), bounding what a machine crash can lose.
+    """
 
-def solve_task(env_name, env_config, agent_model, agent_model_provider, infer_mode, enable_thinking, task_id):
+    def __init__(self, path, fsync_every=20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.lock = threading.Lock()
+        self.pending = 0
+        self._drop_torn_line()
+        self.f = open(path, "a", encoding="utf-8")
+
+    def _drop_torn_line(self):
+        """Cut a partially written last line so appended lines stay parseable."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def write(self, result):
+        line = json.dumps(result, ensure_ascii=False)
+        with self.lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_every:
+                os.fsync(self.f.fileno())
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def shard_task_configs(task_configs, shard):
+    """Keep the i-th of N interleaved shards of task_configs; shard is "i/N" (0-based) or None for all."""
+    if not shard:
+        return task_configs
+    index, num_shards = (int(x) for x in shard.split("/"))
+    if not 0 <= index < num_shards:
+        raise ValueError(f"Invalid shard {shard}, expected i/N with 0 <= i < N")
+    return task_configs[index::num_shards]
+
+
+def pending_task_configs(task_configs, save_file_path):
+    """Drop tasks whose results are already in save_file_path (resume after a crash or restart)."""
+    done_task_ids = {item["task_id"] for item in read_jsonl(save_file_path) if "task_id" in item}
+    pending = [cfg for cfg in task_configs if cfg["task_id"] not in done_task_ids]
+    if done_task_ids:
+        print(f"Resume from {save_file_path}: {len(task_configs) - len(pending)} tasks done, {len(pending)} to run")
+    return pending
+
+
+def solve_task(env_name, env_config, agent_model, agent_model_provider, infer_mode, enable_thinking, task_id, trace=False, parallel_tool_calls=False):
     # Initialize environment
     try:
         env = env_cls_map[env_name](**env_config)
@@ -76,11 +153,13 @@ def solve_task(env_name, env_config, agent_model, agent_model_provider, infer_mo
         infer_mode=infer_mode,
         temperature=0.7,
         max_steps=max_steps,
-        enable_thinking=enable_thinking
+        enable_thinking=enable_thinking,
+        parallel_tool_calls=parallel_tool_calls,
+        trace=trace
     )
     
     # Execute task
-    save_data = {}
+    save_data = {"task_id": task_id}
     result = agent.run(task_index=task_id)
     save_data.update(result)
     return save_data
@@ -92,10 +171,10 @@ def solve_task_multiprocess(task_configs, save_file_path, num_workers):
     """
     # if directory does not exist, create it
     os.makedirs(os.path.dirname(save_file_path), exist_ok=True)
+    task_configs = pending_task_configs(task_configs, save_file_path)
 
-    results = []
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = [
+    with ThreadPoolExecutor(max_workers=num_workers) as executor, JsonlResultWriter(save_file_path) as writer:
+        futures = {
             executor.submit(
                 solve_task,
                 cfg["env_name"],
@@ -104,29 +183,175 @@ def solve_task_multiprocess(task_configs, save_file_path, num_workers):
                 cfg["agent_model_provider"],
                 cfg["infer_mode"],
                 cfg["enable_thinking"],
-                cfg["task_id"]
-            )
+                cfg["task_id"],
+                cfg.get("trace", False),
+                cfg.get("parallel_tool_calls", False)
+            ): cfg["task_id"]
             for cfg in task_configs
-        ]
+        }
 
-        for i, future in enumerate(tqdm(as_completed(futures), total=len(futures))):
+        for future in tqdm(as_completed(futures), total=len(futures)):
             try:
                 # get task result
                 res = future.result()
             except Exception as e:
                 # single task exception, print and skip
-                print(f"[WARNING] Task {i} error, skipped: {e}")
+                print(f"[WARNING] Task {futures[future]} error, skipped: {e}")
                 import traceback
                 print(traceback.format_exc())
                 continue
 
-            results.append(res)
+            writer.write(res)
+
+
+def set_rate_limits(rate_limits):
+    """Apply {model: max requests per minute} to the LLM gateway (agent and user simulator calls of this process)."""
+    for model, requests_per_minute in (rate_limits or {}).items():
+        llm_gateway.set_rate_limit(model, requests_per_minute)
+
+
+def _init_rollout_worker(env_name, env_config, rate_limits=None):
+    """Process-pool initializer: build one env so metadata and compiled env classes are loaded before tasks arrive."""
+    set_rate_limits(rate_limits)
+    try:
+        env_cls_map[env_name](**env_config)
+    except Exception as e:
+        print(f"[WARNING] Worker warm-up failed, envs will load lazily: {repr(e)}")
+
 
-            if len(results) % 5 == 0:
-                save_json(save_file_path, results)
+def _solve_task_chunk(chunk, threads_per_worker):
+    """Run a chunk of task configs in a worker process; return [(task_id, result or None, error or None)]."""
+    def run(cfg):
+        try:
+            res = solve_task(
+                cfg["env_name"],
+                cfg["env_config"],
+                cfg["agent_model"],
+                cfg["agent_model_provider"],
+                cfg["infer_mode"],
+                cfg["enable_thinking"],
+                cfg["task_id"],
+                cfg.get("trace", False),
+                cfg.get("parallel_tool_calls", False)
+            )
+            return cfg["task_id"], res, None
+        except Exception as e:
+            return cfg["task_id"], None, f"{e}\n{traceback.format_exc()}"
 
-    # save final results
-    save_json(save_file_path, results)
+    if threads_per_worker <= 1:
+        return [run(cfg) for cfg in chunk]
+    with ThreadPoolExecutor(max_workers=threads_per_worker) as executor:
+        return list(executor.map(run, chunk))
+
+
+def solve_task_process_pool(task_configs, save_file_path, num_workers, chunk_size=4, threads_per_worker=1, mp_context=None, rate_limits=None):
+    """
+    multi-process execution of solve_task (same results as the thread modes, without sharing one GIL)
+
+    :param num_workers: Worker processes; each loads metadata and compiles env classes once at start
+    :param chunk_size: Tasks sent to a worker at a time; results stream back per finished chunk
+    :param threads_per_worker: Episodes run concurrently inside each worker (LLM-latency bound workloads)
+    :param mp_context: multiprocessing start method, forkserver (or spawn) by default
+    :param rate_limits: {model: max requests per minute} for all workers together (each gets an equal share)
+    """
+    # if directory does not exist, create it
+    os.makedirs(os.path.dirname(save_file_path), exist_ok=True)
+    task_configs = pending_task_configs(task_configs, save_file_path)
+    if not task_configs:
+        return
+
+    if mp_context is None:
+        # Fork is unsafe with the threads of the LLM clients and tqdm
+        mp_context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(mp_context)
+    chunks = [task_configs[i:i + chunk_size] for i in range(0, len(task_configs), chunk_size)]
+    first = task_configs[0]
+
+    with ctx.Pool(
+        processes=num_workers,
+        initializer=_init_rollout_worker,
+        initargs=(
+            first["env_name"],
+            first["env_config"],
+            {model: requests_per_minute / num_workers for model, requests_per_minute in (rate_limits or {}).items()}
+        )
+    ) as pool, JsonlResultWriter(save_file_path) as writer, tqdm(total=len(task_configs)) as pbar:
+        chunk_results = pool.imap_unordered(
+            functools.partial(_solve_task_chunk, threads_per_worker=threads_per_worker),
+            chunks
+        )
+        for chunk_result in chunk_results:
+            for task_id, res, error in chunk_result:
+                pbar.update(1)
+                if error is not None:
+                    # single task exception, print and skip
+                    print(f"[WARNING] Task {task_id} error, skipped: {error}")
+                    continue
+                writer.write(res)
+
+
+async def solve_task_async(cfg, semaphore, env_executor):
+    """Async solve_task: LLM calls of the agent (and EnvScaler user simulator) are awaited on the event loop."""
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        env_name = cfg["env_name"]
+        try:
+            env = await loop.run_in_executor(env_executor, lambda: env_cls_map[env_name](**cfg["env_config"]))
+        except Exception as e:
+            raise Exception(f"Error in env_cls_map[{env_name}](**env_config): {repr(e)}")
+
+        agent = TaskSolveAgent(
+            env_name=env_name,
+            env=env,
+            model=cfg["agent_model"],
+            provider=cfg["agent_model_provider"],
+            infer_mode=cfg["infer_mode"],
+            temperature=0.7,
+            max_steps=max_steps_map[env_name],
+            enable_thinking=cfg["enable_thinking"],
+            env_executor=env_executor,
+            parallel_tool_calls=cfg.get("parallel_tool_calls", False),
+            trace=cfg.get("trace", False)
+        )
+        save_data = {"task_id": cfg["task_id"]}
+        save_data.update(await agent.async_run(task_index=cfg["task_id"]))
+        return save_data
+
+
+async def _solve_tasks_async(task_configs, save_file_path, max_concurrency, env_workers):
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(cfg):
+        try:
+            return cfg["task_id"], await solve_task_async(cfg, semaphore, env_executor), None
+        except Exception as e:
+            return cfg["task_id"], None, f"{e}\n{traceback.format_exc()}"
+
+    with ThreadPoolExecutor(max_workers=env_workers) as env_executor, JsonlResultWriter(save_file_path) as writer:
+        futures = [asyncio.ensure_future(run(cfg)) for cfg in task_configs]
+        for future in tqdm(asyncio.as_completed(futures), total=len(futures)):
+            task_id, res, error = await future
+            if error is not None:
+                # single task exception, print and skip
+                print(f"[WARNING] Task {task_id} error, skipped: {error}")
+                continue
+
+            writer.write(res)
+
+    print(f"System prompt prefix reuse: {system_prompt_cache.stats()}")
+
+
+def solve_task_asyncio(task_configs, save_file_path, max_concurrency, env_workers=4):
+    """
+    asyncio execution of solve_task: all episodes share one event loop.
+
+    :param max_concurrency: Maximum number of episodes in flight
+    :param env_workers: Threads for env construction and for steps of envs without async_step
+    """
+    # if directory does not exist, create it
+    os.makedirs(os.path.dirname(save_file_path), exist_ok=True)
+    task_configs = pending_task_configs(task_configs, save_file_path)
+    asyncio.run(_solve_tasks_async(task_configs, save_file_path, max_concurrency, env_workers))
 
 
 def solve_task_single_process(task_configs, save_file_path):
@@ -135,28 +360,37 @@ def solve_task_single_process(task_configs, save_file_path):
     """
     # if directory does not exist, create it
     os.makedirs(os.path.dirname(save_file_path), exist_ok=True)
+    task_configs = pending_task_configs(task_configs, save_file_path)
 
-    results = []
-    for i, cfg in enumerate(tqdm(task_configs, total=len(task_configs))):
-        res = solve_task(
-            cfg["env_name"],
-            cfg["env_config"],
-            cfg["agent_model"],
-            cfg["agent_model_provider"],
-            cfg["infer_mode"],
-            cfg["enable_thinking"],
-            cfg["task_id"]
-        )
-        results.append(res)
-        # save every 10 results
-        if len(results) % 10 == 0:
-            save_json(save_file_path, results)
-
-    # save final results
-    save_json(save_file_path, results)
+    with JsonlResultWriter(save_file_path) as writer:
+        for cfg in tqdm(task_configs, total=len(task_configs)):
+            res = solve_task(
+                cfg["env_name"],
+                cfg["env_config"],
+                cfg["agent_model"],
+                cfg["agent_model_provider"],
+                cfg["infer_mode"],
+                cfg["enable_thinking"],
+                cfg["task_id"],
+                cfg.get("trace", False),
+                cfg.get("parallel_tool_calls", False)
+            )
+            writer.write(res)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shard", default=None, help="Run the i-th of N interleaved shards of the task list, e.g. 0/4")
+    parser.add_argument("--output", default=None, help="Result JSONL path; rerun with the same path to resume")
+    parser.add_argument("--executor", choices=["asyncio", "thread", "process", "single"], default="asyncio",
+                        help="asyncio event loop, thread pool, process pool (env-heavy workloads) or single thread")
+    parser.add_argument("--num-workers", type=int, default=8, help="Threads (thread) or processes (process)")
+    parser.add_argument("--threads-per-worker", type=int, default=8, help="Concurrent episodes per process (process)")
+    parser.add_argument("--parallel-tool-calls", action="store_true",
+                        help="FC mode: execute every tool call of a turn instead of only the first")
+    parser.add_argument("--trace", default=None, help="Keep per-step timing spans and write them to this Chrome trace JSON path")
+    args = parser.parse_args()
+
     # load env
     load_dotenv()
 
@@ -168,7 +402,9 @@ if __name__ == "__main__":
     # Enable Thinking Mode (Only applicable to hybrid thinking models that support thinking switching, such as Qwen3-8B; does not work for other models)
     # enable_thinking = False
     enable_thinking = True
-    num_workers = 3
+    # Episodes in flight on the asyncio runner, and optional request limits per model (requests/minute)
+    max_concurrency = 64
+    rate_limits = {}
 
     # EnvScaler-NonConversation-SFT-Env (Training Env)
     # No Reward for SFT
@@ -276,19 +512,40 @@ if __name__ == "__main__":
             "agent_model_provider": agent_model_provider,
             "infer_mode": infer_mode,
             "enable_thinking": enable_thinking,
-            "task_id": task_id
+            "task_id": task_id,
+            "parallel_tool_calls": args.parallel_tool_calls,
+            "trace": args.trace is not None
         })
         for task_id in task_ids
     ]
-    # generate save file path
-    if env_name in ["bfcl", "envscaler_non_conversation_rl","envscaler_non_conversation_sft", "acebench_multi_step"]:
-        save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}_{get_current_time()}.json"
-    elif env_name in ["envscaler_conversation_rl","envscaler_conversation_sft", "acebench_multi_turn"]:
-        save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}_{env_config['user_model']}_{get_current_time()}.json"
-    else: # tau bench
-        save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}_{env_config['user_model']}_{env_config['user_strategy']}_{get_current_time()}.json"
+    task_configs = shard_task_configs(task_configs, args.shard)
+    # generate save file path: no timestamp, so rerunning the same settings resumes the same file
+    if args.output:
+        save_file_path = args.output
+    else:
+        if env_name in ["bfcl", "envscaler_non_conversation_rl","envscaler_non_conversation_sft", "acebench_multi_step"]:
+            save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}"
+        elif env_name in ["envscaler_conversation_rl","envscaler_conversation_sft", "acebench_multi_turn"]:
+            save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}_{env_config['user_model']}"
+        else: # tau bench
+            save_file_path = f"result/{env_name}/{agent_model}-{infer_mode}_{env_config['user_model']}_{env_config['user_strategy']}"
+        if enable_thinking:
+            save_file_path += "_thinking"
+        if args.shard:
+            save_file_path += f"_shard{args.shard.replace('/', 'of')}"
+        save_file_path += ".jsonl"
     print("save_file_path:", save_file_path)
     # run task solving
-    solve_task_multiprocess(task_configs=task_configs, save_file_path=save_file_path, num_workers=num_workers)
-    # solve_task_single_process(task_configs=task_configs, save_file_path=save_file_path)
-    print("save_file_path:", save_file_path)
\ No newline at end of file
+    set_rate_limits(rate_limits)
+    if args.executor == "asyncio":
+        solve_task_asyncio(task_configs=task_configs, save_file_path=save_file_path, max_concurrency=max_concurrency)
+    elif args.executor == "thread":
+        solve_task_multiprocess(task_configs=task_configs, save_file_path=save_file_path, num_workers=args.num_workers)
+    elif args.executor == "process":
+        solve_task_process_pool(task_configs=task_configs, save_file_path=save_file_path, num_workers=args.num_workers, threads_per_worker=args.threads_per_worker, rate_limits=rate_limits)
+    else:
+        solve_task_single_process(task_configs=task_configs, save_file_path=save_file_path)
+    print("save_file_path:", save_file_path)
+    if args.trace:
+        write_chrome_trace(read_jsonl(save_file_path), args.trace)
+        print("trace_path:", args.trace)
\ No newline at end of file
@@ -1,13 +1,17 @@
 """
 Base environment class for TauBench.
 """
+import os
+import json
 import random
 from copy import deepcopy
+from hashlib import sha256
 from typing import Any, Dict, Type, Union
 
 from .envs.tool import Tool
 from .envs.user import load_user
-from .utils.hash_util import get_data_hash
+from .utils.hash_util import get_merkle_hash, get_gt_hash_cache
+from .utils.db_util import clone_database, get_pristine_database, get_pristine_fingerprint
 from .utils.parse_util import parse_response, parse_action
 
 from .tau_bench_types import (
@@ -33,7 +37,7 @@ class TauBenchBaseEnv:
         self.user_strategy = user_strategy
         
         # Initialize resources (database, tool set, task set, provided by subclasses)
-        self.data = self.load_database()
+        self.data = self.new_database()
         self.tools = self.load_all_tools()
         self.tasks = self.load_all_tasks()
 
@@ -81,6 +85,48 @@ class TauBenchBaseEnv:
 
     # -------------------- Public methods --------------------
 
+    def new_database(self):
+        """Return a fresh database for one episode: a copy-on-write clone of the DB parsed once per process."""
+        return clone_database(get_pristine_database(self.env_domain, self.load_database))
+
+    def gt_hash_cache_path(self) -> str:
+        """
+        Sidecar file of ground-truth data hashes: TAU_GT_HASH_CACHE_PATH, by default in the user cache dir
+        ($XDG_CACHE_HOME or ~/.cache) so the package directory is never written to.
+        """
+        cache_dir = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        default_path = os.path.join(cache_dir, "envscaler", "taubench", self.env_domain, "gt_data_hashes.json")
+        return os.getenv("TAU_GT_HASH_CACHE_PATH", default_path)
+
+    def get_gt_data_hash(self) -> str:
+        """
+        Hash of the database after the current task's ground-truth actions.
+        It only depends on the task and the DB content, so it is computed once (on a fresh
+        database, without touching self.data) and then read from the sidecar cache.
+        """
+        actions_digest = sha256(
+            json.dumps([[action.name, action.kwargs] for action in self.task.actions], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        db_fingerprint = get_pristine_fingerprint(
+            self.env_domain, self.load_database, lambda pristine: get_merkle_hash(clone_database(pristine))
+        )[:16]
+        key = f"{self.env_domain}:{self.task_index}:{actions_digest}:{db_fingerprint}"
+
+        cache = get_gt_hash_cache(self.gt_hash_cache_path())
+        gt_data_hash = cache.get(key)
+        if gt_data_hash is None:
+            data = self.new_database()
+            # Only tool calls change the data (responses to the user do not)
+            for action in self.task.actions:
+                if action.name in self.tools_map and action.name not in self.terminate_tools:
+                    try:
+                        self.tools_map[action.name].invoke(data=data, **action.kwargs)
+                    except Exception:
+                        pass  # Same as step: a failed tool call keeps whatever it changed before failing
+            gt_data_hash = get_merkle_hash(data)
+            cache.put(key, gt_data_hash)
+        return gt_data_hash
+
 
     def reset(self, seed=None, task_index=None, user_content_bank=None):
         """
@@ -92,8 +138,8 @@ class TauBenchBaseEnv:
             user_content_bank: By default user_content is LLM-generated. If user_strategy is "human" and user_content_bank is not empty, 
                              each round pulls a user_query from user_content_bank
         """
-        # Reload data (actions modify database, need to reload database)
-        self.data = self.load_database()
+        # Fresh database (actions modify database)
+        self.data = self.new_database()
         self.actions = []  # Clear history actions
         
         # Select task (specified or random)
@@ -218,7 +264,7 @@ class TauBenchBaseEnv:
         """
 
         # Calculate hash of current data state (after agent execution)
-        data_hash = get_data_hash(self.data)
+        data_hash = get_merkle_hash(self.data)
         reward = 1.0  # Default reward is 1, set to 0 if errors found
 
         # Filter out RESPOND_ACTION (dialogue actions), keep only tool operation actions
@@ -227,17 +273,8 @@ class TauBenchBaseEnv:
         ]
 
         # Check if data modification is correct
-        # Restore data to initial state
-        self.data = self.load_database()
-
-        # Execute actions defined by task (ground truth actions)
-        for action in self.task.actions:
-            if action.name not in self.terminate_tools:
-                self.step(action=action)
-    
-        # Data is now in state after executing correct actions
-        # Get corresponding hash value
-        gt_data_hash = get_data_hash(self.data)
+        # Hash of the data after executing the ground truth actions (cached per task)
+        gt_data_hash = self.get_gt_data_hash()
 
         # Compare results: if different, agent's data modification is incorrect
         info = RewardActionInfo(
@@ -3,6 +3,7 @@
 import json
 from typing import Any, Dict
 from ...tool import Tool
+from ....utils.db_util import find_entries
 
 
 class SearchDirectFlight(Tool):
@@ -10,15 +11,16 @@ class SearchDirectFlight(Tool):
     def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
         flights = data["flights"]
         results = []
-        for flight in flights.values():
-            if flight["origin"] == origin and flight["destination"] == destination:
-                if (
-                    date in flight["dates"]
-                    and flight["dates"][date]["status"] == "available"
-                ):
-                    # results add flight except dates, but add flight["datas"][date]
-                    results.append({k: v for k, v in flight.items() if k != "dates"})
-                    results[-1].update(flight["dates"][date])
+        for _, flight in find_entries(
+            flights, "route", lambda flight: (flight["origin"], flight["destination"]), (origin, destination)
+        ):
+            if (
+                date in flight["dates"]
+                and flight["dates"][date]["status"] == "available"
+            ):
+                # results add flight except dates, but add flight["datas"][date]
+                results.append({k: v for k, v in flight.items() if k != "dates"})
+                results[-1].update(flight["dates"][date])
         return json.dumps(results)
 
     @staticmethod
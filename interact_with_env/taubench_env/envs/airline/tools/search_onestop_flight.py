@@ -3,6 +3,7 @@
 import json
 from typing import Any, Dict
 from ...tool import Tool
+from ....utils.db_util import find_entries
 
 
 class SearchOnestopFlight(Tool):
@@ -10,39 +11,39 @@ class SearchOnestopFlight(Tool):
     def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
         flights = data["flights"]
         results = []
-        for flight1 in flights.values():
-            if flight1["origin"] == origin:
-                for flight2 in flights.values():
+        for _, flight1 in find_entries(flights, "origin", lambda flight: flight["origin"], origin):
+            for _, flight2 in find_entries(
+                flights,
+                "route",
+                lambda flight: (flight["origin"], flight["destination"]),
+                (flight1["destination"], destination),
+            ):
+                date2 = (
+                    f"2024-05-{int(date[-2:])+1}"
+                    if "+1" in flight1["scheduled_arrival_time_est"]
+                    else date
+                )
+                if (
+                    flight1["scheduled_arrival_time_est"]
+                    > flight2["scheduled_departure_time_est"]
+                ):
+                    continue
+                if date in flight1["dates"] and date2 in flight2["dates"]:
                     if (
-                        flight2["destination"] == destination
-                        and flight1["destination"] == flight2["origin"]
+                        flight1["dates"][date]["status"] == "available"
+                        and flight2["dates"][date2]["status"] == "available"
                     ):
-                        date2 = (
-                            f"2024-05-{int(date[-2:])+1}"
-                            if "+1" in flight1["scheduled_arrival_time_est"]
-                            else date
-                        )
-                        if (
-                            flight1["scheduled_arrival_time_est"]
-                            > flight2["scheduled_departure_time_est"]
-                        ):
-                            continue
-                        if date in flight1["dates"] and date2 in flight2["dates"]:
-                            if (
-                                flight1["dates"][date]["status"] == "available"
-                                and flight2["dates"][date2]["status"] == "available"
-                            ):
-                                result1 = {
-                                    k: v for k, v in flight1.items() if k != "dates"
-                                }
-                                result1.update(flight1["dates"][date])
-                                result1["date"] = date
-                                result2 = {
-                                    k: v for k, v in flight2.items() if k != "dates"
-                                }
-                                result2.update(flight2["dates"][date])
-                                result2["date"] = date2
-                                results.append([result1, result2])
+                        result1 = {
+                            k: v for k, v in flight1.items() if k != "dates"
+                        }
+                        result1.update(flight1["dates"][date])
+                        result1["date"] = date
+                        result2 = {
+                            k: v for k, v in flight2.items() if k != "dates"
+                        }
+                        result2.update(flight2["dates"][date])
+                        result2["date"] = date2
+                        results.append([result1, result2])
         return json.dumps(results)
 
     @staticmethod
@@ -2,15 +2,15 @@
 
 from typing import Any, Dict
 from ...tool import Tool
+from ....utils.db_util import find_entries
 
 
 class FindUserIdByEmail(Tool):
     @staticmethod
     def invoke(data: Dict[str, Any], email: str) -> str:
         users = data["users"]
-        for user_id, profile in users.items():
-            if profile["email"].lower() == email.lower():
-                return user_id
+        for user_id, _ in find_entries(users, "email", lambda profile: profile["email"].lower(), email.lower()):
+            return user_id
         return "Error: user not found"
 
     @staticmethod
@@ -2,19 +2,24 @@
 
 from typing import Any, Dict
 from ...tool import Tool
+from ....utils.db_util import find_entries
 
 
 class FindUserIdByNameZip(Tool):
     @staticmethod
     def invoke(data: Dict[str, Any], first_name: str, last_name: str, zip: str) -> str:
         users = data["users"]
-        for user_id, profile in users.items():
-            if (
-                profile["name"]["first_name"].lower() == first_name.lower()
-                and profile["name"]["last_name"].lower() == last_name.lower()
-                and profile["address"]["zip"] == zip
-            ):
-                return user_id
+        for user_id, _ in find_entries(
+            users,
+            "name_zip",
+            lambda profile: (
+                profile["name"]["first_name"].lower(),
+                profile["name"]["last_name"].lower(),
+                profile["address"]["zip"],
+            ),
+            (first_name.lower(), last_name.lower(), zip),
+        ):
+            return user_id
         return "Error: user not found"
 
     @staticmethod
@@ -0,0 +1,197 @@
+"""
+Pristine TauBench databases shared per process, with cheap copy-on-write clones per episode.
+
+The domain database (orders/products/users, flights/reservations/users) is parsed from
+JSON once per process and never modified. Each episode works on a clone whose tables
+are `CopyOnWriteTable`s: an entry is deep-copied into the episode's overlay the first
+time it is fetched by key (tools mutate the entries they fetch), new and deleted keys
+are recorded in the overlay too. Cloning is O(1) and an episode only pays for the
+entries its tools touched.
+
+Full-table scans (`items()` / `values()` / iteration) yield the shared pristine entries
+for keys not in the overlay, without copying: scans must not modify the entries they
+visit. All bundled TauBench tools only read during scans and fetch by key to write.
+
+Lookup tools use `find_entries` instead of scanning: secondary indexes (e.g. email -> user ids)
+are built once per pristine table, and entries the episode touched are re-checked, so results
+stay exact after writes.
+"""
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+_DELETED = object()
+
+
+def copy_json(value):
+    """Deep copy of JSON-like data (dict / list / scalars), several times faster than copy.deepcopy."""
+    if type(value) is dict:
+        return {key: copy_json(item) for key, item in value.items()}
+    if type(value) is list:
+        return [copy_json(item) for item in value]
+    return value
+
+
+class CopyOnWriteTable(MutableMapping):
+    """
+    Dict-like view of a pristine table plus an overlay of the entries this episode fetched or changed.
+
+    :param base: Pristine {key: entry} table, shared by all clones and never modified
+    """
+
+    __slots__ = ("base", "overlay", "moved")
+
+    def __init__(self, base: Dict[str, Any]):
+        self.base = base
+        self.overlay = {}  # key -> private entry copy, or _DELETED
+        self.moved = set()  # pristine keys deleted and set again: iterated in overlay order, like a dict
+
+    def __getitem__(self, key):
+        entry = self.overlay.get(key)
+        if entry is _DELETED:
+            raise KeyError(key)
+        if entry is None and key not in self.overlay:
+            entry = copy_json(self.base[key])
+            self.overlay[key] = entry
+        return entry
+
+    def __setitem__(self, key, value):
+        if self.overlay.get(key) is _DELETED:
+            # A dict appends a re-inserted key at the end
+            del self.overlay[key]
+            if key in self.base:
+                self.moved.add(key)
+        self.overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.overlay[key] = _DELETED
+
+    def __contains__(self, key):
+        if key in self.overlay:
+            return self.overlay[key] is not _DELETED
+        return key in self.base
+
+    def __iter__(self):
+        for key in self.base:
+            if self.overlay.get(key) is not _DELETED and key not in self.moved:
+                yield key
+        for key, entry in self.overlay.items():
+            if (key not in self.base or key in self.moved) and entry is not _DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # Scans read overlay entries where present, else the pristine entry (no copy)
+    def items(self):
+        for key in self:
+            yield key, self.overlay[key] if key in self.overlay else self.base[key]
+
+    def values(self):
+        for _, entry in self.items():
+            yield entry
+
+    def peek(self, key):
+        """Entry for reading only: the overlay entry if any, else the pristine one (no copy)."""
+        if key in self.overlay:
+            entry = self.overlay[key]
+            if entry is _DELETED:
+                raise KeyError(key)
+            return entry
+        return self.base[key]
+
+    def touched_keys(self):
+        """Keys fetched, set or deleted in this clone (entries that may differ from the pristine table)."""
+        return self.overlay.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy of the table as seen by this episode."""
+        return {key: copy_json(entry) for key, entry in self.items()}
+
+
+def clone_database(pristine: Dict[str, Dict[str, Any]]) -> Dict[str, CopyOnWriteTable]:
+    """Return a per-episode database: one copy-on-write table per pristine table."""
+    return {name: CopyOnWriteTable(table) for name, table in pristine.items()}
+
+
+_pristine_databases = {}
+_pristine_fingerprints = {}
+_pristine_lock = threading.Lock()
+
+
+def get_pristine_database(domain: str, load: Callable[[], Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Return the process-wide pristine database of a domain, loading it with load() on first use."""
+    with _pristine_lock:
+        if domain not in _pristine_databases:
+            _pristine_databases[domain] = load()
+        return _pristine_databases[domain]
+
+
+def get_pristine_fingerprint(domain: str, load: Callable[[], Dict[str, Dict[str, Any]]], hash_fn: Callable[[Any], str]) -> str:
+    """Return hash_fn of the pristine database of a domain, computed once per process."""
+    database = get_pristine_database(domain, load)
+    with _pristine_lock:
+        if domain not in _pristine_fingerprints:
+            _pristine_fingerprints[domain] = hash_fn(database)
+        return _pristine_fingerprints[domain]
+
+
+class SecondaryIndex:
+    """index key -> table keys (in table order) over a pristine table, plus each table key's position."""
+
+    def __init__(self, table: Dict[str, Any], key_fn: Callable[[Any], Hashable]):
+        self.positions = {}
+        self.keys = {}
+        for position, (key, entry) in enumerate(table.items()):
+            self.positions[key] = position
+            self.keys.setdefault(key_fn(entry), []).append(key)
+
+
+_indexes = {}  # (id(pristine table), index name) -> (table, SecondaryIndex); the table is kept so its id stays unique
+_indexes_lock = threading.Lock()
+
+
+def _get_index(table: Dict[str, Any], name: str, key_fn: Callable[[Any], Hashable]) -> SecondaryIndex:
+    with _indexes_lock:
+        cached = _indexes.get((id(table), name))
+        if cached is None:
+            cached = (table, SecondaryIndex(table, key_fn))
+            _indexes[(id(table), name)] = cached
+        return cached[1]
+
+
+def find_entries(table, name: str, key_fn: Callable[[Any], Hashable], value: Hashable) -> List[Tuple[str, Any]]:
+    """
+    Return [(key, entry)] of the table entries with key_fn(entry) == value, in table iteration order
+    (same result as scanning the table). Entries are for reading only, like those of a scan.
+
+    :param name: Index name, one index per (pristine table, name); key_fn must not change for a name
+    """
+    if not isinstance(table, CopyOnWriteTable):
+        return [(key, entry) for key, entry in table.items() if key_fn(entry) == value]
+
+    index = _get_index(table.base, name, key_fn)
+    # Pristine candidates plus every entry this episode touched (its indexed fields may have changed)
+    candidates = set(index.keys.get(value, ()))
+    candidates.update(table.touched_keys())
+    matches = []
+    for key in candidates:
+        if key not in table:
+            continue
+        entry = table.peek(key)
+        if key_fn(entry) == value:
+            matches.append((key, entry))
+    if len(matches) > 1:
+        # Pristine keys in table order, then keys added (or re-inserted) by the episode in insertion order
+        added = {key: position for position, key in enumerate(table.touched_keys())}
+
+        def position(match):
+            key = match[0]
+            if key in index.positions and key not in table.moved:
+                return index.positions[key]
+            return len(index.positions) + added.get(key, 0)
+
+        matches.sort(key=position)
+    return matches
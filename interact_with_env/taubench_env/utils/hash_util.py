@@ -1,8 +1,14 @@
 """
 Utility functions for hashing data.
 """
+import os
+import json
+import zlib
+import threading
 from hashlib import sha256
-from typing import Dict, List, Set, Union, Tuple
+from typing import Any, Dict, List, Optional, Set, Union, Tuple
+
+from .db_util import CopyOnWriteTable
 
 # To allow hashing of arbitrary data structures, define type aliases here
 ToHashable = Union[
@@ -18,6 +24,8 @@ def to_hashable(item: ToHashable) -> Hashable:
         return tuple(to_hashable(element) for element in item)
     elif isinstance(item, set):
         return tuple(sorted(to_hashable(element) for element in item))
+    elif isinstance(item, CopyOnWriteTable):
+        return tuple((key, to_hashable(value)) for key, value in sorted(item.items()))
     else:
         return item
 
@@ -33,4 +41,144 @@ def get_data_hash(data) -> str:
     return consistent_hash(to_hashable(data))
 
 
+# ==============================
+# Merkle hash of the database
+# ==============================
+# Leaf = consistent_hash of one table entry (user, order, product, ...); leaves are grouped into
+# buckets by key, bucket digest = hash of its sorted (key, leaf) pairs, table root = hash of the
+# bucket digests, database root = hash of the sorted (table name, table root) pairs.
+# Two databases get the same root exactly when get_data_hash would call them equal (same tables,
+# keys and entry contents), but the leaves of the pristine tables are computed once per process and
+# a copy-on-write clone only rehashes the entries it touched and their buckets.
+
+MERKLE_BUCKETS = 256
+
+
+def _bucket_index(key) -> int:
+    return zlib.crc32(repr(key).encode("utf-8")) % MERKLE_BUCKETS
+
+
+def _bucket_digest(leaves: Dict[Any, str]) -> str:
+    return sha256("".join(f"{key!r}={leaf};" for key, leaf in sorted(leaves.items())).encode("utf-8")).hexdigest()
+
+
+def _combine(digests: List[str]) -> str:
+    return sha256("".join(digests).encode("utf-8")).hexdigest()
+
+
+class MerkleTable:
+    """Leaf digests of one table, bucketed by key, with the bucket digests and the table root."""
+
+    def __init__(self, table: Dict[Any, Any]):
+        self.buckets = [{} for _ in range(MERKLE_BUCKETS)]
+        for key, entry in table.items():
+            self.buckets[_bucket_index(key)][key] = get_data_hash(entry)
+        self.bucket_digests = [_bucket_digest(bucket) for bucket in self.buckets]
+        self.root = _combine(self.bucket_digests)
+
+    def root_with_changes(self, changes: Dict[Any, Optional[str]]) -> str:
+        """Root of the table after replacing leaves by changes ({key: new leaf, or None if deleted})."""
+        if not changes:
+            return self.root
+        changed_buckets = {}
+        for key, leaf in changes.items():
+            changed_buckets.setdefault(_bucket_index(key), {})[key] = leaf
+        bucket_digests = list(self.bucket_digests)
+        for index, leaves in changed_buckets.items():
+            bucket = dict(self.buckets[index])
+            for key, leaf in leaves.items():
+                if leaf is None:
+                    bucket.pop(key, None)
+                else:
+                    bucket[key] = leaf
+            bucket_digests[index] = _bucket_digest(bucket)
+        return _combine(bucket_digests)
+
+
+_pristine_merkle_tables = {}  # id(pristine table) -> (table, MerkleTable); the table is kept so its id stays unique
+_pristine_merkle_lock = threading.Lock()
+
+
+def _pristine_merkle_table(table: Dict[Any, Any]) -> MerkleTable:
+    with _pristine_merkle_lock:
+        cached = _pristine_merkle_tables.get(id(table))
+        if cached is None:
+            cached = (table, MerkleTable(table))
+            _pristine_merkle_tables[id(table)] = cached
+        return cached[1]
+
+
+def _table_root(table) -> str:
+    if isinstance(table, CopyOnWriteTable):
+        # Only entries fetched / set / deleted by this episode can differ from the pristine leaves
+        changes = {
+            key: get_data_hash(table[key]) if key in table else None
+            for key in table.touched_keys()
+        }
+        return _pristine_merkle_table(table.base).root_with_changes(changes)
+    if isinstance(table, dict):
+        return MerkleTable(table).root
+    return get_data_hash(table)
+
+
+def get_merkle_hash(data: Dict[str, Any]) -> str:
+    """
+    Merkle root of the environment data: same equality decisions as get_data_hash,
+    cost proportional to the entries touched since the pristine database was cloned.
+    """
+    return _combine([f"{name!r}={_table_root(table)};" for name, table in sorted(data.items())])
+
+
+class GroundTruthHashCache:
+    """
+    Ground-truth data hash per task, persisted to a JSON sidecar file shared by runs and processes.
+    Keys carry the task index, a digest of the task's actions and a fingerprint of the DB content,
+    so an edited task or database never reuses a stale hash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hashes = self._read()
+        self.write_failed = False
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        with self.lock:
+            return self.hashes.get(key)
+
+    def put(self, key: str, value: str):
+        """Store a hash and rewrite the file (merged with entries other processes added meanwhile)."""
+        with self.lock:
+            self.hashes[key] = value
+            if self.write_failed:
+                return
+            try:
+                self.hashes = {**self._read(), **self.hashes}
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.hashes, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # e.g. read-only cache dir: keep the cache in memory for this process
+                print(f"[WARNING] Cannot write GT hash cache {self.path}, keeping it in memory")
+                self.write_failed = True
+
+
+_gt_hash_caches = {}
+_gt_hash_caches_lock = threading.Lock()
+
 
+def get_gt_hash_cache(path: str) -> GroundTruthHashCache:
+    """Return the process-wide GT hash cache backed by path."""
+    with _gt_hash_caches_lock:
+        if path not in _gt_hash_caches:
+            _gt_hash_caches[path] = GroundTruthHashCache(path)
+        return _gt_hash_caches[path]
@@ -1,9 +1,9 @@
 """
 LLM inference utilities for user agent.
 """
-import time
 import os
-from openai import OpenAI
+from agent import llm_gateway
+from agent.llm_client import get_openai_client
 
 from typing import Optional, List, Dict, Any, Union
 
@@ -14,30 +14,28 @@ def openai_llm_inference(
         stop_strs: Optional[List[str]] = None,
         max_tokens: int = None):
     """Call OpenAI API with retry mechanism (non-streaming)."""
-    client = OpenAI(
+    client = get_openai_client(
         api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL"),
+        base_url=os.getenv("OPENAI_BASE_URL")
     )
-    retries = 0
-    max_retries = 10
-    while retries < max_retries:
-        try:
-            response = client.chat.completions.create(
-                        model=model,
-                        messages=messages,
-                        stop=stop_strs,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-            output=response.choices[0].message.content
-            return output
-        except KeyboardInterrupt:
-            print("Operation canceled by user.")
-            break
-        except Exception as e:
-            print(f"Someting wrong:{e}. Retrying in {retries*10+10} seconds...")
-            time.sleep(retries*10) 
-            retries += 1
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stop=stop_strs,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            max_retries=10
+        )
+        output=response.choices[0].message.content
+        return output
+    except KeyboardInterrupt:
+        print("Operation canceled by user.")
+    except Exception:
+        pass
     return ''
 
 # def openai_llm_stream_inference(
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the env packages the way run_main.py does, from the interact_with_env directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+"""
+run_check_functions shares one read-only view across checks; a check modifying any part of
+the state (dicts, lists, sets, tuples of lists, custom objects) must not leak into later checks.
+"""
+import copy
+
+import pytest
+
+from envscaler_env.utils.env_util import freeze_state, run_check_function, run_check_functions, UnfreezableStateError
+
+
+class Account:
+    def __init__(self):
+        self.balance = 10
+
+
+MUTATE_SET = """
+def check_func(final_state):
+    final_state["tags"].add("new")
+    return True
+"""
+
+MUTATE_TUPLE_ITEM = """
+def check_func(final_state):
+    final_state["pair"][0].append(3)
+    return True
+"""
+
+MUTATE_OBJECT = """
+def check_func(final_state):
+    final_state["account"].balance = 0
+    return True
+"""
+
+MUTATE_INITIAL = """
+def check_func(final_state):
+    initial_state["tags"].discard("a")
+    return True
+"""
+
+READ_ALL = """
+def check_func(final_state):
+    return (
+        final_state["tags"] == {"a"}
+        and final_state["pair"] == ([1, 2], 0)
+        and initial_state["tags"] == {"a"}
+        and getattr(final_state.get("account"), "balance", 10) == 10
+    )
+"""
+
+
+def make_state(with_object):
+    state = {"tags": {"a"}, "pair": ([1, 2], 0)}
+    if with_object:
+        state["account"] = Account()
+    return state
+
+
+@pytest.mark.parametrize("with_object", [False, True])
+def test_mutations_do_not_leak_into_later_checks(with_object):
+    init_state, final_state = make_state(with_object), make_state(with_object)
+    expected_final = copy.deepcopy(final_state)
+    func_codes = [MUTATE_SET, READ_ALL, MUTATE_TUPLE_ITEM, READ_ALL, MUTATE_INITIAL, READ_ALL]
+    if with_object:
+        func_codes += [MUTATE_OBJECT, READ_ALL]
+
+    results = run_check_functions(func_codes, init_state, final_state)
+
+    assert results == [
+        run_check_function(func_code, init_state, copy.deepcopy(final_state)) for func_code in func_codes
+    ]
+    assert all(result == (True, True, None) for result in results)
+    assert final_state["tags"] == expected_final["tags"] and final_state["pair"] == expected_final["pair"]
+    assert init_state["tags"] == {"a"}
+
+
+def test_freeze_state():
+    view = freeze_state({"tags": {"a"}, "pair": ([1], frozenset({(1, 2)}))})
+    assert view == {"tags": {"a"}, "pair": ([1], frozenset({(1, 2)}))}
+    with pytest.raises(TypeError):
+        view["tags"].add("b")
+    with pytest.raises(TypeError):
+        view["pair"][0].append(2)
+    # Copies are plain, writable containers
+    copied = copy.deepcopy(view)
+    copied["tags"].add("b")
+    assert type(copied["tags"]) is set
+    with pytest.raises(UnfreezableStateError):
+        freeze_state({"account": Account()})
@@ -0,0 +1,143 @@
+"""
+Tracked snapshots must equal get_state_info after every step.
+
+Random mutation sequences run on an env instance whose state is wrapped by MutationTracker;
+StateSnapshotEngine.snapshot(env, touched) is compared with a full copy (key order included).
+"""
+import random
+
+import pytest
+
+from envscaler_env.utils.env_util import StateSnapshotEngine, get_state_info
+from envscaler_env.utils.mutation_util import MutationTracker
+
+KEYS = ["a", "b", "c", "d", "e"]
+
+
+class Env:
+    def __init__(self):
+        self.users = {"u1": {"name": "x", "orders": [1, 2]}, "u2": {"name": "y", "orders": []}}
+        self.orders = [{"id": 1, "items": ["sku0"]}, {"id": 2, "items": []}]
+        self.counter = 0
+        self.tags = {"t": {"x"}}
+
+
+def ordered(value):
+    """Comparable form that keeps dict key order."""
+    if isinstance(value, dict):
+        return ("dict", [(key, ordered(item)) for key, item in value.items()])
+    if isinstance(value, list):
+        return ("list", [ordered(item) for item in value])
+    if isinstance(value, set):
+        return ("set", sorted(value, key=repr))
+    return value
+
+
+def containers(value):
+    """All dicts/lists reachable from value (including itself)."""
+    found, stack, seen = [], [value], set()
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, (dict, list)) or id(item) in seen:
+            continue
+        seen.add(id(item))
+        found.append(item)
+        stack.extend(item.values() if isinstance(item, dict) else item)
+    return found
+
+
+def new_value(rng, depth=0):
+    kind = rng.random()
+    if depth > 2 or kind < 0.4:
+        return rng.choice([rng.randint(0, 9), rng.choice(KEYS), None])
+    if kind < 0.7:
+        return {rng.choice(KEYS): new_value(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+    if kind < 0.95:
+        return [new_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return {rng.randint(0, 9)}
+
+
+def mutate(rng, env):
+    """Apply one random in-place mutation (or attribute reassignment) to env."""
+    state = vars(env)
+    if rng.random() < 0.05:
+        attr = rng.choice(["counter", "extra", "orders", "users"])
+        if attr in state and rng.random() < 0.3:
+            delattr(env, attr)
+        else:
+            setattr(env, attr, new_value(rng))
+        return
+    targets = [c for value in list(state.values()) for c in containers(value)]
+    if not targets:
+        return
+    target = rng.choice(targets)
+    value = new_value(rng)
+    if rng.random() < 0.2:
+        # Move a container from elsewhere in the state (never into itself)
+        moved = rng.choice(targets)
+        if not any(c is target for c in containers(moved)):
+            value = moved
+    if isinstance(target, dict):
+        key = rng.choice(KEYS)
+        op = rng.randrange(7)
+        if op == 0:
+            target[key] = value
+        elif op == 1 and key in target:
+            del target[key]
+        elif op == 2:
+            target.pop(key, None)
+        elif op == 3:
+            target.setdefault(key, value)
+        elif op == 4:
+            target.update({key: value})
+        elif op == 5 and target and rng.random() < 0.2:
+            target.clear()
+        elif op == 6 and target:
+            target.popitem()
+    else:
+        op = rng.randrange(8)
+        if op == 0:
+            target.append(value)
+        elif op == 1:
+            target.insert(rng.randint(0, len(target)), value)
+        elif op == 2 and target:
+            target.pop()
+        elif op == 3 and target:
+            target[rng.randrange(len(target))] = value
+        elif op == 4 and target:
+            del target[rng.randrange(len(target))]
+        elif op == 5:
+            target += [value]
+        elif op == 6:
+            target.reverse()
+        elif op == 7 and rng.random() < 0.2:
+            target.clear()
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_tracked_snapshot_matches_state_info(seed):
+    rng = random.Random(seed)
+    env = Env()
+    tracker = MutationTracker(env)
+    engine = StateSnapshotEngine()
+    engine.snapshot(env)
+    for _ in range(30):
+        for _ in range(rng.randint(1, 3)):
+            mutate(rng, env)
+        snapshot = engine.snapshot(env, touched=tracker.collect())
+        assert ordered(snapshot) == ordered(get_state_info(env))
+
+
+def test_dict_inside_list_attribute():
+    env = Env()
+    tracker = MutationTracker(env)
+    engine = StateSnapshotEngine()
+    engine.snapshot(env)
+
+    env.orders[0]["extra"] = []
+    engine.snapshot(env, touched=tracker.collect())
+    env.orders[0]["extra"].append("sku")
+    touched = tracker.collect()
+
+    assert touched["orders"] is None
+    assert engine.snapshot(env, touched=touched)["orders"][0]["extra"] == ["sku"]
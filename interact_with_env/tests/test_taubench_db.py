@@ -0,0 +1,120 @@
+"""
+Copy-on-write TauBench tables, their Merkle hash and secondary-index lookups.
+
+Random episodes edit a clone of a pristine database and a plain dict copy side by side;
+after every edit the clone must read like the dict (key order included) and get_merkle_hash
+must make the same equality decisions as get_data_hash, and find_entries must return what a
+scan returns.
+"""
+import random
+
+import pytest
+
+from taubench_env.utils.db_util import clone_database, copy_json, find_entries
+from taubench_env.utils.hash_util import get_data_hash, get_merkle_hash
+
+EMAILS = ["a@x", "b@x", "c@x"]
+
+
+def pristine_database(rng):
+    users = {
+        f"user_{i}": {"email": rng.choice(EMAILS), "orders": [f"order_{i}"], "address": {"zip": str(i % 3)}}
+        for i in range(40)
+    }
+    orders = {f"order_{i}": {"status": "pending", "items": [{"id": i}]} for i in range(40)}
+    return {"users": users, "orders": orders}
+
+
+def edit(rng, clone, plain):
+    """Apply the same random edit to the clone and to the plain copy."""
+    name = rng.choice(["users", "orders"])
+    table, plain_table = clone[name], plain[name]
+    keys = list(plain_table)
+    op = rng.randrange(5)
+    if op == 0 and keys:
+        # Tools fetch by key and mutate the entry in place
+        key = rng.choice(keys)
+        field, value = ("email", rng.choice(EMAILS)) if name == "users" else ("status", rng.choice(["pending", "cancelled"]))
+        table[key][field] = value
+        plain_table[key][field] = value
+    elif op == 1:
+        key = f"{name}_new_{rng.randrange(5)}"
+        value = {"email": rng.choice(EMAILS), "orders": []} if name == "users" else {"status": "pending", "items": []}
+        table[key] = copy_json(value)
+        plain_table[key] = copy_json(value)
+    elif op == 2 and keys:
+        key = rng.choice(keys)
+        del table[key]
+        del plain_table[key]
+    elif op == 3 and keys:
+        # Read-only fetch: the entry is copied into the overlay without changing
+        table[rng.choice(keys)]
+    elif op == 4 and keys:
+        # Undo an edit: same content as the pristine entry again
+        key = rng.choice(keys)
+        pristine_entry = table.base.get(key)
+        if pristine_entry is not None:
+            table[key] = copy_json(pristine_entry)
+            plain_table[key] = copy_json(pristine_entry)
+
+
+def episode(seed):
+    """Yield (rng, pristine, [(clone, plain)] * 2) after every edit of two concurrent episodes."""
+    rng = random.Random(seed)
+    pristine = pristine_database(rng)
+    pairs = [(clone_database(pristine), copy_json(pristine)) for _ in range(2)]
+    for _ in range(40):
+        edit(rng, *pairs[0])
+        if rng.random() < 0.3:
+            edit(rng, *pairs[1])
+        yield rng, pristine, pairs
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_clone_reads_like_plain_copy(seed):
+    for _, _, pairs in episode(seed):
+        for clone, plain in pairs:
+            assert {name: table.to_dict() for name, table in clone.items()} == plain
+            for name, table in clone.items():
+                assert list(table) == list(plain[name])
+                assert [key for key, _ in table.items()] == list(plain[name])
+
+
+def test_reinserted_key_moves_to_end():
+    pristine = {"users": {"a": {}, "b": {}}}
+    clone = clone_database(pristine)
+    del clone["users"]["a"]
+    clone["users"]["new"] = {}
+    clone["users"]["a"] = {"name": "x"}
+    assert list(clone["users"]) == ["b", "new", "a"]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_merkle_hash_matches_data_hash(seed):
+    pristine_merkle = pristine_data = None
+    for _, pristine, pairs in episode(seed):
+        if pristine_merkle is None:
+            pristine_merkle, pristine_data = get_merkle_hash(pristine), get_data_hash(pristine)
+        (clone, plain), (other, other_plain) = pairs
+        merkle = get_merkle_hash(clone)
+        assert merkle == get_merkle_hash(plain)
+        # Same equality decisions as the full hash, against the pristine DB and another episode
+        assert (merkle == pristine_merkle) == (get_data_hash(plain) == pristine_data)
+        assert (merkle == get_merkle_hash(other)) == (get_data_hash(plain) == get_data_hash(other_plain))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_entries_matches_scan(seed):
+    for rng, _, pairs in episode(seed):
+        clone, plain = pairs[0]
+        email = rng.choice(EMAILS)
+        expected = [(key, entry) for key, entry in plain["users"].items() if entry["email"] == email]
+        assert find_entries(clone["users"], "email", lambda user: user["email"], email) == expected
+
+
+def test_find_entries_reinserted_pristine_key():
+    pristine = {"users": {"a": {"email": "a@x"}, "b": {"email": "a@x"}}}
+    clone = clone_database(pristine)
+    del clone["users"]["a"]
+    clone["users"]["a"] = {"email": "a@x"}
+    assert [key for key, _ in find_entries(clone["users"], "email", lambda user: user["email"], "a@x")] == ["b", "a"]
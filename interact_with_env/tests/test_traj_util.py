@@ -0,0 +1,64 @@
+"""DeltaTrajectory must reproduce every step's state_snapshot exactly, also after a JSON round trip."""
+import json
+import random
+
+import pytest
+
+from envscaler_env.utils.traj_util import DeltaTrajectory, compact_trajectory, expand_trajectory
+
+KEYS = ["a", "b", "c", "d"]
+
+
+def random_value(rng, depth=0):
+    kind = rng.random()
+    if depth > 2 or kind < 0.5:
+        return rng.choice([0, 1, 1.0, True, None, "a", "", [], {}])
+    if kind < 0.8:
+        return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+
+
+def next_state(rng, state):
+    """Copy of state with a few random edits (set, delete or re-insert keys at any depth)."""
+    state = json.loads(json.dumps(state))
+    for _ in range(rng.randint(0, 3)):
+        parent = state
+        while True:
+            dicts = [value for value in parent.values() if isinstance(value, dict)]
+            if not dicts or rng.random() < 0.4:
+                break
+            parent = rng.choice(dicts)
+        key = rng.choice(KEYS)
+        op = rng.randrange(3)
+        if op == 0:
+            parent[key] = random_value(rng)
+        elif op == 1:
+            parent.pop(key, None)
+        elif key in parent:
+            # Same content, different key order
+            parent[key] = parent.pop(key)
+    return state
+
+
+def dumps(value):
+    # json.dumps keeps key order and tells 1 / 1.0 / True apart
+    return json.dumps(value)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_delta_trajectory_round_trip(seed):
+    rng = random.Random(seed)
+    state = {key: random_value(rng) for key in KEYS}
+    records = []
+    for step in range(20):
+        records.append({"step": step, "action": {"name": "x"}, "state_snapshot": state, "state_diff": {}})
+        state = next_state(rng, state)
+
+    trajectory = DeltaTrajectory.from_list(records)
+    # Random access in any order materializes the same states
+    for index in rng.sample(range(len(records)), len(records)):
+        assert dumps(trajectory[index]) == dumps(records[index])
+    assert dumps(trajectory.to_list()) == dumps(records)
+
+    compact = json.loads(json.dumps(compact_trajectory(records)))
+    assert dumps(expand_trajectory(compact)) == dumps(records)
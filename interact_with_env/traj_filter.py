@@ -12,14 +12,20 @@ print("Reasoning_FLAG:", REASONING_FLAG)
 RESPOND_ACTION_NAME = "chat_with_user"
 
 def read_json(file_path):
-    """Read JSON file."""
+    """Read JSON file (or JSONL file of run_main results)."""
     with open(file_path, 'r') as f:
+        if file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
         data = json.load(f)
     return data
 
 def save_json(file_path, data):
-    """Save data to JSON file."""
+    """Save data to JSON file (one item per line for .jsonl)."""
     with open(file_path, 'w') as f:
+        if file_path.endswith('.jsonl'):
+            for item in data:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+            return
         json.dump(data, f, indent=4, ensure_ascii=False)
         
 
@@ -1,4 +1,5 @@
 from .rl_conv_env import EnvScalerConvRLEnv
 from .rl_non_conv_env import EnvScalerNonConvRLEnv
+from .batch_env import BatchEnvScalerEnv
 
-__all__ = ["EnvScalerConvRLEnv", "EnvScalerNonConvRLEnv"]
\ No newline at end of file
+__all__ = ["EnvScalerConvRLEnv", "EnvScalerNonConvRLEnv", "BatchEnvScalerEnv"]
\ No newline at end of file
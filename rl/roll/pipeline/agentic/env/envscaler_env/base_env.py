@@ -3,20 +3,27 @@ Base environment class for EnvScaler.
 """
 import os
 import gem
-import json
 import random
 import traceback
 from gem import Env
 from copy import deepcopy
 
 from .utils.env_util import (
-    init_env_class,
-    init_env_instance,
+    get_env_class,
+    get_env_instance,
     get_state_diff,
+    get_tracked_state_diff,
     get_state_info,
-    run_check_function,
+    StateSnapshotEngine,
+    run_check_functions,
+    precompile_check_functions,
 )
 from .utils.parse_util import parse_response, parse_action
+from .utils.mutation_util import MutationTracker
+from .utils.traj_util import DeltaTrajectory
+from .utils.metadata_store import load_metadata
+from .utils.check_executor import get_check_executor
+from .utils.timing_util import record_span
 
 
 class EnvScalerBaseEnv(gem.Env):
@@ -28,22 +35,31 @@ class EnvScalerBaseEnv(gem.Env):
     Subclasses must implement abstract methods (construct prompt, initial observation, termination conditions, etc.)
     """
 
-    def __init__(self, mode, env_items_path=None, task_items_path=None):
+    def __init__(self, mode, env_items_path=None, task_items_path=None, track_mutations=False, check_timeout=None, pool_instances=False):
         super().__init__()
         self.mode = mode
+        # Opt-in: track tool-call mutations so snapshots/diffs only visit touched paths
+        self.track_mutations = track_mutations
+        # Opt-in: run check functions in the pooled subprocess executor with this per-call timeout (seconds)
+        self.check_timeout = check_timeout
+        # Opt-in: clone env instances from a per-task pristine instance (init cost paid once per task)
+        self.pool_instances = pool_instances
 
         # Load task dataset and environment dataset
         if task_items_path is not None:
-            self.task_items = json.load(open(task_items_path, encoding="utf-8"))
+            self.task_items = load_metadata(task_items_path, key_field="task_id")
             print(f"Ignore the mode {self.mode}.\nLoad task_items from {task_items_path}, total {len(self.task_items)} tasks!")
         else:
             self.task_items = self.load_task_items()
         if env_items_path is not None:
-            self.env_items = json.load(open(env_items_path, encoding="utf-8"))
+            self.env_items = load_metadata(env_items_path)
             print(f"Load env_items from {env_items_path}, total {len(self.env_items)} envs!")
         else:
             self.env_items = self.load_env_items()
 
+        # Compile all check functions once at load (cached process-wide)
+        precompile_check_functions(self.task_items)
+
         # Initialize logs and environment state
         self.reset_attributes()
 
@@ -55,8 +71,7 @@ class EnvScalerBaseEnv(gem.Env):
         """Load environment dataset."""
         folder_path = os.path.join(os.path.dirname(__file__), "data")
         env_items_path = os.path.join(folder_path, "191_env_metadata.json")
-        with open(env_items_path, encoding="utf-8") as f:
-            env_items = json.load(f)
+        env_items = load_metadata(env_items_path)
 
         print(f"Load {len(env_items)} envs from {env_items_path}!")
         return env_items
@@ -71,8 +86,7 @@ class EnvScalerBaseEnv(gem.Env):
         else:
             raise ValueError("mode must be train")
 
-        with open(task_items_path, encoding="utf-8") as f:
-            task_items = json.load(f)
+        task_items = load_metadata(task_items_path, key_field="task_id")
 
         print(f"Load {len(task_items)} tasks from {task_items_path}!")
         return task_items
@@ -85,13 +99,18 @@ class EnvScalerBaseEnv(gem.Env):
         """Reset class attributes (logs and environment state)."""
         # Log related
         self.current_step = 0
-        self.trajectory = []
+        # Timing spans of the current step, returned in info["spans"] by finish_step
+        self.step_spans = []
+        # Base snapshot + per-step state deltas, indexable like a list of step records
+        self.trajectory = DeltaTrajectory()
 
         # Environment related
         self.env_item = None
         self.env_class = None
         self.env_instance = None
         self.system_prompt = None
+        self.snapshot_engine = None
+        self.mutation_tracker = None
 
         # Scenario related (initial state, task item, check functions, etc.)
         self.init_config = None
@@ -150,16 +169,20 @@ class EnvScalerBaseEnv(gem.Env):
         self.env_item = self.env_items[env_id]
         env_class_code = self.env_item["env_class_code"]
         env_class_name = self.task_item["env_class_name"]
-        # Initialize environment class and instance
-        self.env_class = init_env_class(env_class_code, env_class_name)
-        self.env_instance = init_env_instance(self.env_class, init_config)
+        # Get (cached) environment class and initialize (pooled) instance
+        self.env_class = get_env_class(env_class_code, env_class_name)
+        pool_key = (env_id, self.task_id) if self.pool_instances else None
+        self.env_instance = get_env_instance(self.env_class, init_config, key=pool_key)
         # Save initial state
         self.init_state = get_state_info(self.env_instance)
-        # Initial trajectory record
+        # Initial trajectory record (later snapshots share unchanged subtrees with it)
+        self.snapshot_engine = StateSnapshotEngine()
         self.trajectory.append({
             "step": 0,
-            "state_snapshot": deepcopy(self.init_state)
+            "state_snapshot": self.snapshot_engine.snapshot(self.env_instance)
         })
+        if self.track_mutations:
+            self.mutation_tracker = MutationTracker(self.env_instance)
 
     # ==============================
     # Environment interaction step
@@ -167,9 +190,23 @@ class EnvScalerBaseEnv(gem.Env):
 
     def step(self, action: str | dict):
         """Execute one step of environment interaction, return observation, reward, terminated, truncated, info."""
+        action, observation, terminated, truncated, info, needs_reward = self.apply_action(action)
+        reward = 0.0
+        if needs_reward:
+            reward = self.calculate_reward(self.checklist_with_func, self.init_state, self.pred_final_state)
+        return self.finish_step(action, observation, reward, terminated, truncated, info)
+
+    def apply_action(self, action: str | dict):
+        """
+        Parse and execute one action without calculating reward.
+        Return action, observation, terminated, truncated, info and whether the reward is due
+        (the episode finished and pred_final_state was recorded); pass them to finish_step.
+        """
+        self.step_spans = []
         raw_response = deepcopy(action)
         
-        observation, reward, terminated, truncated, info = None, 0.0, False, False, {"action": raw_response}
+        observation, terminated, truncated, info = None, False, False, {"action": raw_response}
+        needs_reward = False
 
         # Parse response to action dict
         # String response needs additional parsing to struct_response
@@ -177,33 +214,30 @@ class EnvScalerBaseEnv(gem.Env):
             parse_success, struct_response = self._parse_response(text_response=raw_response)
             if not parse_success:
                 observation = {"type": "user", "content": "Error: Failed to parse response to struct response"}
-                self._record_step(action, observation, terminated, reward)
-                return observation, reward, terminated, truncated, info
+                return action, observation, terminated, truncated, info, needs_reward
         else:
             struct_response = raw_response
         
         parse_success, action = self._parse_action(struct_response)
         if not parse_success:
             observation = {"type": "user", "content": "Error: Failed to parse response to action"}
-            self._record_step(action, observation, terminated, reward)
-            return observation, reward, terminated, truncated, info
+            return action, observation, terminated, truncated, info, needs_reward
     
         info.update({"action": action})
         
         # Check action validity
         if not self.check_vaild_action(action=action):
             observation = {"type": "user", "content": "Error: Invalid action"}
-            self._record_step(action, observation, terminated, reward)
-            return observation, reward, terminated, truncated, info
+            return action, observation, terminated, truncated, info, needs_reward
 
         # Check if action is termination action
         if self.is_action_terminated(action):
             observation = {"type": "user", "content": "Task finished"}
             terminated = True
-            self.pred_final_state = get_state_info(self.env_instance)
-            reward = self.calculate_reward(self.checklist_with_func, self.init_state, self.pred_final_state)
-            self._record_step(action, observation, terminated, reward)
-            return observation, reward, terminated, truncated, info
+            with record_span(self.step_spans, "snapshot"):
+                self.pred_final_state = get_state_info(self.env_instance)
+            needs_reward = True
+            return action, observation, terminated, truncated, info, needs_reward
 
         try:
             # Call environment method
@@ -211,28 +245,35 @@ class EnvScalerBaseEnv(gem.Env):
                 # 检查user_agent是否已初始化（仅在ConvCustomEnv中初始化）
                 if not hasattr(self, "user_agent") or self.user_agent is None:
                     raise AttributeError("user_agent is not initialized. chat_with_user action requires EnvScalerConvRLEnv.")
-                observation = {"type": "user", "content": self.user_agent.user_step(agent_response=action["arguments"]["content"])}
+                with record_span(self.step_spans, "user_llm"):
+                    observation = {"type": "user", "content": self.user_agent.user_step(agent_response=action["arguments"]["content"])}
             else:
-                observation = {"type": "tool", "content": f"{getattr(self.env_instance, action['name'])(**action['arguments'])}"}
+                with record_span(self.step_spans, "tool"):
+                    observation = {"type": "tool", "content": f"{getattr(self.env_instance, action['name'])(**action['arguments'])}"}
             
             # Check if observation is termination observation
             if self.is_observation_terminated(action, observation):
                 terminated = True
-                # Once finished, record final state snapshot and calculate reward
-                self.pred_final_state = get_state_info(self.env_instance)
-                reward = self.calculate_reward(self.checklist_with_func, self.init_state, self.pred_final_state)
+                # Once finished, record final state snapshot (reward is calculated by the caller)
+                with record_span(self.step_spans, "snapshot"):
+                    self.pred_final_state = get_state_info(self.env_instance)
+                needs_reward = True
 
-            # Record and return
-            self._record_step(action, observation, terminated, reward)
-            return observation, reward, terminated, truncated, info
+            return action, observation, terminated, truncated, info, needs_reward
 
         except Exception:
             # Catch execution exception and terminate
             error_log = traceback.format_exc()
             observation = {"type": "user", "content": "Error: <Exception>\n" + error_log}
             terminated = True
+            return action, observation, terminated, truncated, info, needs_reward
+
+    def finish_step(self, action, observation, reward, terminated, truncated, info):
+        """Record the step (with its reward) in the trajectory and return the step result."""
+        with record_span(self.step_spans, "snapshot"):
             self._record_step(action, observation, terminated, reward)
-            return observation, reward, terminated, truncated, info
+        info["spans"] = self.step_spans
+        return observation, reward, terminated, truncated, info
 
     # ==============================
     # Utility methods
@@ -241,8 +282,13 @@ class EnvScalerBaseEnv(gem.Env):
     def _record_step(self, action, observation, terminated, reward):
         """Record current step trajectory."""
         last_state = self.trajectory[-1]["state_snapshot"]
-        current_state = get_state_info(self.env_instance)
-        state_diff = get_state_diff(last_state, current_state)
+        if self.mutation_tracker is not None:
+            touched = self.mutation_tracker.collect()
+            current_state = self.snapshot_engine.snapshot(self.env_instance, touched=touched)
+            state_diff = get_tracked_state_diff(last_state, current_state, touched)
+        else:
+            current_state = self.snapshot_engine.snapshot(self.env_instance)
+            state_diff = get_state_diff(last_state, current_state)
         # Increment step counter
         self.current_step += 1
         self.trajectory.append({
@@ -285,16 +331,33 @@ class EnvScalerBaseEnv(gem.Env):
 
     def calculate_reward(self, checklist_with_func: list, init_state: dict, pred_final_state: dict) -> float:
         """Calculate reward based on final state."""
-        checklist_with_func_result = []
-
-        for check_item in checklist_with_func:
-            check_func_str = check_item["check_func"]
-            success, result, error = run_check_function(
-                func_code=check_func_str,
+        with record_span(self.step_spans, "reward"):
+            return self._calculate_reward(checklist_with_func, init_state, pred_final_state)
+
+    def _calculate_reward(self, checklist_with_func: list, init_state: dict, pred_final_state: dict) -> float:
+        func_codes = [check_item["check_func"] for check_item in checklist_with_func]
+        if self.check_timeout is not None:
+            # Isolated workers: a hanging or memory-hungry check cannot stall this process
+            check_results = get_check_executor().run(
+                func_codes=func_codes,
+                init_state=init_state,
+                final_state=pred_final_state,
+                timeout=self.check_timeout
+            )
+        else:
+            # All checks share one read-only view of the states; code objects come from the compile cache
+            check_results = run_check_functions(
+                func_codes=func_codes,
                 init_state=init_state,
                 final_state=pred_final_state
             )
-            new_check_item = deepcopy(check_item)
+        return self.score_check_results(checklist_with_func, check_results)
+
+    def score_check_results(self, checklist_with_func: list, check_results: list) -> float:
+        """Average the check function results of one trajectory into its reward."""
+        checklist_with_func_result = []
+        for check_item, (success, result, error) in zip(checklist_with_func, check_results):
+            new_check_item = dict(check_item)
             new_check_item["check_func_result"] = {"success": success, "result": result, "error": error}
             checklist_with_func_result.append(new_check_item)
 
@@ -7,14 +7,14 @@ from .base_env import EnvScalerBaseEnv
 class EnvScalerConvRLEnv(EnvScalerBaseEnv):
     """Conversational RL environment that uses UserAgent for multi-turn dialogue."""
 
-    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None):
+    def __init__(self, mode, user_model, provider, env_items_path=None, task_items_path=None, track_mutations=False, check_timeout=None, pool_instances=False):
         self.user_agent = UserAgent(
             system_prompt=user_system_prompt,
             model=user_model,
             provider=provider
         )
         self.env_name = "envscaler_conversation_rl"
-        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path)
+        super().__init__(mode=mode, env_items_path=env_items_path, task_items_path=task_items_path, track_mutations=track_mutations, check_timeout=check_timeout, pool_instances=pool_instances)
 
     def get_initial_observation(self, task_item: dict):
         """Get initial observation from user agent's first reply."""
@@ -1,9 +1,17 @@
 """
 Utility functions for environment initialization and state management.
 """
+import json
 import types
+import pickle
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
 from copy import deepcopy
 
+from .mutation_util import TrackedDict, TrackedList
+
 def init_env_class(env_class_code: str, env_class_name: str):
     """
     Initialize an environment class from source code string.
@@ -21,6 +29,86 @@ def init_env_class(env_class_code: str, env_class_name: str):
     return getattr(module, env_class_name)
 
 
+class CompileCache:
+    """
+    Process-wide LRU cache for objects compiled from source strings.
+
+    Entries are keyed by a content hash of the source parts (e.g. env_class_code and
+    env_class_name), so identical sources only pay the compile/`exec` cost once.
+    """
+
+    def __init__(self, compile_fn, max_size: int = 256):
+        self.compile_fn = compile_fn
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Return content hash of the source parts."""
+        hasher = hashlib.sha256()
+        for part in parts:
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def get(self, *parts: str):
+        """Return cached object, compiling it on first use."""
+        key = self.make_key(*parts)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        # Compile outside the lock, concurrent misses on the same key are harmless
+        value = self.compile_fn(*parts)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self):
+        """Drop all cached entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every env instance in this process
+env_class_cache = CompileCache(init_env_class, max_size=256)
+
+
+def get_env_class(env_class_code: str, env_class_name: str):
+    """
+    Get an environment class from the process-wide cache (compiled on first use).
+
+    :param env_class_code: Python source code string of the environment class
+    :param env_class_name: Name of the class (must be defined in the code)
+    :return: Environment class object
+    """
+    return env_class_cache.get(env_class_code, env_class_name)
+
+
 def init_env_instance(env_class, init_config=None):
     """
     Create an environment instance from class and apply initial config.
@@ -47,6 +135,100 @@ def init_env_instance(env_class, init_config=None):
     return env_instance
 
 
+def _config_digest(init_config) -> str:
+    """Content hash of an init_config (key order does not matter)."""
+    encoded = json.dumps(init_config, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class EnvInstancePool:
+    """
+    Process-wide LRU pool of pristine environment instances.
+
+    The first request for a key builds the instance with `init_env_instance` and caches
+    its state as a pickled blob; later requests get a fresh clone restored from that
+    blob, so e.g. the rollouts of one RL group pay the init cost once. Entries are keyed
+    by the env class, the caller's key (e.g. env_id + task_id) and a content digest of
+    init_config, so equal keys from different task files never share a pristine state.
+    States that cannot be pickled fall back to deep-copying the pristine instance's state.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, env_class, init_config=None, key=None):
+        """Return a fresh instance initialized from init_config, cloned from the pooled pristine one."""
+        if key is None:
+            return init_env_instance(env_class, init_config)
+        # Class identity is part of the key, a recompiled class gets its own entry
+        key = (env_class, key, _config_digest(init_config))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+
+        if entry is None:
+            # Build outside the lock, concurrent misses on the same key are harmless
+            pristine = init_env_instance(env_class, init_config)
+            try:
+                entry = (pickle.dumps(vars(pristine), protocol=pickle.HIGHEST_PROTOCOL), None)
+            except Exception:
+                entry = (None, pristine)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        blob, pristine = entry
+        state = pickle.loads(blob) if blob is not None else deepcopy(vars(pristine))
+        # Skip __init__, the pristine state already reflects constructor + init_config
+        env_instance = env_class.__new__(env_class)
+        env_instance.__dict__.update(state)
+        return env_instance
+
+    def stats(self) -> dict:
+        """Return pool size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self):
+        """Drop all pooled instances and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every env instance in this process
+env_instance_pool = EnvInstancePool(max_size=1024)
+
+
+def get_env_instance(env_class, init_config=None, key=None):
+    """
+    Get an environment instance, cloned from the process-wide pool when a key is given.
+
+    :param env_class: Environment class object
+    :param init_config: Optional dict for initial attribute configuration
+    :param key: Hashable key of the task (e.g. (env_id, task_id)), combined with a digest of init_config; None disables pooling
+    :return: Environment instance object
+    """
+    return env_instance_pool.get(env_class, init_config, key)
+
 
 def get_state_diff(old_state: dict, new_state: dict, ignore_keys: list = []) -> dict:
     """
@@ -55,10 +237,9 @@ def get_state_diff(old_state: dict, new_state: dict, ignore_keys: list = []) ->
     - Removed keys
     - Changed values
     
-    Recursively compares dict values.
+    Recursively compares dict values. Inputs are only read, never modified.
+    Subtrees shared by identity (see StateSnapshotEngine) are skipped.
     """
-    old_state = deepcopy(old_state)
-    new_state = deepcopy(new_state)
     diff_result = {}
 
     # Find union of all keys
@@ -68,7 +249,9 @@ def get_state_diff(old_state: dict, new_state: dict, ignore_keys: list = []) ->
         old_val = old_state.get(key)
         new_val = new_state.get(key)
 
-        if key not in old_state: # Added key
+        if old_val is new_val and key in old_state and key in new_state: # Shared subtree, unchanged
+            continue
+        elif key not in old_state: # Added key
             diff_result[key] = {"added": new_val}
         elif key not in new_state: # Removed key
             diff_result[key] = {"removed": old_val}
@@ -91,37 +274,374 @@ def get_state_diff(old_state: dict, new_state: dict, ignore_keys: list = []) ->
     return deepcopy(diff_result)
 
 
+def get_tracked_state_diff(old_state: dict, new_state: dict, touched: dict, ignore_keys: list = []) -> dict:
+    """
+    Same result as get_state_diff, but only compares the paths a MutationTracker reported.
+
+    :param touched: {attr: set of top-level keys | None (whole attribute)}
+    """
+    if old_state is new_state:
+        return {}
+    diff_result = {}
+
+    for key in set(old_state.keys()) | set(new_state.keys()):
+        old_val = old_state.get(key)
+        new_val = new_state.get(key)
+        keys = touched.get(key)
+        if key in old_state and key in new_state and keys is not None \
+                and isinstance(old_val, dict) and isinstance(new_val, dict):
+            # Only the touched top-level entries of this attribute can differ
+            sub_diff = get_state_diff(
+                {k: old_val[k] for k in keys if k in old_val},
+                {k: new_val[k] for k in keys if k in new_val},
+            )
+            if sub_diff:
+                diff_result[key] = sub_diff
+        else:
+            sub_diff = get_state_diff({key: old_val} if key in old_state else {}, {key: new_val} if key in new_state else {})
+            diff_result.update(sub_diff)
+
+    for key in ignore_keys:
+        if key in diff_result:
+            del diff_result[key]
+
+    return deepcopy(diff_result)
+
+
 def get_state_info(env_instance):
     """Return state dictionary of environment instance (excluding built-in attributes)."""
-    return deepcopy({
+    return deepcopy(_get_raw_state(env_instance))
+
+
+def _get_raw_state(env_instance):
+    """Return live (uncopied) state dictionary of environment instance."""
+    return {
         k: v for k, v in vars(env_instance).items()
         if not (k.startswith("__") and k.endswith("__"))
-    })
+    }
 
 
-def run_check_function(func_code: str, init_state: dict, final_state: dict):
+_ATOMIC_TYPES = (str, int, float, bool, bytes, type(None))
+
+# Tracking containers are snapshotted as the plain types they stand for
+_PLAIN_TYPES = {TrackedDict: dict, TrackedList: list}
+
+
+def _copy_with_sharing(live, prev):
     """
-    Dynamically execute a verification function defined in func_code.
+    Snapshot `live`, reusing subtrees of the previous snapshot `prev` that are unchanged.
+
+    Only plain dicts/lists are walked and atomic values are compared with strict type
+    checks; anything else is deep-copied as before. Returns `prev` itself when nothing
+    under it changed.
     """
+    live_type = _PLAIN_TYPES.get(type(live), type(live))
+    if live_type is not type(prev):
+        return deepcopy(live)
+
+    if live_type is dict:
+        snapshot = {}
+        unchanged = len(live) == len(prev)
+        prev_keys = iter(prev)
+        for key, value in live.items():
+            # Key order is part of the snapshot (it shows in the trajectory JSON)
+            unchanged = unchanged and next(prev_keys) == key
+            if key in prev:
+                sub_snapshot = _copy_with_sharing(value, prev[key])
+                unchanged = unchanged and sub_snapshot is prev[key]
+            else:
+                sub_snapshot = deepcopy(value)
+                unchanged = False
+            snapshot[key] = sub_snapshot
+        return prev if unchanged else snapshot
+
+    if live_type is list:
+        if len(live) != len(prev):
+            return deepcopy(live)
+        snapshot = [_copy_with_sharing(value, prev_value) for value, prev_value in zip(live, prev)]
+        unchanged = all(a is b for a, b in zip(snapshot, prev))
+        return prev if unchanged else snapshot
+
+    if live_type in _ATOMIC_TYPES:
+        return prev if live == prev else live
+
+    return deepcopy(live)
+
+
+class StateSnapshotEngine:
+    """
+    Build per-step state snapshots with structural sharing.
+
+    Each snapshot is value-identical to `get_state_info`, but subtrees that did not
+    change since the previous snapshot are shared instead of copied. Snapshots must
+    therefore be treated as read-only.
+
+    If `touched` paths from a MutationTracker are given, only those paths are
+    re-snapshotted and everything else is taken from the previous snapshot.
+    """
+
+    def __init__(self):
+        self.last_snapshot = None
+
+    def snapshot(self, env_instance, touched: dict = None) -> dict:
+        """Return state snapshot of environment instance."""
+        state = _get_raw_state(env_instance)
+        if self.last_snapshot is None:
+            snapshot = deepcopy(state)
+        elif touched is None:
+            snapshot = _copy_with_sharing(state, self.last_snapshot)
+        else:
+            snapshot = self._snapshot_touched(state, self.last_snapshot, touched)
+        self.last_snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _snapshot_touched(state: dict, prev: dict, touched: dict) -> dict:
+        """Re-snapshot only touched paths; untracked attributes are atomic and compared directly."""
+        snapshot = {}
+        unchanged = len(state) == len(prev)
+        for attr, value in state.items():
+            if attr not in prev:
+                sub_snapshot = deepcopy(value)
+            elif attr not in touched:
+                # Untouched container, or atomic value (cheap to compare)
+                sub_snapshot = prev[attr] if type(value) in _PLAIN_TYPES else _copy_with_sharing(value, prev[attr])
+            elif touched[attr] is None or type(prev[attr]) is not dict:
+                sub_snapshot = _copy_with_sharing(value, prev[attr])
+            else:
+                prev_value = prev[attr]
+                sub_snapshot = dict(prev_value)
+                for key in touched[attr]:
+                    if key not in value:
+                        sub_snapshot.pop(key, None)
+                    elif key in prev_value:
+                        sub_snapshot[key] = _copy_with_sharing(value[key], prev_value[key])
+                    else:
+                        sub_snapshot[key] = deepcopy(value[key])
+                if list(sub_snapshot) != list(value):
+                    # Key order changed (e.g. pop + re-insert), rebuild in live order
+                    sub_snapshot = {key: sub_snapshot[key] for key in value}
+                elif all(
+                    (key in sub_snapshot) == (key in prev_value)
+                    and (key not in sub_snapshot or sub_snapshot[key] is prev_value[key])
+                    for key in touched[attr]
+                ):
+                    sub_snapshot = prev_value
+            unchanged = unchanged and sub_snapshot is prev.get(attr)
+            snapshot[attr] = sub_snapshot
+        return prev if unchanged else snapshot
+
+
+class ReadOnlyStateError(TypeError):
+    """Raised when a check function tries to modify a shared read-only state view."""
+
+
+class UnfreezableStateError(TypeError):
+    """Raised by freeze_state for values it cannot make read-only (e.g. custom objects)."""
+
+
+# Set when a check function tried to modify a read-only view (even if it swallowed the error)
+_read_only_violation = threading.local()
+
+
+def _read_only(self, *args, **kwargs):
+    _read_only_violation.hit = True
+    raise ReadOnlyStateError("state passed to check functions is read-only")
+
+
+class FrozenDict(dict):
+    """Read-only dict used for state views shared across check functions. Copies are plain dicts."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    pop = popitem = setdefault = update = clear = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        result = {}
+        memo[id(self)] = result
+        for key, value in self.items():
+            result[deepcopy(key, memo)] = deepcopy(value, memo)
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """Read-only list used for state views shared across check functions. Copies are plain lists."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        result = []
+        memo[id(self)] = result
+        result.extend(deepcopy(value, memo) for value in self)
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+class FrozenSet(set):
+    """Read-only set used for state views shared across check functions. Copies are plain sets."""
+
+    __ior__ = __iand__ = __isub__ = __ixor__ = _read_only
+    add = discard = remove = pop = clear = update = _read_only
+    intersection_update = difference_update = symmetric_difference_update = _read_only
+
+    def __copy__(self):
+        return set(self)
+
+    def __deepcopy__(self, memo):
+        result = set()
+        memo[id(self)] = result
+        result.update(deepcopy(value, memo) for value in self)
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return set, (list(self),)
+
+
+def freeze_state(state, memo=None):
+    """
+    Return a read-only copy of state (dicts/lists/sets frozen, tuples and frozensets rebuilt from frozen items).
+    Raises UnfreezableStateError if state holds any other mutable value, which a check could modify unnoticed.
+    """
+    if memo is None:
+        memo = {}
+    if id(state) in memo:
+        return memo[id(state)]
+    if isinstance(state, (FrozenDict, FrozenList, FrozenSet)):
+        # Already a read-only view (e.g. built by the check worker)
+        frozen = state
+    elif isinstance(state, dict):
+        frozen = FrozenDict()
+        memo[id(state)] = frozen
+        for key, value in state.items():
+            dict.__setitem__(frozen, key, freeze_state(value, memo))
+    elif isinstance(state, list):
+        frozen = FrozenList()
+        memo[id(state)] = frozen
+        list.extend(frozen, [freeze_state(value, memo) for value in state])
+    elif isinstance(state, set):
+        frozen = FrozenSet()
+        memo[id(state)] = frozen
+        set.update(frozen, [freeze_state(value, memo) for value in state])
+    elif type(state) in (tuple, frozenset):
+        frozen = type(state)(freeze_state(value, memo) for value in state)
+        memo[id(state)] = frozen
+    elif isinstance(state, _ATOMIC_TYPES):
+        frozen = state
+    else:
+        raise UnfreezableStateError(f"cannot freeze state value of type {type(state).__name__}")
+    return frozen
+
+
+def _compile_check_function(func_code: str):
+    """
+    Compile check function source. A compile error is returned (and cached) as (type, args)
+    instead of raised, so each call raises a fresh exception without an accumulated traceback.
+    """
+    try:
+        return compile(func_code, "<string>", "exec"), None
+    except Exception as e:
+        return None, (type(e), e.args)
+
+
+# Compiled check functions, shared across tasks/rollouts in this process
+check_func_cache = CompileCache(_compile_check_function, max_size=65536)
+
+
+# Shared task datasets (metadata stores) whose check functions were already compiled
+_precompiled_task_items = weakref.WeakSet()
+
+
+def precompile_check_functions(task_items: list):
+    """Compile the check functions of all tasks into the process-wide cache."""
+    try:
+        if task_items in _precompiled_task_items:
+            return
+    except TypeError:
+        pass
+    for task_item in task_items:
+        for check_item in task_item.get("checklist_with_func", None) or []:
+            if check_item.get("check_func"):
+                check_func_cache.get(check_item["check_func"])
+    try:
+        _precompiled_task_items.add(task_items)
+    except TypeError:
+        pass
+
+
+def _call_check_function(func_code: str, init_state: dict, final_state: dict):
+    """Run a (cached) compiled check function; raises on errors."""
+    code, compile_error = check_func_cache.get(func_code)
+    if compile_error is not None:
+        error_type, error_args = compile_error
+        raise error_type(*error_args)
+
     safe_globals = {
         '__builtins__': __builtins__,
+        "initial_state": init_state,
     }
-    safe_globals.update({"initial_state": deepcopy(init_state)})
+    # Execute in safe_globals, function will retain this global scope
+    exec(code, safe_globals)
 
-    try:
-        # Execute in safe_globals, function will retain this global scope
-        exec(func_code, safe_globals)
+    if 'check_func' not in safe_globals:
+        return False, None, "Function 'check_func' not found."
+
+    result = safe_globals['check_func'](final_state)
 
-        if 'check_func' not in safe_globals:
-            return False, None, "Function 'check_func' not found."
+    if not isinstance(result, bool):
+        print("Function did not return a boolean. Result: {result}")
+        return False, None, "Function did not return a boolean."
 
-        result = safe_globals['check_func'](final_state)
+    return True, result, None
 
-        if not isinstance(result, bool):
-            print("Function did not return a boolean. Result: {result}")
-            return False, None, "Function did not return a boolean."
 
-        return True, result, None
+def run_check_function(func_code: str, init_state: dict, final_state: dict):
+    """
+    Dynamically execute a verification function defined in func_code.
+    """
+    try:
+        return _call_check_function(func_code, deepcopy(init_state), final_state)
     except Exception as e:
         print("Error:", e)
-        return False, None, str(e)
\ No newline at end of file
+        return False, None, str(e)
+
+
+def run_check_functions(func_codes: list, init_state: dict, final_state: dict) -> list:
+    """
+    Run several check functions of one trajectory against a shared read-only view of
+    init_state / final_state (built once instead of deep-copying per check).
+
+    A check that tries to modify the view is re-run with private copies, so results
+    match calling run_check_function on each item. States holding values freeze_state
+    cannot make read-only give every check private copies.
+    :return: list of (success, result, error)
+    """
+    try:
+        init_view = freeze_state(init_state)
+        final_view = freeze_state(final_state)
+    except UnfreezableStateError:
+        return [run_check_function(func_code, init_state, deepcopy(final_state)) for func_code in func_codes]
+    results = []
+    for func_code in func_codes:
+        _read_only_violation.hit = False
+        try:
+            result = _call_check_function(func_code, init_view, final_view)
+        except Exception as e:
+            result = e
+        if _read_only_violation.hit:
+            result = run_check_function(func_code, init_state, deepcopy(final_state))
+        elif isinstance(result, Exception):
+            print("Error:", result)
+            result = (False, None, str(result))
+        results.append(result)
+    return results
@@ -0,0 +1,316 @@
+"""
+Read-only, memory-mapped store for env and task metadata.
+
+Parsing the full env/scenario JSON files for every env construction is slow and every
+copy lives on the heap of each worker. Instead, each JSON file is converted once into a
+compact binary file (one JSON blob per record field plus an offset table); the file is
+memory-mapped, so processes share its pages through the OS page cache, and a record's
+fields are decoded only when accessed.
+
+Binary layout (little endian):
+    magic (8 bytes) | header length (uint64) | header JSON | padding to 8 bytes
+    offset table: int64 (offset, length) per record and field, length -1 if absent
+    data: concatenated UTF-8 JSON encodings of field values
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+from collections.abc import Mapping
+
+_MAGIC = b"ENVMETA1"
+_CACHE_DIR = os.path.join(tempfile.gettempdir(), "envscaler_metadata")
+
+
+def _build_store_file(json_path: str, store_path: str, key_field: str = None):
+    """Convert a JSON list/dict of records into the binary store format."""
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        kind, keys, records = "dict", list(data.keys()), list(data.values())
+    else:
+        kind, records = "list", data
+        keys = [record.get(key_field) if key_field else None for record in records]
+
+    fields, field_index = [], {}
+    orders, order_index, record_orders = [], {}, []
+    for record in records:
+        order = []
+        for field in record:
+            if field not in field_index:
+                field_index[field] = len(fields)
+                fields.append(field)
+            order.append(field_index[field])
+        order = tuple(order)
+        if order not in order_index:
+            order_index[order] = len(orders)
+            orders.append(list(order))
+        record_orders.append(order_index[order])
+
+    table = [-1] * (len(records) * len(fields) * 2)
+    blob = bytearray()
+    for i, record in enumerate(records):
+        for field, value in record.items():
+            encoded = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            slot = (i * len(fields) + field_index[field]) * 2
+            table[slot] = len(blob)
+            table[slot + 1] = len(encoded)
+            blob += encoded
+
+    header = json.dumps({
+        "kind": kind,
+        "count": len(records),
+        "key_field": key_field,
+        "keys": keys,
+        "fields": fields,
+        "orders": orders,
+        "record_orders": record_orders,
+    }, ensure_ascii=False).encode("utf-8")
+    padding = -(len(_MAGIC) + 8 + len(header)) % 8
+
+    # Write to a temp file and rename, so concurrent builders never see a partial file
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(store_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(b"\0" * padding)
+            f.write(struct.pack(f"<{len(table)}q", *table))
+            f.write(blob)
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class MetadataRecord(Mapping):
+    """
+    Read-only, lazily decoded record (a task item or env item).
+
+    Fields are decoded from the mapped file on first access and cached on the record.
+    Each lookup returns a fresh record, so decoded values are never shared between resets.
+    Copies and pickles are plain dicts.
+    """
+
+    __slots__ = ("_store", "_index", "_values")
+
+    def __init__(self, store, index: int):
+        self._store = store
+        self._index = index
+        self._values = {}
+
+    def __getitem__(self, field):
+        if field in self._values:
+            return self._values[field]
+        value = self._store._decode_field(self._index, field)
+        self._values[field] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._store._record_fields(self._index))
+
+    def __len__(self):
+        return len(self._store._record_fields(self._index))
+
+    def __contains__(self, field):
+        return self._store._has_field(self._index, field)
+
+    def to_dict(self) -> dict:
+        """Return a freshly decoded plain dict of all fields."""
+        return {field: self._store._decode_field(self._index, field) for field in self}
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return self.to_dict()
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"MetadataRecord({self._store.kind}[{self._index}], fields={list(self)})"
+
+
+class MetadataStore:
+    """
+    Memory-mapped view of a metadata JSON file.
+
+    A store built from a JSON dict (env metadata) behaves like that dict:
+    `env_id in store`, `store[env_id]`, `len(store)`, iteration over keys.
+    A store built from a JSON list (task metadata) behaves like that list:
+    `store[index]`, `len(store)`, iteration over records; `store.lookup(task_id)`
+    looks records up by key_field.
+    """
+
+    def __init__(self, store_path: str):
+        with open(store_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"Invalid metadata store file: {store_path}")
+        header_len = struct.unpack_from("<Q", self._mmap, len(_MAGIC))[0]
+        header_start = len(_MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_len])
+        self.kind = header["kind"]
+        self.count = header["count"]
+        self.key_field = header.get("key_field")
+        self.keys_list = header["keys"]
+        self.fields = header["fields"]
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._orders = [tuple(self.fields[i] for i in order) for order in header["orders"]]
+        self._record_orders = header["record_orders"]
+        self._key_index = {key: i for i, key in enumerate(self.keys_list) if key is not None}
+        self._unique_keys = len(self._key_index) == sum(1 for key in self.keys_list if key is not None)
+
+        table_start = header_start + header_len
+        table_start += -table_start % 8
+        table_len = self.count * len(self.fields) * 2
+        # Zero-copy view of the offset table
+        self._table = memoryview(self._mmap)[table_start:table_start + table_len * 8].cast("q")
+        self._data_start = table_start + table_len * 8
+
+    # ==============================
+    # Field access
+    # ==============================
+
+    def _slot(self, index: int, field: str):
+        field_id = self._field_index.get(field)
+        if field_id is None:
+            return None
+        slot = (index * len(self.fields) + field_id) * 2
+        if self._table[slot + 1] < 0:
+            return None
+        return self._table[slot], self._table[slot + 1]
+
+    def _has_field(self, index: int, field: str) -> bool:
+        return self._slot(index, field) is not None
+
+    def _record_fields(self, index: int) -> tuple:
+        return self._orders[self._record_orders[index]]
+
+    def _decode_field(self, index: int, field: str):
+        slot = self._slot(index, field)
+        if slot is None:
+            raise KeyError(field)
+        start = self._data_start + slot[0]
+        return json.loads(self._mmap[start:start + slot[1]])
+
+    def record(self, index: int) -> MetadataRecord:
+        """Return the record at a position."""
+        return MetadataRecord(self, range(self.count)[index])
+
+    def lookup(self, key) -> MetadataRecord:
+        """Return the record for a key (env_id for env stores, key_field value for list stores)."""
+        if key not in self._key_index:
+            raise KeyError(key)
+        return MetadataRecord(self, self._key_index[key])
+
+    # ==============================
+    # dict / list compatible interface
+    # ==============================
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, item):
+        if self.kind == "dict":
+            return self.lookup(item)
+        if isinstance(item, slice):
+            return [self.record(i) for i in range(self.count)[item]]
+        return self.record(item)
+
+    def __contains__(self, item):
+        if self.kind == "dict":
+            return item in self._key_index
+        if self.key_field is not None and self._unique_keys and isinstance(item, Mapping):
+            # Same result as a list scan: only the record with the item's key can be equal to it
+            index = self._key_index.get(item.get(self.key_field))
+            if index is not None and self.record(index) == item:
+                return True
+            if item.get(self.key_field) is not None:
+                return False
+        return any(record == item for record in self)
+
+    def __iter__(self):
+        if self.kind == "dict":
+            return iter(self.keys_list)
+        return (self.record(i) for i in range(self.count))
+
+    def get(self, key, default=None):
+        return self.lookup(key) if key in self._key_index else default
+
+    def keys(self):
+        return list(self._key_index)
+
+    def values(self):
+        return [self.record(i) for i in range(self.count)]
+
+    def items(self):
+        return [(key, self.record(i)) for i, key in enumerate(self.keys_list)]
+
+
+# ==============================
+# Process-wide store registry
+# ==============================
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _remove_stale_stores(cache_dir: str, prefix: str, store_path: str):
+    """Delete store files of older versions of the same source (mapped copies stay valid on POSIX)."""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and name.endswith(".bin") and path != store_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_metadata(json_path: str, key_field: str = None, cache_dir: str = None) -> MetadataStore:
+    """
+    Return the shared read-only store for a metadata JSON file.
+
+    The binary store is built on first use (per file content version) under cache_dir
+    and then memory-mapped; later calls in the same process return the same store.
+    Building a new version deletes the stores of older versions of the same file.
+
+    :param json_path: Path of the env metadata (dict) or scenario metadata (list) JSON
+    :param key_field: For list files, the field used by `lookup` (e.g. "task_id")
+    :param cache_dir: Directory for the binary store files
+    """
+    json_path = os.path.abspath(json_path)
+    stat = os.stat(json_path)
+    version = f"{json_path}|{stat.st_size}|{stat.st_mtime_ns}|{key_field}"
+    with _stores_lock:
+        store = _stores.get(version)
+        if store is not None:
+            return store
+        cache_dir = cache_dir or _CACHE_DIR
+        # <file name>.<source digest>.<version digest>.bin: versions of one source share the prefix
+        source_digest = hashlib.sha256(f"{json_path}|{key_field}".encode("utf-8")).hexdigest()[:16]
+        version_digest = hashlib.sha256(version.encode("utf-8")).hexdigest()[:16]
+        prefix = f"{os.path.basename(json_path)}.{source_digest}."
+        store_path = os.path.join(cache_dir, f"{prefix}{version_digest}.bin")
+        if not os.path.exists(store_path):
+            _build_store_file(json_path, store_path, key_field=key_field)
+            _remove_stale_stores(cache_dir, prefix, store_path)
+        try:
+            store = MetadataStore(store_path)
+        except FileNotFoundError:
+            # Removed by another process that built a newer version in between
+            _build_store_file(json_path, store_path, key_field=key_field)
+            store = MetadataStore(store_path)
+        _stores[version] = store
+        return store
@@ -0,0 +1,309 @@
+"""
+Mutation tracking for environment instance state.
+
+The env instance's container attributes are replaced by tracking dicts/lists that
+record which top-level entries a tool call touched, so snapshots and state diffs
+only need to look at those entries.
+
+A touched path is (attribute name, top-level key). A key of None means the whole
+attribute; list attributes are always touched as a whole, since their positions shift.
+Tracking covers plain dicts/lists; entries holding other mutable objects
+(sets, custom classes, ...) are treated as touched on every step.
+"""
+from copy import deepcopy
+
+# Owner key marking a container that is itself a top-level attribute
+_TOP = object()
+
+_ATOMIC_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _is_immutable(value) -> bool:
+    """Return True if value cannot be mutated in place."""
+    if isinstance(value, _ATOMIC_TYPES):
+        return True
+    if type(value) in (tuple, frozenset):
+        return all(_is_immutable(item) for item in value)
+    return False
+
+
+def _add_path(touched: dict, attr, key):
+    """Add (attr, key) to a touched-path map; None (whole attribute) absorbs any key set."""
+    if attr in touched and touched[attr] is None:
+        return
+    if key is None:
+        touched[attr] = None
+    else:
+        touched.setdefault(attr, set()).add(key)
+
+
+class TrackedDict(dict):
+    """Dict that reports mutations to its MutationTracker. Copies/pickles as a plain dict."""
+
+    __slots__ = ("_tracker", "_owners")
+
+    def _touch(self, key=None):
+        for attr, owner_key in self._owners:
+            self._tracker.touch(attr, key if owner_key is _TOP else owner_key)
+
+    def _touch_all(self):
+        if any(owner_key is _TOP for _, owner_key in self._owners):
+            for key in self:
+                self._touch(key)
+        else:
+            self._touch()
+
+    def __setitem__(self, key, value):
+        self._touch(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._touch(key)
+        dict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, key, *args):
+        self._touch(key)
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._touch(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        self._touch(key)
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        for key in other:
+            self._touch(key)
+        dict.update(self, other)
+
+    def clear(self):
+        self._touch_all()
+        dict.clear(self)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        result = {}
+        memo[id(self)] = result
+        for key, value in self.items():
+            result[deepcopy(key, memo)] = deepcopy(value, memo)
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class TrackedList(list):
+    """List that reports mutations to its MutationTracker. Copies/pickles as a plain list."""
+
+    __slots__ = ("_tracker", "_owners")
+
+    def _touch(self):
+        # List positions shift on insert/delete, so a list is always touched as a whole
+        for attr, owner_key in self._owners:
+            self._tracker.touch(attr, None if owner_key is _TOP else owner_key)
+
+    def __setitem__(self, index, value):
+        self._touch()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._touch()
+        list.__delitem__(self, index)
+
+    def __iadd__(self, other):
+        self._touch()
+        return list.__iadd__(self, other)
+
+    def __imul__(self, n):
+        self._touch()
+        return list.__imul__(self, n)
+
+    def append(self, value):
+        self._touch()
+        list.append(self, value)
+
+    def extend(self, values):
+        self._touch()
+        list.extend(self, values)
+
+    def insert(self, index, value):
+        self._touch()
+        list.insert(self, index, value)
+
+    def pop(self, *args):
+        self._touch()
+        return list.pop(self, *args)
+
+    def remove(self, value):
+        self._touch()
+        list.remove(self, value)
+
+    def clear(self):
+        self._touch()
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self._touch()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._touch()
+        list.reverse(self)
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        result = []
+        memo[id(self)] = result
+        result.extend(deepcopy(value, memo) for value in self)
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+class MutationTracker:
+    """
+    Wrap an env instance's state in tracking containers and collect touched paths per step.
+
+    Usage:
+        tracker = MutationTracker(env_instance)   # wraps state in place
+        ... tool call ...
+        touched = tracker.collect()              # {attr: set(keys) | None}
+    """
+
+    def __init__(self, env_instance):
+        self.env_instance = env_instance
+        self.touched = {}
+        self.always_touched = set()
+        self.containers = {}
+        memo = {}
+        for attr, value in self._get_raw_state().items():
+            self._wrap_attr(attr, value, memo)
+
+    def _get_raw_state(self):
+        return {
+            k: v for k, v in vars(self.env_instance).items()
+            if not (k.startswith("__") and k.endswith("__"))
+        }
+
+    def touch(self, attr, key=None):
+        """Record that (attr, key) was modified; key None means the whole attribute."""
+        _add_path(self.touched, attr, key)
+
+    def collect(self) -> dict:
+        """
+        Return paths touched since the last call and re-wrap them.
+
+        Also detects attributes that were added, removed or reassigned (whole attribute touched).
+        """
+        touched, self.touched = self.touched, {}
+        for attr, key in self.always_touched:
+            _add_path(touched, attr, key)
+
+        raw_state = self._get_raw_state()
+        for attr in list(self.containers):
+            if attr not in raw_state:
+                del self.containers[attr]
+                touched[attr] = None
+        for attr, value in raw_state.items():
+            if attr in self.containers:
+                if value is not self.containers[attr]:
+                    touched[attr] = None
+            elif not _is_immutable(value):
+                touched[attr] = None
+
+        # Re-wrap touched entries so newly inserted containers are tracked too
+        memo = {}
+        for attr, keys in touched.items():
+            if attr not in raw_state:
+                continue
+            container = self.containers.get(attr)
+            if keys is None or not isinstance(container, dict):
+                # Whole attribute, or keys reported by a container that used to live under it
+                self.always_touched = {path for path in self.always_touched if path[0] != attr}
+                self._wrap_attr(attr, raw_state[attr], memo)
+                continue
+            for key in keys:
+                if key in container:
+                    self.always_touched.discard((attr, key))
+                    dict.__setitem__(container, key, self._wrap(container[key], (attr, key), memo))
+        return touched
+
+    def _wrap_attr(self, attr, value, memo):
+        """Wrap a top-level attribute value and set it back on the instance."""
+        if type(value) not in (dict, list, TrackedDict, TrackedList):
+            self.containers.pop(attr, None)
+            if not _is_immutable(value):
+                self.always_touched.add((attr, None))
+            return
+        tracked = self._wrap_container(value, (attr, _TOP), memo)
+        if isinstance(tracked, dict):
+            for key in list(tracked.keys()):
+                dict.__setitem__(tracked, key, self._wrap(tracked[key], (attr, key), memo))
+        else:
+            # Containers inside a list attribute report the whole attribute, not their own keys
+            for index, child in enumerate(tracked):
+                wrapped = self._wrap(child, (attr, None), memo)
+                if wrapped is not child:
+                    list.__setitem__(tracked, index, wrapped)
+        self.containers[attr] = tracked
+        if tracked is not value:
+            setattr(self.env_instance, attr, tracked)
+
+    def _wrap_container(self, value, owner, memo):
+        """Return the tracked version of a single dict/list (children untouched)."""
+        tracked = memo.get(id(value))
+        if tracked is not None:
+            tracked._owners.add(owner)
+            return tracked
+        if type(value) in (TrackedDict, TrackedList):
+            tracked = value
+            if tracked._tracker is not self:
+                # Carried over from another tracker (e.g. a pooled or cloned instance): report here instead
+                tracked._tracker = self
+                tracked._owners = set()
+        else:
+            tracked = TrackedDict(value) if isinstance(value, dict) else TrackedList(value)
+            tracked._tracker = self
+            tracked._owners = set()
+        tracked._owners.add(owner)
+        memo[id(value)] = tracked
+        memo[id(tracked)] = tracked
+        return tracked
+
+    def _wrap(self, value, owner, memo):
+        """
+        Recursively wrap plain dicts/lists under an owner path.
+        A container reached again through another path (aliasing) passes that owner on to its children too.
+        """
+        if type(value) not in (dict, list, TrackedDict, TrackedList):
+            if not _is_immutable(value):
+                self.always_touched.add(owner)
+            return value
+        if (id(value), owner) in memo:
+            return memo[id(value)]
+        tracked = self._wrap_container(value, owner, memo)
+        memo[(id(value), owner)] = memo[(id(tracked), owner)] = True
+        if isinstance(tracked, dict):
+            for key, child in list(tracked.items()):
+                wrapped = self._wrap(child, owner, memo)
+                if wrapped is not child:
+                    dict.__setitem__(tracked, key, wrapped)
+        else:
+            for index, child in enumerate(tracked):
+                wrapped = self._wrap(child, owner, memo)
+                if wrapped is not child:
+                    list.__setitem__(tracked, index, wrapped)
+        return tracked
@@ -1,6 +1,6 @@
-import time
 import os
-from openai import OpenAI
+from . import llm_gateway
+from .llm_client import get_openai_client
 from dotenv import load_dotenv
 from typing import Optional, List
 
@@ -12,30 +12,28 @@ def openai_llm_inference(
         stop_strs: Optional[List[str]] = None,
         max_tokens: int = None):
     load_dotenv()
-    client = OpenAI(
+    client = get_openai_client(
         api_key=os.getenv("USER_OPENAI_API_KEY"),
-        base_url=os.getenv("USER_OPENAI_BASE_URL"),
+        base_url=os.getenv("USER_OPENAI_BASE_URL")
     )
-    retries = 0
-    max_retries = 10
-    while retries < max_retries:
-        try:
-            response = client.chat.completions.create(
-                        model=model,
-                        messages=messages,
-                        stop=stop_strs,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-            output=response.choices[0].message.content
-            return output
-        except KeyboardInterrupt:
-            print("Operation canceled by user.")
-            break
-        except Exception as e:
-            print(f"Someting wrong:{e}. Retrying in {retries*10+10} seconds...")
-            time.sleep(retries*10) 
-            retries += 1
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stop=stop_strs,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            max_retries=10
+        )
+        output=response.choices[0].message.content
+        return output
+    except KeyboardInterrupt:
+        print("Operation canceled by user.")
+    except Exception:
+        pass
     return ''
 
 
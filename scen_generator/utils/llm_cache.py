@@ -0,0 +1,166 @@
+"""
+Persistent LLM response cache (SQLite), keyed by a hash of the request.
+
+Pipeline steps are functions of their prompts, so a rerun after a crash or a prompt
+change only needs to pay for the requests that changed. The cache is opt-in:
+set LLM_CACHE_PATH (and optionally LLM_CACHE_MAX_MB, default 1024), in the environment or
+in .env (read on the first `get_llm_cache` call, after `load_dotenv`), or call `enable_llm_cache`.
+
+This module is shared by scen_generator and skel_builder (skel_builder/utils/call_llm.py
+loads it from here).
+
+The key is a hash of (model, messages, temperature, tools, max_tokens, ...) plus the
+occurrence number of that request in the current process: when a step re-asks the
+same prompt because the first answer could not be parsed, the second ask gets the
+second cached answer (or a fresh one), not the same unparsable answer again.
+Least recently used entries are evicted once the stored responses exceed the size limit.
+"""
+import os
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Optional, Tuple
+
+
+class LLMResponseCache:
+    """
+    Content-addressed response store in a SQLite file, safe to share between threads and processes.
+
+    :param path: SQLite file path
+    :param max_size_mb: Max total size of stored responses, LRU entries are evicted beyond it
+    """
+
+    def __init__(self, path: str, max_size_mb: float = 1024):
+        self.path = path
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.occurrences = defaultdict(int)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def request_hash(**request) -> str:
+        """Hash of the request fields (model, messages, temperature, tools, max_tokens, ...)."""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, **request) -> Tuple[str, Optional[str]]:
+        """Return (key, cached response or None) for the next occurrence of this request."""
+        request_hash = self.request_hash(**request)
+        with self.lock:
+            occurrence = self.occurrences[request_hash]
+            self.occurrences[request_hash] += 1
+            key = f"{request_hash}:{occurrence}"
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return key, None
+            self.hits += 1
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return key, row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response under a key returned by lookup, then evict if over the size limit."""
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self.size += size - (row[0] if row else 0)
+            if self.size > self.max_size:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is at 90% of its size limit."""
+        target = int(self.max_size * 0.9)
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if self.size <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.size -= size
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "size_mb": round(self.size / 1024 / 1024, 2),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.occurrences.clear()
+
+
+_llm_cache = None
+_llm_cache_configured = False  # LLM_CACHE_PATH was read, or the cache was enabled/disabled explicitly
+_llm_cache_lock = threading.Lock()
+
+
+def _print_stats():
+    if _llm_cache is not None:
+        print(f"LLM cache ({_llm_cache.path}): {_llm_cache.stats()}")
+
+
+def enable_llm_cache(path: str, max_size_mb: float = 1024) -> LLMResponseCache:
+    """Turn on the response cache for all LLM calls of this process."""
+    with _llm_cache_lock:
+        return _enable_llm_cache(path, max_size_mb)
+
+
+def _enable_llm_cache(path: str, max_size_mb: float) -> LLMResponseCache:
+    global _llm_cache, _llm_cache_configured
+    if _llm_cache is None:
+        atexit.register(_print_stats)
+    _llm_cache = LLMResponseCache(path, max_size_mb)
+    _llm_cache_configured = True
+    return _llm_cache
+
+
+def disable_llm_cache():
+    global _llm_cache, _llm_cache_configured
+    with _llm_cache_lock:
+        _llm_cache = None
+        _llm_cache_configured = True
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the enabled cache, or None when caching is off."""
+    global _llm_cache_configured
+    if not _llm_cache_configured:
+        with _llm_cache_lock:
+            # Read on first use rather than at import, so values from a later load_dotenv() apply
+            if not _llm_cache_configured:
+                if os.getenv("LLM_CACHE_PATH"):
+                    _enable_llm_cache(os.getenv("LLM_CACHE_PATH"), float(os.getenv("LLM_CACHE_MAX_MB", "1024")))
+                _llm_cache_configured = True
+    return _llm_cache
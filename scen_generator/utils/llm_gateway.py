@@ -0,0 +1,280 @@
+"""
+LLM gateway: per-model rate limits, adaptive concurrency and retries.
+
+Requests are sent with the shared clients of `llm_client`; each one goes through `call`
+(threads) or `async_call` (asyncio):
+- There is one gateway (and llm_client) module per importable root, shared by the agent
+  and the env user simulators, so limits and metrics cover every caller of a model.
+- Requests per model are limited by a token bucket (`set_rate_limit`, or LLM_RATE_LIMIT_RPM
+  for all models) and by an AIMD concurrency limit: +1/limit per success, halved on
+  rate-limit or server errors (at most once per second).
+- Failed attempts are retried with exponential backoff plus jitter; a `Retry-After`
+  header from the server is respected.
+- `get_metrics` reports queue depth, in-flight requests, retries, errors and tokens per second.
+
+Environment variables are read on first use rather than at import, so values loaded by a
+later `load_dotenv()` still apply.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+
+# ==============================
+# Per-model limits
+# ==============================
+
+# None: taken from LLM_INITIAL_CONCURRENCY (default 64) / LLM_MAX_CONCURRENCY (default 256)
+# when a model's limiter is created
+INITIAL_CONCURRENCY = None
+MAX_CONCURRENCY = None
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# Outcome of a request left by a non-Exception (KeyboardInterrupt, CancelledError): release only
+_INTERRUPTED = object()
+
+# Status codes that mean "slow down" (shrink concurrency) rather than "bad request"
+_THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class _ModelLimiter:
+    """Token bucket + AIMD concurrency limit + counters for one model. Thread-safe."""
+
+    def __init__(self, requests_per_minute: float = None):
+        self.lock = threading.Lock()
+        self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+        self.burst = max(1.0, self.rate) if self.rate else None
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+
+        self.concurrency_limit = float(INITIAL_CONCURRENCY or int(os.getenv("LLM_INITIAL_CONCURRENCY", "64")))
+        self.max_concurrency = MAX_CONCURRENCY or int(os.getenv("LLM_MAX_CONCURRENCY", "256"))
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self.retries = 0
+        self.llm_tokens = 0
+        self.first_request_time = None
+
+    def set_rate(self, requests_per_minute: float = None, burst: float = None):
+        with self.lock:
+            self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+            self.burst = (burst or max(1.0, self.rate)) if self.rate else None
+            self.tokens = self.burst
+            self.last_refill = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token from the bucket; return how long the caller must wait before sending."""
+        with self.lock:
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1.0
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_enter(self) -> bool:
+        """Take a concurrency slot if one is free."""
+        with self.lock:
+            if self.in_flight < int(self.concurrency_limit):
+                self.in_flight += 1
+                self.requests += 1
+                if self.first_request_time is None:
+                    self.first_request_time = time.monotonic()
+                return True
+            return False
+
+    def exit(self, error: Exception = None, llm_tokens: int = 0):
+        """Release the slot and adapt the concurrency limit to the outcome."""
+        with self.lock:
+            self.in_flight -= 1
+            self.llm_tokens += llm_tokens
+            if error is None:
+                self.successes += 1
+                # Additive increase: about +1 per limit's worth of successes
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1.0 / self.concurrency_limit)
+                return
+            if error is _INTERRUPTED:
+                return  # Says nothing about the server
+            self.errors += 1
+            if _status_code(error) in _THROTTLE_STATUS:
+                self.throttled += 1
+                now = time.monotonic()
+                # Multiplicative decrease, once per burst of failures
+                if now - self.last_decrease > 1.0:
+                    self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                    self.last_decrease = now
+
+    def metrics(self) -> dict:
+        with self.lock:
+            elapsed = time.monotonic() - self.first_request_time if self.first_request_time else 0.0
+            return {
+                "queue_depth": self.waiting,
+                "in_flight": self.in_flight,
+                "concurrency_limit": int(self.concurrency_limit),
+                "requests": self.requests,
+                "successes": self.successes,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "tokens": self.llm_tokens,
+                "tokens_per_second": round(self.llm_tokens / elapsed, 2) if elapsed > 0 else 0.0,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(model: str) -> _ModelLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = _ModelLimiter(float(os.getenv("LLM_RATE_LIMIT_RPM", "0")) or None)
+            _limiters[model] = limiter
+        return limiter
+
+
+def set_rate_limit(model: str, requests_per_minute: float = None, burst: float = None):
+    """Limit requests per minute for a model (None removes the limit); burst defaults to one second's worth."""
+    _get_limiter(model).set_rate(requests_per_minute, burst)
+
+
+def get_metrics() -> dict:
+    """Return {model: metrics} for every model used so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {model: limiter.metrics() for model, limiter in limiters.items()}
+
+
+# ==============================
+# Calls with retries
+# ==============================
+
+def _status_code(error: Exception):
+    return getattr(error, "status_code", None)
+
+
+def _retry_after(error: Exception):
+    """Seconds from a Retry-After header on the error's response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get("retry-after")
+        if value is not None:
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    """Exponential backoff with jitter (half fixed, half random); at least the server's Retry-After."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    retry_after = _retry_after(error) if error is not None else None
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def _response_tokens(result) -> int:
+    usage = getattr(result, "usage", None)
+    return getattr(usage, "total_tokens", None) or 0
+
+
+def call(model: str, request_fn, max_retries: int = 10):
+    """
+    Run request_fn(attempt) under the model's limits, retrying failures with backoff.
+
+    :param request_fn: Sends one request and returns its result; attempt counts from 0
+    :return: request_fn's result; the last error is raised once max_retries attempts failed
+    """
+    limiter = _get_limiter(model)
+    for attempt in range(max_retries):
+        delay = limiter.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        with limiter.lock:
+            limiter.waiting += 1
+        try:
+            wait = 0.005
+            while not limiter.try_enter():
+                time.sleep(wait)
+                wait = min(wait * 2, 0.1)
+        finally:
+            with limiter.lock:
+                limiter.waiting -= 1
+
+        error, result = _INTERRUPTED, None
+        try:
+            result = request_fn(attempt)
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            # Also runs on KeyboardInterrupt / CancelledError, so the slot is never leaked
+            limiter.exit(error=error, llm_tokens=_response_tokens(result))
+        if error is None:
+            return result
+        if attempt + 1 >= max_retries:
+            raise error
+        delay = backoff_delay(attempt, error)
+        print(f"Something wrong: {error}. Retrying in {delay:.1f} seconds...")
+        with limiter.lock:
+            limiter.retries += 1
+        time.sleep(delay)
+
+
+async def async_call(model: str, request_fn, max_retries: int = 10):
+    """Async version of call; request_fn(attempt) returns an awaitable."""
+    limiter = _get_limiter(model)
+    for attempt in range(max_retries):
+        delay = limiter.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        with limiter.lock:
+            limiter.waiting += 1
+        try:
+            wait = 0.005
+            while not limiter.try_enter():
+                await asyncio.sleep(wait)
+                wait = min(wait * 2, 0.1)
+        finally:
+            with limiter.lock:
+                limiter.waiting -= 1
+
+        error, result = _INTERRUPTED, None
+        try:
+            result = await request_fn(attempt)
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            # Also runs on KeyboardInterrupt / CancelledError, so the slot is never leaked
+            limiter.exit(error=error, llm_tokens=_response_tokens(result))
+        if error is None:
+            return result
+        if attempt + 1 >= max_retries:
+            raise error
+        delay = backoff_delay(attempt, error)
+        print(f"Something wrong: {error}. Retrying in {delay:.1f} seconds...")
+        with limiter.lock:
+            limiter.retries += 1
+        await asyncio.sleep(delay)
+
+
+def record_tokens(model: str, llm_tokens: int):
+    """Count tokens for a model when they are not on the result (e.g. usage of a consumed stream)."""
+    limiter = _get_limiter(model)
+    with limiter.lock:
+        limiter.llm_tokens += llm_tokens
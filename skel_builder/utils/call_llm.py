@@ -1,12 +1,18 @@
 """
 Call LLM with different providers.
 """
-import time
 import os
-from openai import OpenAI
+import sys
+from pathlib import Path
+from utils import llm_gateway
+from utils.llm_client import get_openai_client
 from typing import Optional, List
 from dotenv import load_dotenv
 
+# The LLM response cache module is shared with scen_generator (scen_generator/utils/llm_cache.py)
+sys.path.append(str(Path(__file__).resolve().parents[2] / "scen_generator" / "utils"))
+from llm_cache import get_llm_cache
+
 # Load environment variables
 load_dotenv()
 
@@ -26,87 +32,90 @@ def openai_llm_inference(
     stop_strs: Optional[List[str]] = None,
     max_tokens: int = None
 ):
-    """Call OpenAI LLM API with retry mechanism."""
-    client = OpenAI(
+    """Call OpenAI LLM API with retry mechanism (answers come from the LLM cache when enabled)."""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache_key, output = cache.lookup(
+            model=model, messages=messages, temperature=temperature, stop=stop_strs, max_tokens=max_tokens
+        )
+        if output is not None:
+            return output
+    client = get_openai_client(
         api_key=os.getenv("OPENAI_API_KEY"),
         base_url=os.getenv("OPENAI_BASE_URL")
     )
-    retries = 0
     max_retries = 5
-    while retries < max_retries:
-        try:
-            if 'gpt-5' in model:
-                print("Think model cannot set stop_strs, temperature, max_tokens, ignoring these settings")
-                response = client.responses.create(
-                    model=model,
-                    input=messages,
-                )
-                output = response.output_text
-                return output
-            else:
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    stop=stop_strs,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                output = response.choices[0].message.content
-                return output
-        # except KeyboardInterrupt:
-        #     print("Operation canceled by user.")
-        #     raise
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries*10+10} seconds...")
-            time.sleep(retries*10)
-            retries += 1
+
+    def request(attempt):
+        if 'gpt-5' in model:
+            return client.responses.create(
+                model=model,
+                input=messages,
+            )
+        return client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stop=stop_strs,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+    if 'gpt-5' in model:
+        print("Think model cannot set stop_strs, temperature, max_tokens, ignoring these settings")
+    try:
+        response = llm_gateway.call(model, request, max_retries=max_retries)
+        if 'gpt-5' in model:
+            output = response.output_text
+        else:
+            output = response.choices[0].message.content
+        if cache is not None and output:
+            cache.put(cache_key, output)
+        return output
+    # except KeyboardInterrupt:
+    #     print("Operation canceled by user.")
+    #     raise
+    except Exception:
+        pass
     print(f"Failed to get response after {max_retries} retries, return empty string")
     return ''
 
 def openai_single_embedding_inference(model: str, text: str) -> List[float]:
     """Get embedding for a single text using OpenAI API with retry mechanism."""
-    client = OpenAI(
+    client = get_openai_client(
         api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL"),
+        base_url=os.getenv("OPENAI_BASE_URL")
     )
-    retries = 0
     max_retries = 5
-    while retries < max_retries:
-        try:
-            response = client.embeddings.create(
-                model=model,
-                input=text
-            )
-            return response.data[0].embedding
-        except KeyboardInterrupt:
-            print("Operation canceled by user.")
-            break
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries*10+10} seconds...")
-            time.sleep(retries*10)
-            retries += 1
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.embeddings.create(model=model, input=text),
+            max_retries=max_retries
+        )
+        return response.data[0].embedding
+    except KeyboardInterrupt:
+        print("Operation canceled by user.")
+    except Exception:
+        pass
     print(f"Failed to get embedding after {max_retries} retries, return empty list")
     return []
 
 def openai_batch_embedding_inference(model: str, texts: List[str]) -> List[List[float]]:
     """Get embeddings for multiple texts using OpenAI API with retry mechanism."""
-    client = OpenAI(
+    client = get_openai_client(
         api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL"),
+        base_url=os.getenv("OPENAI_BASE_URL")
     )
-    retries = 0
     max_retries = 5
-    while retries < max_retries:
-        try:
-            response = client.embeddings.create(
-                model=model,
-                input=texts
-            )
-            return [d.embedding for d in response.data]
-        except Exception as e:
-            print(f"Something wrong: {e}. Retrying in {retries*10+10} seconds...")
-            time.sleep(retries*10)
-            retries += 1
+    try:
+        response = llm_gateway.call(
+            model,
+            lambda attempt: client.embeddings.create(model=model, input=texts),
+            max_retries=max_retries
+        )
+        return [d.embedding for d in response.data]
+    except Exception:
+        pass
     print(f"Failed to get embeddings after {max_retries} retries, return empty list")
     return []
 